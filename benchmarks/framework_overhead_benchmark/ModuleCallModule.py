@@ -0,0 +1,23 @@
+import torch
+from utils import NUM_LOOP_ITERS
+
+class IdentityModule(torch.nn.Module):
+    def forward(self, x):
+        return x
+
+def call_module_loop(module, x):
+    for i in range(NUM_LOOP_ITERS):
+        x = module(x)
+    return x
+
+class ModuleCallModule(torch.nn.Module):
+    """ Calls a trivial submodule NUM_LOOP_ITERS times, so that the latency per iter
+    measures the overhead of Module.__call__.
+    """
+    def __init__(self, call_op):
+        super(ModuleCallModule, self).__init__()
+        self.call_op = call_op
+        self.submodule = IdentityModule()
+
+    def forward(self, x):
+        return self.call_op(self.submodule, x)
@@ -1,13 +1,16 @@
 from utils import ms_to_us, benchmark_module, BenchmarkConfig, ModuleConfig
 import argparse
+import torch
 from C2Module import C2SimpleNet
 
 from SimpleAddModule import SimpleAddModule, add_tensors_loop
+from ModuleCallModule import ModuleCallModule, call_module_loop
 from pt_wrapper_module import WrapperModule
 
 """ Framework overhead benchmark script.
 Benchmark framework overhead.
-Currently supported ops: add.
+Currently supported ops: add, module_call (the overhead of calling an nn.Module, with
+--with_hooks to register a no-op global forward hook, which disables the no-hooks fast path).
 As of now runs only forward pass.
 Supports both graph mode and eager mode. In graph mode the module is traced via JIT tracing.
 Debug option prints the traced graph is graph_mode is enabled.
@@ -18,12 +21,15 @@ buck run @mode/opt <path-to-framework_overhead_benchmark>:framework_overhead_ben
  --add_op --graph_mode --eager_mode (Runs both graph mode and eager mode)
 buck run @mode/opt <path-to-framework_overhead_benchmark>:framework_overhead_benchmark --
  --add_op --graph_mode (Runs only graph mode)
+To benchmark the overhead of nn.Module calls, without and with hooks:
+buck run @mode/opt <path-to-framework_overhead_benchmark>:framework_overhead_benchmark --
+ --op module_call_op --eager_mode [--with_hooks]
 To run C2 benchmark:
 buck run @mode/opt <path-to-framework_overhead_benchmark>:framework_overhead_benchmark --
  --add_op --benchmark_c2_net
 """
 
-SUPPORTED_OPS = {"add_op"}
+SUPPORTED_OPS = {"add_op", "module_call_op"}
 
 def parse_op_args(op):
     op_list = ops.split(",")
@@ -69,6 +75,7 @@ def main():
     parser.add_argument("--debug", default=False, dest="debug", action="store_true")
     parser.add_argument("--save", default=False, dest="save", action="store_true")
     parser.add_argument("--eager_mode", default=False, dest="eager_mode", action="store_true")
+    parser.add_argument("--with_hooks", default=False, dest="with_hooks", action="store_true")
     parser.add_argument("--num_warmup_iters", type=int, default=100)
     parser.add_argument("--num_iters", type=int, default=1000)
     args = parser.parse_args()
@@ -86,6 +93,8 @@ def main():
     if args.eager_mode:
         graph_mode = False
     result = {}
+    if args.with_hooks:
+        torch.nn.modules.module.register_module_forward_hook(lambda module, input, output: None)
     if args.op == "add_op":
         num_params = 2
         if args.benchmark_c2_net:
@@ -93,6 +102,10 @@ def main():
         else:
             module_config = ModuleConfig(add_tensors_loop, None, num_params, graph_mode)
         benchmark_simple_fn(args, config, module_config, SimpleAddModule, result)
+    elif args.op == "module_call_op":
+        assert not args.benchmark_c2_net, "module_call_op has no C2 equivalent"
+        module_config = ModuleConfig(call_module_loop, None, 1, graph_mode)
+        benchmark_simple_fn(args, config, module_config, ModuleCallModule, result)
     print_results(result)
 
 if __name__ == "__main__":
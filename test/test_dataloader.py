@@ -10,11 +10,12 @@ import signal
 import unittest
 import itertools
 import warnings
+import threading
 import tempfile
 from torch import multiprocessing as mp
 from torch.utils.data import _utils, Dataset, IterableDataset, TensorDataset, DataLoader, ConcatDataset, ChainDataset
 from torch.utils.data._utils import MP_STATUS_CHECK_INTERVAL
-from torch.utils.data.dataset import random_split
+from torch.utils.data.dataset import random_split, ShardedIterableDataset
 from torch._utils import ExceptionWrapper
 from torch.testing._internal.common_utils import (TestCase, run_tests, TEST_NUMPY, IS_WINDOWS,
                                                   IS_PYTORCH_CI, NO_MULTIPROCESSING_SPAWN, skipIfRocm,
@@ -247,6 +248,14 @@ class TestTensorDataset(TestCase):
             self.assertEqual(t2[i], source[i][2])
             self.assertEqual(t3[i], source[i][3])
 
+    def test_getitems(self):
+        t = torch.randn(15, 10, 2)
+        l = torch.randperm(15)
+        source = TensorDataset(t, l)
+        indices = [3, 0, 14, 3, 7]
+        expected = _utils.collate.default_collate([source[i] for i in indices])
+        self.assertEqual(source.__getitems__(indices), expected)
+
 
 @unittest.skipIf(
     TEST_WITH_TSAN,
@@ -293,6 +302,16 @@ class TestConcatDataset(TestCase):
         self.assertEqual(0, (d2[0][0] - result[7][0]).abs().sum())
         self.assertEqual(0, (d3[0][0] - result[14][0]).abs().sum())
 
+    def test_getitems(self):
+        d1 = TensorDataset(torch.rand(7, 3), torch.arange(7))
+        d2 = TensorDataset(torch.rand(5, 3), torch.arange(5))
+        # a dataset without `__getitems__` is fetched sample by sample
+        d3 = [(torch.rand(3), i) for i in range(4)]
+        result = ConcatDataset([d1, d2, d3])
+        for indices in ([0, 1, 2], [8, 9], [15, 13], [11, 0, 15, 6, 7, 12, 3]):
+            expected = _utils.collate.default_collate([result[i] for i in indices])
+            self.assertEqual(result.__getitems__(indices), expected)
+
     def test_iterable_dataset_err(self):
         d1 = TensorDataset(torch.rand(7, 3, 28, 28), torch.rand(7))
         it1 = CountingIterableDataset(5)
@@ -400,6 +419,16 @@ class ErrorDataset(Dataset):
         return self.size
 
 
+class MismatchedShapeDataset(Dataset):
+    # sample 1 cannot be stacked with sample 0
+
+    def __getitem__(self, idx):
+        return torch.full((4 if idx == 1 else 3,), float(idx))
+
+    def __len__(self):
+        return 6
+
+
 class SegfaultDataset(Dataset):
 
     def __init__(self, size):
@@ -924,6 +953,63 @@ except RuntimeError as e:
             self.assertTrue(input.is_pinned())
             self.assertTrue(target.is_pinned())
 
+    @unittest.skipIf(not TEST_CUDA, "CUDA unavailable")
+    def test_reuse_pinned_buffers(self):
+        loader = self._get_data_loader(self.dataset, batch_size=4, pin_memory=True,
+                                       reuse_pinned_buffers=True)
+        data_ptrs = set()
+        for i, (input, target) in enumerate(loader):
+            self.assertTrue(input.is_pinned())
+            self.assertTrue(target.is_pinned())
+            self.assertEqual(input, self.data[i * 4:(i + 1) * 4])
+            self.assertEqual(target, self.labels[i * 4:(i + 1) * 4])
+            data_ptrs.add(input.data_ptr())
+            input.cuda(non_blocking=True)
+            torch.cuda.current_stream().synchronize()
+            del input, target
+        # the memory of freed batches is reused
+        self.assertLess(len(data_ptrs), len(loader))
+
+    @unittest.skipIf(not TEST_CUDA, "CUDA unavailable")
+    def test_reuse_pinned_buffers_keeps_views(self):
+        loader = self._get_data_loader(self.dataset, batch_size=4, pin_memory=True,
+                                       reuse_pinned_buffers=True)
+        # views outlive their batch, whose memory must not be reused meanwhile
+        views = [input[0] for input, _ in loader]
+        for i, view in enumerate(views):
+            self.assertEqual(view, self.data[i * 4])
+
+    @unittest.skipIf(not TEST_CUDA, "CUDA unavailable")
+    def test_reuse_pinned_buffers_other_threads(self):
+        pinned = []
+
+        def collate_in_thread():
+            pinned.append(_utils.collate.default_collate([torch.ones(2)]).is_pinned())
+
+        class ThreadCollateDataset(Dataset):
+            def __getitem__(self, idx):
+                t = threading.Thread(target=collate_in_thread)
+                t.start()
+                t.join()
+                return torch.ones(2)
+
+            def __len__(self):
+                return 2
+
+        loader = self._get_data_loader(ThreadCollateDataset(), batch_size=2, pin_memory=True,
+                                       reuse_pinned_buffers=True)
+        for batch in loader:
+            self.assertTrue(batch.is_pinned())
+        # only the thread fetching the batch collates into pinned memory
+        self.assertEqual(pinned, [False, False])
+
+    def test_reuse_pinned_buffers_invalid_options(self):
+        with self.assertRaisesRegex(ValueError, "reuse_pinned_buffers option needs pin_memory=True"):
+            self._get_data_loader(self.dataset, reuse_pinned_buffers=True)
+        with self.assertRaisesRegex(ValueError, "reuse_pinned_buffers option needs num_workers=0"):
+            self._get_data_loader(self.dataset, num_workers=2, pin_memory=True,
+                                  reuse_pinned_buffers=True)
+
     def test_multiple_dataloaders(self):
         for multiprocessing_context in supported_multiprocessing_contexts:
             loader1_it = iter(self._get_data_loader(self.dataset, num_workers=1))
@@ -978,6 +1064,23 @@ except RuntimeError as e:
             self._get_data_loader(self.dataset, num_workers=-1)
         with self.assertRaisesRegex(ValueError, "timeout option should be non-negative"):
             self._get_data_loader(self.dataset, timeout=-1)
+        with self.assertRaisesRegex(ValueError, "shared_batch_slabs option should be non-negative"):
+            self._get_data_loader(self.dataset, num_workers=1, shared_batch_slabs=-1)
+        with self.assertRaisesRegex(ValueError, "shared_batch_slabs option needs num_workers > 0"):
+            self._get_data_loader(self.dataset, shared_batch_slabs=1)
+        with self.assertRaisesRegex(ValueError, "worker_backend option should be either"):
+            self._get_data_loader(self.dataset, num_workers=1, worker_backend='fiber')
+        with self.assertRaisesRegex(ValueError, "shared_batch_slabs option needs worker_backend='process'"):
+            self._get_data_loader(self.dataset, num_workers=1, shared_batch_slabs=1, worker_backend='thread')
+        with self.assertRaisesRegex(ValueError, "adaptive_prefetch option needs num_workers > 0"):
+            self._get_data_loader(self.dataset, adaptive_prefetch=True)
+        with self.assertRaisesRegex(ValueError, "max_prefetch_factor option should be at least prefetch_factor"):
+            self._get_data_loader(self.dataset, num_workers=2, adaptive_prefetch=True, prefetch_factor=4,
+                                  max_prefetch_factor=3)
+        with self.assertRaisesRegex(ValueError, r"min_num_workers option should be in \[1, num_workers=2\]"):
+            self._get_data_loader(self.dataset, num_workers=2, adaptive_prefetch=True, min_num_workers=3)
+        with self.assertRaisesRegex(ValueError, "options need adaptive_prefetch=True"):
+            self._get_data_loader(self.dataset, num_workers=2, min_num_workers=1)
 
         # disable auto-batching
         with self.assertRaisesRegex(ValueError,
@@ -1029,6 +1132,8 @@ except RuntimeError as e:
                 torch.utils.data.SequentialSampler(dataset), 3, False))
         with self.assertRaisesRegex(ValueError, "DataLoader with IterableDataset: expected unspecified batch_sampler"):
             self._get_data_loader(dataset, batch_sampler=3)
+        with self.assertRaisesRegex(ValueError, "DataLoader with IterableDataset: min_num_workers option is not supported"):
+            self._get_data_loader(dataset, num_workers=2, adaptive_prefetch=True, min_num_workers=1)
 
     def test_builtin_collection_conversion(self):
         for coll_ty in (list, tuple):
@@ -1255,6 +1360,19 @@ except RuntimeError as e:
         dataset = SynchronizedSeedDataset(num_workers, batch_size, num_workers)
         self.assertEqual(set(int(batch) for batch in get_dataloader()), set(int(batch) for batch in get_dataloader()))
 
+    def test_base_seed_and_shuffle_order(self):
+        # the base seed is drawn from the global generator before the sampler
+        # draws its seed and permutation
+        torch.manual_seed(0)
+        base_seed = torch.empty((), dtype=torch.int64).random_().item()
+        torch.empty((), dtype=torch.int64).random_()
+        indices = torch.randperm(10).tolist()
+        for batch_size in (None, 1):
+            torch.manual_seed(0)
+            it = iter(DataLoader(list(range(10)), batch_size=batch_size, shuffle=True))
+            self.assertEqual(it._base_seed, base_seed)
+            self.assertEqual([int(i) for i in it], indices)
+
     def test_worker_init_fn(self):
         dataset = SeedDataset(4)
         dataloader = self._get_data_loader(dataset, batch_size=2, num_workers=2,
@@ -1307,6 +1425,136 @@ except RuntimeError as e:
     def test_shuffle_batch_workers_prefetch(self):
         self._test_shuffle(DataLoader(self.dataset, batch_size=2, shuffle=True, num_workers=4, prefetch_factor=3))
 
+    def test_seqential_batch_workers_shared_batch_slabs(self):
+        self._test_sequential(self._get_data_loader(self.dataset, batch_size=2, num_workers=4,
+                                                    shared_batch_slabs=3))
+
+    def test_shuffle_batch_workers_shared_batch_slabs(self):
+        self._test_shuffle(self._get_data_loader(self.dataset, batch_size=2, shuffle=True, num_workers=4,
+                                                 shared_batch_slabs=1))
+
+    def test_shared_batch_slabs_reuse(self):
+        num_workers, slabs = 2, 3
+        loader = self._get_data_loader(self.dataset, batch_size=4, num_workers=num_workers,
+                                       shared_batch_slabs=slabs)
+        for _ in range(2):
+            data_ptrs = set()
+            for i, (sample, target) in enumerate(loader):
+                self.assertTrue(sample.is_shared())
+                self.assertEqual(sample, self.data[i * 4:(i + 1) * 4])
+                self.assertEqual(target, self.labels[i * 4:(i + 1) * 4])
+                data_ptrs.add(sample.storage().data_ptr())
+            # every batch is stacked into one of the preallocated slabs
+            self.assertLessEqual(len(data_ptrs), num_workers * slabs)
+
+    def test_shared_batch_slabs_collate_error(self):
+        # a slab storage created for a batch that failed to collate is sent
+        # with the next batch reusing it
+        loader = self._get_data_loader(MismatchedShapeDataset(), batch_size=2, num_workers=1,
+                                       shared_batch_slabs=1)
+        it = iter(loader)
+        with self.assertRaises(RuntimeError):
+            next(it)
+        for i, sample in enumerate(it, 1):
+            self.assertEqual(sample, torch.tensor([2 * i, 2 * i + 1], dtype=torch.float).view(2, 1).expand(2, 3))
+
+    def test_shared_batch_slabs_custom_collate(self):
+        # batches that are not collated into a slab are sent as usual
+        loader = self._get_data_loader(self.dataset, batch_size=2, num_workers=2, shared_batch_slabs=2,
+                                       collate_fn=lambda batch: torch.cat([x[0] for x in batch]))
+        for i, sample in enumerate(loader):
+            self.assertEqual(sample, self.data[i * 2:(i + 1) * 2].view(-1, 3, 5))
+
+    def test_seqential_batch_thread_workers(self):
+        self._test_sequential(self._get_data_loader(self.dataset, batch_size=2, num_workers=4,
+                                                    worker_backend='thread'))
+
+    def test_shuffle_batch_thread_workers(self):
+        self._test_shuffle(self._get_data_loader(self.dataset, batch_size=2, shuffle=True, num_workers=4,
+                                                 worker_backend='thread'))
+
+    def test_error_thread_workers(self):
+        self._test_error(self._get_data_loader(ErrorDataset(41), batch_size=2, shuffle=True, num_workers=4,
+                                               worker_backend='thread'))
+
+    def test_iterable_style_dataset_thread_workers(self):
+        num_workers = 3
+        sizes_for_all_workers = [0, 4, 20]
+        expected = sorted(sum((list(range(s)) for s in sizes_for_all_workers), []))
+        dataset = WorkerSpecificIterableDataset(sizes_for_all_workers)
+        dataloader_iter = iter(self._get_data_loader(dataset, num_workers=num_workers, batch_size=None,
+                                                     worker_backend='thread'))
+        fetched = sorted(int(d) for d in dataloader_iter)
+        self.assertEqual(fetched, expected)
+        for w in dataloader_iter._workers:
+            w.join(JOIN_TIMEOUT)
+            self.assertFalse(w.is_alive())
+
+    def test_get_worker_info_thread_workers(self):
+        seen = {}
+
+        class WorkerInfoDataset(Dataset):
+            def __getitem__(self, idx):
+                info = torch.utils.data.get_worker_info()
+                seen[idx] = (info.id, info.num_workers, info.dataset)
+                return idx
+
+            def __len__(self):
+                return 10
+
+        dataset = WorkerInfoDataset()
+        loader = self._get_data_loader(dataset, num_workers=2, worker_backend='thread')
+        self.assertEqual([int(d) for d in loader], list(range(10)))
+        self.assertIsNone(torch.utils.data.get_worker_info())
+        self.assertEqual(len(seen), 10)
+        for worker_id, num_workers, worker_dataset in seen.values():
+            self.assertIn(worker_id, (0, 1))
+            self.assertEqual(num_workers, 2)
+            # thread workers share the dataset object of the main process
+            self.assertIs(worker_dataset, dataset)
+        # batches collated in worker threads are not moved to shared memory
+        batch = next(iter(self._get_data_loader(self.dataset, batch_size=2, num_workers=1,
+                                                worker_backend='thread')))
+        self.assertFalse(batch[0].is_shared())
+
+    def test_seqential_batch_workers_adaptive_prefetch(self):
+        self._test_sequential(self._get_data_loader(self.dataset, batch_size=2, num_workers=4,
+                                                    adaptive_prefetch=True, max_prefetch_factor=4,
+                                                    min_num_workers=1))
+
+    def test_shuffle_batch_workers_adaptive_prefetch(self):
+        self._test_shuffle(self._get_data_loader(self.dataset, batch_size=2, shuffle=True, num_workers=4,
+                                                 adaptive_prefetch=True, min_num_workers=2))
+
+    def test_adaptive_prefetch_controller(self):
+        controller = _utils.autoscale._PrefetchController(
+            num_workers=2, min_num_workers=1, prefetch_factor=2, max_prefetch_factor=3, window=2)
+        self.assertEqual(controller.max_tasks_outstanding, 4)
+
+        def run_window(wait):
+            controller.waited(wait)
+            changed = controller.batch_yielded()
+            return controller.batch_yielded() or changed
+
+        # the consumer is starved while the workers are idle: prefetch more
+        self.assertTrue(run_window(1000.))
+        self.assertEqual((controller.prefetch_factor, controller.num_active_workers), (3, 2))
+        self.assertEqual(controller.max_tasks_outstanding, 6)
+        # bounds are respected
+        self.assertFalse(run_window(1000.))
+        self.assertEqual((controller.prefetch_factor, controller.num_active_workers), (3, 2))
+        # the consumer never waits: shrink prefetch first, then workers
+        for prefetch_factor, num_active_workers in [(2, 2), (1, 2), (1, 1), (1, 1)]:
+            run_window(0.)
+            run_window(0.)
+            self.assertEqual((controller.prefetch_factor, controller.num_active_workers),
+                             (prefetch_factor, num_active_workers))
+        # saturated workers: add a worker before prefetching more
+        controller.task_sent(0)
+        time.sleep(0.01)
+        run_window(1000.)
+        self.assertEqual((controller.prefetch_factor, controller.num_active_workers), (1, 2))
+
     def test_random_sampler(self):
 
         from collections import Counter
@@ -1399,6 +1647,67 @@ except RuntimeError as e:
         ):
             self.assertEqual(list(fn()), list(fn()))
 
+    def test_sampler_state_dict(self):
+        from torch.utils.data import RandomSampler, SequentialSampler, BatchSampler
+        from torch.utils.data.distributed import DistributedSampler
+
+        def make_distributed():
+            sampler = DistributedSampler(self.dataset, num_replicas=3, rank=1)
+            sampler.set_epoch(7)
+            return sampler
+
+        for fn in (
+            lambda: SequentialSampler(self.dataset),
+            lambda: RandomSampler(self.dataset),
+            lambda: RandomSampler(self.dataset, num_samples=75, replacement=True),
+            lambda: RandomSampler(self.dataset, generator=torch.Generator().manual_seed(42)),
+            lambda: BatchSampler(RandomSampler(self.dataset), batch_size=3, drop_last=False),
+            make_distributed,
+        ):
+            sampler = fn()
+            it = iter(sampler)
+            consumed = [next(it) for _ in range(10)]
+            state = sampler.state_dict()
+            self.assertEqual(state['num_yielded'], 10)
+            remaining = list(it)
+
+            resumed = fn()
+            if isinstance(resumed, DistributedSampler):
+                resumed.set_epoch(0)
+            resumed.load_state_dict(state)
+            self.assertEqual(list(resumed), remaining)
+            # only the next iteration is resumed
+            self.assertEqual(len(list(resumed)), len(consumed) + len(remaining))
+
+    def _test_dataloader_state_dict(self, **kwargs):
+        loader = self._get_data_loader(self.dataset, shuffle=True, **kwargs)
+        it = iter(loader)
+        for _ in range(5):
+            next(it)
+        state = it.state_dict()
+        self.assertEqual(state['num_yielded'], 5)
+        remaining = list(it)
+
+        it = iter(self._get_data_loader(self.dataset, shuffle=True, **kwargs))
+        it.load_state_dict(state)
+        resumed = list(it)
+        self.assertEqual(len(resumed), len(remaining))
+        for (input, target), (expected_input, expected_target) in zip(resumed, remaining):
+            self.assertEqual(input, expected_input)
+            self.assertEqual(target, expected_target)
+
+    def test_dataloader_state_dict(self):
+        self._test_dataloader_state_dict(batch_size=3)
+        self._test_dataloader_state_dict(batch_size=None)
+        self._test_dataloader_state_dict(batch_size=3, num_workers=2)
+
+    def test_dataloader_state_dict_unsupported(self):
+        it = iter(self._get_data_loader(CountingIterableDataset(10), batch_size=2))
+        with self.assertRaisesRegex(ValueError, "not supported with IterableDataset"):
+            it.state_dict()
+        it = iter(self._get_data_loader(self.dataset, sampler=range(10), batch_size=2))
+        with self.assertRaisesRegex(TypeError, "does not support state_dict"):
+            it.state_dict()
 
     def _test_sampler(self, **kwargs):
         indices = range(2, 12)  # using a regular iterable
@@ -1830,6 +2139,130 @@ class TestStringDataLoader(TestCase):
             self.assertTrue(n.is_pinned())
 
 
+class BatchedFetchDataset(Dataset):
+    def __init__(self, n):
+        self.n = n
+        self.num_getitem = 0
+        self.num_getitems = 0
+
+    def __getitem__(self, idx):
+        self.num_getitem += 1
+        return {'value': torch.tensor(idx), 'name': str(idx)}
+
+    def __getitems__(self, indices):
+        self.num_getitems += 1
+        return {'value': torch.tensor(indices), 'name': [str(idx) for idx in indices]}
+
+    def __len__(self):
+        return self.n
+
+
+class TestBatchedFetch(TestCase):
+    def test_getitems_used_with_default_collate(self):
+        dataset = BatchedFetchDataset(10)
+        batches = list(DataLoader(dataset, batch_size=4))
+        self.assertEqual(dataset.num_getitem, 0)
+        self.assertEqual(dataset.num_getitems, 3)
+        self.assertEqual(batches[2]['value'], torch.tensor([8, 9]))
+        self.assertEqual(batches[2]['name'], ['8', '9'])
+
+    def test_getitem_used_without_default_collate(self):
+        dataset = BatchedFetchDataset(10)
+        list(DataLoader(dataset, batch_size=4, collate_fn=lambda batch: batch))
+        self.assertEqual(dataset.num_getitem, 10)
+        self.assertEqual(dataset.num_getitems, 0)
+        list(DataLoader(dataset, batch_size=None))
+        self.assertEqual(dataset.num_getitem, 20)
+        self.assertEqual(dataset.num_getitems, 0)
+
+    def test_subset(self):
+        dataset = BatchedFetchDataset(10)
+        subset = torch.utils.data.Subset(dataset, [9, 7, 5, 3, 1])
+        batch = next(iter(DataLoader(subset, batch_size=3, num_workers=1)))
+        self.assertEqual(batch['value'], torch.tensor([9, 7, 5]))
+        self.assertEqual(batch['name'], ['9', '7', '5'])
+
+    def test_concat(self):
+        dataset = ConcatDataset([BatchedFetchDataset(3), BatchedFetchDataset(3)])
+        batch = dataset.__getitems__([4, 0, 5, 1])
+        self.assertEqual(batch['value'], torch.tensor([1, 0, 2, 1]))
+        self.assertEqual(batch['name'], ['1', '0', '2', '1'])
+        dataset = ConcatDataset([TensorDataset(torch.arange(3)), TensorDataset(torch.arange(3, 6))])
+        indices = [4, 0, 5, 1]
+        self.assertEqual(dataset.__getitems__(indices), [torch.tensor(indices)])
+
+
+def _read_range_shard(shard):
+    # shard `i` holds the samples 10 * i, ..., 10 * i + 9
+    return range(10 * shard, 10 * shard + 10)
+
+
+def _read_failing_shard(shard):
+    if shard == 3:
+        raise ValueError("cannot read shard 3")
+    return range(10 * shard, 10 * shard + 10)
+
+
+@unittest.skipIf(
+    TEST_WITH_TSAN,
+    "Fails with TSAN with the following error: starting new threads after multi-threaded "
+    "fork is not supported. Dying (set die_after_fork=0 to override)")
+class TestShardedIterableDataset(TestCase):
+    def _samples(self, num_workers=0, **kwargs):
+        dataset = ShardedIterableDataset(list(range(12)), _read_range_shard, **kwargs)
+        return [int(x) for x in DataLoader(dataset, batch_size=None, num_workers=num_workers)]
+
+    def test_partition(self):
+        for num_workers in (0, 2, 3):
+            samples = []
+            for rank in range(2):
+                rank_samples = self._samples(num_workers, num_replicas=2, rank=rank)
+                self.assertEqual(len(rank_samples), 60)
+                samples.extend(rank_samples)
+            self.assertEqual(sorted(samples), list(range(120)))
+
+    def test_assigned_shards(self):
+        dataset = ShardedIterableDataset(list(range(10)), _read_range_shard, num_replicas=3, rank=1)
+        self.assertEqual(dataset.assigned_shards(), [1, 4, 7])
+        dataset.shuffle = True
+        shards = dataset.assigned_shards()
+        self.assertEqual(shards, dataset.assigned_shards())
+        dataset.set_epoch(1)
+        self.assertNotEqual(shards, dataset.assigned_shards())
+
+    def test_shuffle(self):
+        for num_workers in (0, 2):
+            for read_ahead in (0, 7):
+                kwargs = dict(shuffle=True, shuffle_buffer_size=25, read_ahead=read_ahead)
+                samples = self._samples(num_workers, **kwargs)
+                self.assertEqual(sorted(samples), list(range(120)))
+                self.assertNotEqual(samples, list(range(120)))
+                self.assertEqual(samples, self._samples(num_workers, **kwargs))
+
+    def test_read_ahead(self):
+        for num_workers in (0, 2):
+            self.assertEqual(self._samples(num_workers, read_ahead=5), self._samples(num_workers))
+        # stopping early does not block on the reader thread
+        dataset = ShardedIterableDataset(list(range(12)), _read_range_shard, read_ahead=2)
+        it = iter(dataset)
+        self.assertEqual(next(it), 0)
+        del it
+
+    def test_read_error(self):
+        for read_ahead in (0, 5):
+            dataset = ShardedIterableDataset(list(range(6)), _read_failing_shard, read_ahead=read_ahead)
+            with self.assertRaisesRegex(ValueError, "cannot read shard 3"):
+                list(dataset)
+
+    def test_invalid_args(self):
+        with self.assertRaisesRegex(ValueError, "shuffle_buffer_size should be a non-negative integer"):
+            ShardedIterableDataset([0], _read_range_shard, shuffle_buffer_size=-1)
+        with self.assertRaisesRegex(ValueError, "read_ahead should be a non-negative integer"):
+            ShardedIterableDataset([0], _read_range_shard, read_ahead=-1)
+        with self.assertRaisesRegex(ValueError, "rank should be in the interval"):
+            ShardedIterableDataset([0], _read_range_shard, num_replicas=2, rank=2)
+
+
 class DictDataset(Dataset):
     def __len__(self):
         return 4
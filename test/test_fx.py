@@ -7,6 +7,9 @@ import copy
 from pathlib import Path
 from torch._fx import symbolic_trace, Proxy, Node, GraphModule, Tracer, Graph
 from torch._fx.experimental import GraphManipulation
+from torch._fx.experimental import optimization
+from torch._fx.experimental.shape_prop import ShapeProp
+from torch._fx.experimental.memory_planner import plan_memory
 
 from torch._fx.proxy import TraceError
 
@@ -480,6 +483,19 @@ class TestFX(JitTestCase):
         x = torch.rand(3, 4)
         self.assertEqual(traced(x), seq(x))
 
+    def test_generated_code_names_nodes(self):
+        class AddRelu(torch.nn.Module):
+            def forward(self, x, y):
+                return torch.relu(x + y)
+
+        m = AddRelu()
+        traced = symbolic_trace(m)
+        for node in traced.graph.nodes:
+            self.assertEqual(repr(node), node.name)
+        self.assertNotIn('object at', traced.code)
+        x, y = torch.rand(3, 4), torch.rand(3, 4)
+        self.assertEqual(traced(x, y), m(x, y))
+
     def test_tensor_constant(self):
         class ConstTensor(torch.nn.Module):
             def forward(self, x):
@@ -728,10 +744,280 @@ class TestFX(JitTestCase):
         c : torch._fx.Node = graph.create_node('get_attr', 'zip.zap.zam')
         d : torch._fx.Node = graph.create_node('call_function', operator.add, args=(b, c))
         graph.output(d)
-        nodes = graph._nodes
-        nodes[2], nodes[3] = nodes[3], nodes[2]
+        c.prepend(d)
         with self.assertRaisesRegex(RuntimeError, 'was used before it has been defined'):
             graph.lint()
 
+    def test_users_and_uses(self):
+        graph : torch._fx.Graph = torch._fx.Graph()
+        a : torch._fx.Node = graph.create_node('placeholder', 'x')
+        b : torch._fx.Node = graph.create_node('call_function', operator.add, args=(a, a))
+        c : torch._fx.Node = graph.create_node('call_function', operator.mul, args=(a,), kwargs={'other': b})
+        graph.output(c)
+        self.assertEqual(list(a.users), [b, c])
+        self.assertEqual(a.uses, 3)
+        self.assertEqual(list(b.users), [c])
+        self.assertEqual(c.uses, 1)
+        c.kwargs = {'other': a}
+        self.assertEqual(list(b.users), [])
+        self.assertEqual(a.uses, 4)
+        graph.lint()
+
+    def test_insert_and_erase_nodes(self):
+        traced = symbolic_trace(SimpleTest())
+        graph = traced.graph
+        relu = next(n for n in graph.nodes if n.target == torch.relu)
+        # replace relu(x + 3.0) by neg(x + 3.0), inserted right after relu
+        with graph.inserting_after(relu):
+            neg = graph.call_function(torch.neg, relu.args)
+            sigmoid = graph.call_function(torch.sigmoid, (neg,))
+        self.assertIs(relu.next, neg)
+        self.assertIs(neg.next, sigmoid)
+        self.assertEqual(relu.replace_all_uses_with(sigmoid), [])
+        self.assertIs(graph.result, sigmoid)
+        with self.assertRaisesRegex(RuntimeError, 'still has 1 uses'):
+            graph.erase_node(neg)
+        graph.erase_node(relu)
+        self.assertNotIn(relu, graph.nodes)
+        self.assertEqual(len(graph), len(graph.nodes))
+        graph.lint(traced)
+        traced.graph = graph
+        x = torch.rand(3, 4)
+        self.assertEqual(traced(x), torch.sigmoid(torch.neg(x + 3.0)))
+
+    def test_graph_deepcopy(self):
+        traced = symbolic_trace(SimpleTest())
+        copied = copy.deepcopy(traced.graph)
+        self.assertEqual(str(copied), str(traced.graph))
+        copied.lint(traced)
+
+    def test_eliminate_dead_code(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.lin = torch.nn.Linear(4, 4)
+
+            def forward(self, x):
+                unused = torch.neg(x)  # noqa: F841
+                self.lin(x)
+                x.add_(1.0)
+                return torch.relu(x)
+
+        traced = symbolic_trace(M())
+        optimization.eliminate_dead_code(traced)
+        traced.graph.lint(traced)
+        targets = [n.target for n in traced.graph.nodes]
+        self.assertNotIn(torch.neg, targets)
+        self.assertIn('lin', targets)
+        self.assertIn('add_', targets)
+        x = torch.rand(3, 4)
+        self.assertEqual(traced(x.clone()), torch.relu(x + 1.0))
+
+    def test_eliminate_common_subexpressions(self):
+        class M(torch.nn.Module):
+            def forward(self, x):
+                a = torch.relu(x) + torch.relu(x)
+                return a + (x + 1) + (x + 1.0) + torch.rand(1) + torch.rand(1)
+
+        traced = symbolic_trace(M())
+        optimization.eliminate_common_subexpressions(traced)
+        traced.graph.lint(traced)
+        targets = [n.target for n in traced.graph.nodes]
+        self.assertEqual(targets.count(torch.relu), 1)
+        # `x + 1` and `x + 1.0` differ, and random values are never merged
+        self.assertEqual(targets.count(torch.rand), 2)
+        adds = [n for n in traced.graph.nodes if n.target == operator.add and n.args[0].op == 'placeholder']
+        self.assertEqual(len(adds), 2)
+
+    def test_eliminate_common_subexpressions_mutation(self):
+        class M(torch.nn.Module):
+            def forward(self, x):
+                a = x + 1
+                b = x + 1
+                a.view(-1).add_(1)
+                c = torch.zeros(3)
+                d = torch.zeros(3)
+                c.fill_(2)
+                return b, c, d
+
+        m = M()
+        traced = symbolic_trace(m)
+        optimization.eliminate_common_subexpressions(traced)
+        traced.graph.lint(traced)
+        targets = [n.target for n in traced.graph.nodes]
+        # `a` is updated through a view, and factory functions allocate distinct tensors
+        self.assertEqual(targets.count(operator.add), 2)
+        self.assertEqual(targets.count(torch.zeros), 2)
+        x = torch.rand(3)
+        self.assertEqual(traced(x), m(x))
+
+    def test_fold_constants(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.register_buffer('w', torch.rand(4, 5))
+                self.scale = torch.nn.Parameter(torch.rand(1))
+
+            def forward(self, x):
+                return torch.mm(x, self.w.t() * 2.0) * self.scale + self.w.size(0)
+
+        m = M()
+        traced = symbolic_trace(m)
+        optimization.fold_constants(traced)
+        traced.graph.lint(traced)
+        self.assertTrue(hasattr(traced, '_folded_constant_0'))
+        methods = [n.target for n in traced.graph.nodes if n.op == 'call_method']
+        self.assertNotIn('t', methods)
+        self.assertNotIn('size', methods)
+        # the parameter requires grad, so it is not folded
+        self.assertIn('scale', [n.target for n in traced.graph.nodes if n.op == 'get_attr'])
+        x = torch.rand(3, 5)
+        self.assertEqual(traced(x), m(x))
+
+    def test_fold_constants_mutation(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.register_buffer('buf', torch.zeros(3))
+
+            def forward(self, x):
+                self.buf.add_(1)
+                return x + self.buf * 2
+
+        traced = symbolic_trace(M())
+        optimization.fold_constants(traced)
+        traced.graph.lint(traced)
+        self.assertFalse(hasattr(traced, '_folded_constant_0'))
+        x = torch.zeros(3)
+        self.assertEqual(traced(x), torch.full((3,), 2.))
+        self.assertEqual(traced(x), torch.full((3,), 4.))
+
+    def test_shape_prop(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.lin = torch.nn.Linear(5, 6)
+
+            def forward(self, x):
+                y = self.lin(x).t()
+                return torch.split(y.relu(), 3)
+
+        traced = symbolic_trace(M())
+        x = torch.rand(4, 5)
+        ShapeProp(traced).propagate(x)
+        nodes = {n.target: n for n in traced.graph.nodes}
+        self.assertEqual(nodes['x'].shape, torch.Size([4, 5]))
+        self.assertEqual(nodes['lin'].shape, torch.Size([4, 6]))
+        self.assertEqual(nodes['lin'].dtype, torch.float)
+        self.assertEqual(nodes['lin'].nbytes, 4 * 6 * 4)
+        self.assertEqual(nodes['t'].aliases, [nodes['lin']])
+        self.assertEqual(nodes['relu'].aliases, [])
+        split = nodes[torch.split]
+        self.assertIsNone(split.shape)
+        self.assertEqual(split.nbytes, 4 * 6 * 4)
+        self.assertEqual(split.aliases, [nodes['relu']])
+
+    def test_plan_memory(self):
+        class M(torch.nn.Module):
+            def forward(self, x):
+                a = torch.relu(x)
+                b = torch.neg(a)
+                c = torch.sigmoid(b).t()
+                return torch.tanh(c)
+
+        traced = symbolic_trace(M())
+        with self.assertRaisesRegex(RuntimeError, 'ShapeProp'):
+            plan_memory(traced)
+        ShapeProp(traced).propagate(torch.rand(8, 8))
+        plan = plan_memory(traced)
+        nodes = {n.target: n for n in traced.graph.nodes}
+        size = 8 * 8 * 4
+        self.assertEqual(plan.lifetimes[nodes[torch.relu]], (1, 2))
+        # the view of sigmoid keeps it alive until tanh
+        self.assertEqual(plan.lifetimes[nodes[torch.sigmoid]], (3, 5))
+        self.assertNotIn(nodes['t'], plan.lifetimes)
+        self.assertEqual(plan.lifetimes[nodes[torch.tanh]], (5, 6))
+        self.assertEqual(plan.peak_bytes, 2 * size)
+        self.assertEqual(plan.buffer_sizes, [size, size])
+        self.assertEqual(plan.total_bytes, plan.peak_bytes)
+        self.assertEqual(plan.assignments[nodes[torch.relu]], plan.assignments[nodes[torch.sigmoid]])
+        self.assertNotEqual(plan.assignments[nodes[torch.neg]], plan.assignments[nodes[torch.relu]])
+        self.assertNotEqual(plan.assignments[nodes[torch.tanh]], plan.assignments[nodes[torch.sigmoid]])
+
+    def test_fuse_elementwise(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.w = torch.nn.Parameter(torch.rand(4))
+
+            def forward(self, x, y):
+                a = torch.relu(x * self.w + 1.0).sigmoid() - y
+                b = x + 2.0
+                return torch.mm(a, b * b)
+
+        m = M()
+        traced = symbolic_trace(m)
+        optimization.fuse_elementwise(traced)
+        traced.graph.lint(traced)
+        fused = [n for n in traced.graph.nodes if n.op == 'call_module']
+        self.assertEqual([n.target for n in fused], ['fused_elementwise_0'])
+        self.assertIsInstance(traced.fused_elementwise_0, optimization.FusedElementwise)
+        self.assertEqual(len(traced.fused_elementwise_0.fn.graph.nodes), 8)
+        # b is used twice, so it is not fused with b * b
+        self.assertIn(operator.add, [n.target for n in traced.graph.nodes])
+        x, y = torch.rand(4, 4), torch.rand(4, 4)
+        self.assertEqual(traced(x, y), m(x, y))
+        loaded = pickle.loads(pickle.dumps(traced))
+        self.assertEqual(loaded(x, y), m(x, y))
+
+    def test_fold_batch_norms(self):
+        class M(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.conv = torch.nn.Conv2d(3, 4, 3)
+                self.bn = torch.nn.BatchNorm2d(4)
+                self.shared = torch.nn.Conv2d(4, 4, 1)
+                self.bn2 = torch.nn.BatchNorm2d(4)
+                self.lin = torch.nn.Linear(4, 5)
+                self.bn3 = torch.nn.BatchNorm1d(5)
+
+            def forward(self, x):
+                x = self.bn(self.conv(x))
+                # a module called twice is not folded
+                x = self.shared(self.bn2(self.shared(x)))
+                return self.bn3(self.lin(x.mean([2, 3])))
+
+        m = M()
+        for bn in (m.bn, m.bn2, m.bn3):
+            bn.running_mean.uniform_()
+            bn.running_var.uniform_(0.5, 1.5)
+        m.eval()
+        x = torch.rand(2, 3, 8, 8)
+        traced = symbolic_trace(m)
+        # without the shapes recorded by ShapeProp, linear layers are not folded
+        optimization.fold_batch_norms(traced)
+        modules = [n.target for n in traced.graph.nodes if n.op == 'call_module']
+        self.assertEqual(modules, ['conv', 'shared', 'bn2', 'shared', 'lin', 'bn3'])
+
+        traced = symbolic_trace(m)
+        ShapeProp(traced).propagate(x)
+        optimization.fold_batch_norms(traced)
+        traced.graph.lint(traced)
+        modules = [n.target for n in traced.graph.nodes if n.op == 'call_module']
+        self.assertEqual(modules, ['conv', 'shared', 'bn2', 'shared', 'lin'])
+        self.assertEqual(traced(x), m(x))
+
+        # batch norm normalizes dimension 1 of 3D inputs, not the features of the linear layer
+        seq = torch.nn.Sequential(torch.nn.Linear(4, 3), torch.nn.BatchNorm1d(3)).eval()
+        traced = symbolic_trace(seq)
+        ShapeProp(traced).propagate(torch.rand(2, 3, 4))
+        optimization.fold_batch_norms(traced)
+        self.assertEqual([n.target for n in traced.graph.nodes if n.op == 'call_module'], ['0', '1'])
+
+        m.train()
+        traced = symbolic_trace(m)
+        optimization.fold_batch_norms(traced)
+        self.assertIn('bn', [n.target for n in traced.graph.nodes])
+
 if __name__ == '__main__':
     run_tests()
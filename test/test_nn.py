@@ -527,6 +527,25 @@ class TestNN(NNTestCase):
         test_fwd.remove()
         test_bwd.remove()
 
+    def test_hooks_toggle_fast_path(self):
+        # calls without hooks skip the hook bookkeeping; hooks added or removed
+        # between calls must still be honored
+        module = nn.Sigmoid()
+        input = torch.ones(2, 2)
+        calls = []
+        module(input)
+        handle = module.register_forward_pre_hook(lambda m, inp: calls.append('module'))
+        global_handle = torch.nn.modules.module.register_module_forward_pre_hook(
+            lambda m, inp: calls.append('global'))
+        module(input)
+        self.assertEqual(calls, ['global', 'module'])
+        handle.remove()
+        module(input)
+        self.assertEqual(calls, ['global', 'module', 'global'])
+        global_handle.remove()
+        module(input)
+        self.assertEqual(calls, ['global', 'module', 'global'])
+
     def test_hook_cpp(self):
         counter = [0]
         bn = nn.BatchNorm1d(5)
@@ -1747,6 +1766,44 @@ class TestNN(NNTestCase):
             clip_grad_norm_([p2], max_norm, norm_type=norm_type)
             self.assertEqual(p1.grad, p2.grad)
 
+    def test_clip_grad_norm_per_parameter_norms(self):
+        model = nn.Sequential(nn.Linear(10, 10), nn.Linear(10, 2))
+        ref = deepcopy(model)
+        flat = torch.nn.utils.FlatParameters(model)
+        input = torch.randn(4, 10)
+        for norm_type in [1.5, 2, 'inf']:
+            flat.zero_grad()
+            ref.zero_grad()
+            model(input).pow(2).sum().mul(100).backward()
+            ref(input).pow(2).sum().mul(100).backward()
+            expected = [torch.norm(p.grad, float(norm_type)) for p in ref.parameters()]
+            norm, norms = clip_grad_norm_(ref.parameters(), 1, norm_type=norm_type, per_parameter_norms=True)
+            self.assertEqual(norms, expected)
+            self.assertEqual(norm, torch.norm(torch.stack(expected), float(norm_type)))
+
+            # flat gradients are clipped as a whole, and like the separate gradients
+            flat_norm = clip_grad_norm_(flat.flat_params(), 1, norm_type=norm_type)
+            self.assertEqual(flat_norm, norm)
+            for p, p_ref in zip(model.parameters(), ref.parameters()):
+                self.assertEqual(p.grad, p_ref.grad)
+
+        norm, norms = clip_grad_norm_([nn.Parameter(torch.ones(2))], 1, per_parameter_norms=True)
+        self.assertEqual(norm, 0)
+        self.assertEqual(norms, [])
+
+    def test_clip_grad_norm_sparse(self):
+        # a sparse gradient first on its device is not flattened with the others
+        embedding, linear = nn.Embedding(10, 4, sparse=True), nn.Linear(4, 2)
+        linear(embedding(torch.tensor([1, 3, 3]))).pow(2).sum().mul(100).backward()
+        params = list(embedding.parameters()) + list(linear.parameters())
+        grads = [p.grad.to_dense() for p in params]
+        expected = torch.norm(torch.stack([torch.norm(g) for g in grads]))
+        norm = clip_grad_norm_(params, 1)
+        self.assertEqual(norm, expected)
+        self.assertTrue(params[0].grad.is_sparse)
+        for p, g in zip(params, grads):
+            self.assertEqual(p.grad.to_dense(), g * (1 / (expected + 1e-6)))
+
     def test_clip_grad_value(self):
         l = nn.Linear(10, 10)
         clip_value = 2.5
@@ -1789,6 +1846,93 @@ class TestNN(NNTestCase):
         sample = next(model.parameters())[0, 0, 0]
         self.assertTrue(torch.equal(sample.data, vec.data[:5]))
 
+    def test_flat_parameters(self):
+        model = nn.Sequential(nn.Linear(3, 4), nn.Linear(4, 2))
+        model[1].bias.requires_grad_(False)
+        ref = deepcopy(model)
+        flat = torch.nn.utils.FlatParameters(model)
+        self.assertEqual(flat.parameters(), list(model.parameters()))
+        self.assertIs(flat.parameters(), flat.parameters())
+        flat_params = flat.flat_params()
+        self.assertEqual([p.numel() for p in flat_params], [3 * 4 + 4 + 4 * 2, 2])
+        for p, p_ref in zip(model.parameters(), ref.parameters()):
+            self.assertEqual(p, p_ref)
+
+        input = torch.randn(5, 3)
+        model(input).sum().backward()
+        ref(input).sum().backward()
+        grad, = flat.flat_grads()
+        self.assertEqual(grad, torch.cat([p.grad.view(-1) for p in ref.parameters() if p.requires_grad]))
+
+        # an optimizer of the flat parameters updates the parameters of the model
+        torch.optim.SGD(flat_params, lr=0.1).step()
+        torch.optim.SGD(ref.parameters(), lr=0.1).step()
+        for p, p_ref in zip(model.parameters(), ref.parameters()):
+            self.assertEqual(p, p_ref)
+
+        # gradients reset to None become views of the flat gradients again
+        model.zero_grad(set_to_none=True)
+        model(input).sum().backward()
+        expected = torch.cat([p.grad.view(-1) for p in model.parameters() if p.requires_grad])
+        self.assertEqual(flat.flat_grads()[0], expected)
+        flat.zero_grad()
+        self.assertEqual(model[0].weight.grad, torch.zeros(4, 3))
+
+        # other modules do not invalidate the cached parameters
+        other = nn.Linear(2, 2)
+        other.extra = nn.Parameter(torch.ones(2))
+        self.assertIs(flat.flat_params()[0], flat_params[0])
+
+        # changing the parameters after handing out the flat ones is an error
+        model[0].extra = nn.Parameter(torch.ones(2))
+        with self.assertRaisesRegex(RuntimeError, "create a new FlatParameters"):
+            flat.flat_params()
+        model = nn.Sequential(nn.Linear(3, 4), nn.Linear(4, 2))
+        flat = torch.nn.utils.FlatParameters(model)
+        model.to(torch.double)
+        self.assertEqual(flat.flat_params()[0].dtype, torch.double)
+        model[0].weight.data = torch.zeros(4, 3, dtype=torch.double)
+        with self.assertRaisesRegex(RuntimeError, "create a new FlatParameters"):
+            flat.zero_grad()
+
+        # before that, the parameters are flattened again
+        model = nn.Sequential(nn.Linear(3, 4), nn.Linear(4, 2))
+        flat = torch.nn.utils.FlatParameters(model)
+        model[0].extra = nn.Parameter(torch.ones(2))
+        self.assertEqual(len(flat.parameters()), 5)
+        self.assertEqual(flat.flat_params()[0].numel(), 3 * 4 + 4 + 2 + 4 * 2 + 2)
+
+    def test_flat_parameters_buffers(self):
+        model = nn.Sequential(nn.Linear(3, 4), nn.BatchNorm1d(4), nn.BatchNorm1d(4))
+        ref = deepcopy(model)
+        flat = torch.nn.utils.FlatParameters(model)
+        self.assertEqual(flat.buffers(), list(model.buffers()))
+        flat_buffers = flat.flat_buffers()
+        # running statistics, and num_batches_tracked
+        self.assertEqual([(b.dtype, b.numel()) for b in flat_buffers], [(torch.float, 16), (torch.long, 2)])
+
+        input = torch.randn(5, 3)
+        model(input)
+        ref(input)
+        for b, b_ref in zip(model.buffers(), ref.buffers()):
+            self.assertEqual(b, b_ref)
+        # the running statistics are updated in place, while num_batches_tracked
+        # is replaced and copied back when the flat buffers are requested again
+        self.assertEqual(flat_buffers[0], torch.cat([b.view(-1) for b in ref.buffers() if b.is_floating_point()]))
+        self.assertIs(flat.flat_buffers()[1], flat_buffers[1])
+        self.assertEqual(flat_buffers[1], torch.ones(2, dtype=torch.long))
+        flat_buffers[0].zero_()
+        self.assertEqual(model[1].running_mean, torch.zeros(4))
+
+        # changing the buffers after handing out the flat ones is an error
+        model[1].register_buffer('extra', torch.ones(2))
+        with self.assertRaisesRegex(RuntimeError, "create a new FlatParameters"):
+            flat.flat_buffers()
+        # before that, the buffers are flattened again
+        flat = torch.nn.utils.FlatParameters(model)
+        model.to(torch.double)
+        self.assertEqual([b.dtype for b in flat.flat_buffers()], [torch.double, torch.long])
+
     # torch/nn/utils/prune.py
     @unittest.skipIf(not TEST_NUMPY, "numpy not found")
     def test_validate_pruning_amount_init(self):
@@ -9145,6 +9289,22 @@ class TestFusionEval(TestCase):
 
         self.assertEqual(Y_ref, Y_hat, msg="Conv+BN fusion results are off")
 
+    def test_fuse_linear_bn_eval(self):
+        inputs = torch.randn(8, 5, dtype=torch.double)
+        linear_ref = torch.nn.Linear(5, 6).double()
+        bn_ref = torch.nn.BatchNorm1d(6, affine=False).double()
+        bn_ref.running_mean = torch.randn(6, dtype=torch.double)
+        bn_ref.running_var = torch.rand(6, dtype=torch.double) + 0.5
+
+        linear_ref.eval()
+        bn_ref.eval()
+
+        Y_ref = bn_ref(linear_ref(inputs))
+        linear_bn_fused = torch.nn.utils.fuse_linear_bn_eval(linear_ref, bn_ref)
+        Y_hat = linear_bn_fused(inputs)
+
+        self.assertEqual(Y_ref, Y_hat, msg="Linear+BN fusion results are off")
+
 
 class TestAddRelu(TestCase):
     def test_add_relu(self):
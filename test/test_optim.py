@@ -13,7 +13,7 @@ from torch.autograd import Variable
 from torch import sparse
 from torch.optim.lr_scheduler import LambdaLR, MultiplicativeLR, StepLR, \
     MultiStepLR, ExponentialLR, CosineAnnealingLR, ReduceLROnPlateau, \
-    _LRScheduler, CyclicLR, CosineAnnealingWarmRestarts, OneCycleLR
+    _LRScheduler, CyclicLR, CosineAnnealingWarmRestarts, OneCycleLR, ChainedScheduler
 from torch.optim.swa_utils import AveragedModel, SWALR, update_bn
 from torch.testing._internal.common_utils import TestCase, run_tests, TEST_WITH_UBSAN, load_tests, \
     skipIfRocm
@@ -403,6 +403,53 @@ class TestOptim(TestCase):
             for p1, p2 in zip(res[0], res[1]):
                 self.assertEqual(p1, p2)
 
+    def test_multi_tensor_optimizers_grad_scaling(self):
+        optimizers = [
+            (optim_mt.Adam, dict(weight_decay=1., amsgrad=True)),
+            (optim_mt.Adam, dict(weight_decay=0., amsgrad=False)),
+            (optim_mt.AdamW, dict(weight_decay=1., amsgrad=False)),
+            (optim_mt.SGD, dict(lr=0.2, momentum=0.9, weight_decay=1, nesterov=True)),
+            (optim_mt.SGD, dict(lr=0.2, momentum=0.9, dampening=0.5, weight_decay=1)),
+            (optim_mt.SGD, dict(lr=0.2)),
+        ]
+        scale = 64.
+        for optimizer, kwargs in optimizers:
+            torch.manual_seed(0)
+            model = torch.nn.Sequential(torch.nn.Linear(2, 3), torch.nn.Sigmoid(), torch.nn.Linear(3, 1)).double()
+            ref = deepcopy(model)
+            opt = optimizer(model.parameters(), **kwargs)
+            opt_ref = optimizer(ref.parameters(), **kwargs)
+            input = torch.randn(4, 2, dtype=torch.double)
+            # a momentum buffer created by a skipped step differs with dampening, see SGD.step
+            skipped_steps = (3,) if kwargs.get('dampening') else (0, 1, 3)
+
+            for i in range(6):
+                opt.zero_grad()
+                opt_ref.zero_grad()
+                model(input).sum().mul(scale).backward()
+                ref(input).sum().backward()
+                found_inf = torch.zeros(1)
+                if i in skipped_steps:
+                    # a step with an inf gradient is skipped, and leaves the state unchanged
+                    model[0].weight.grad[0, 0] = inf
+                    params = [p.clone() for p in model.parameters()]
+                    states = [{k: v.clone() for k, v in opt.state[p].items() if torch.is_tensor(v)}
+                              for p in model.parameters()]
+                    opt.step(grad_scale=torch.tensor(scale), found_inf=found_inf, max_grad_norm=0.5)
+                    self.assertEqual(found_inf, torch.ones(1))
+                    for p, p_before, state in zip(model.parameters(), params, states):
+                        self.assertEqual(p, p_before)
+                        for key, value in state.items():
+                            self.assertEqual(opt.state[p][key], value)
+                    continue
+                torch.nn.utils.clip_grad_norm_(ref.parameters(), 0.5)
+                opt_ref.step()
+                opt.step(grad_scale=torch.tensor(scale), found_inf=found_inf, max_grad_norm=0.5)
+                self.assertEqual(found_inf, torch.zeros(1))
+                for p, p_ref in zip(model.parameters(), ref.parameters()):
+                    self.assertEqual(p.grad, p_ref.grad)
+                    # skipped steps do not count for the bias corrections of Adam
+                    self.assertEqual(p, p_ref)
 
     def test_adam(self):
         for optimizer in [optim.Adam, optim_mt.Adam]:
@@ -449,6 +496,47 @@ class TestOptim(TestCase):
             with self.assertRaisesRegex(ValueError, "Invalid weight_decay value: -1"):
                 optimizer(None, lr=1e-2, weight_decay=-1)
 
+        for moment_dtype in [torch.bfloat16, torch.int8]:
+            self._test_basic_cases(
+                lambda weight, bias: optim.Adam([weight, bias], lr=1e-3, amsgrad=True, moment_dtype=moment_dtype)
+            )
+        with self.assertRaisesRegex(ValueError, "Invalid moment_dtype: torch.int32"):
+            optim.Adam(None, lr=1e-2, moment_dtype=torch.int32)
+
+    def test_adam_compact_moments(self):
+        for optimizer in [optim.Adam, optim.AdamW]:
+            torch.manual_seed(0)
+            weight = torch.randn(100, 50, requires_grad=True)
+            weight_ref = weight.detach().clone().requires_grad_()
+            opt = optimizer([weight], lr=1e-3, amsgrad=True, moment_dtype=torch.int8)
+            opt_ref = optimizer([weight_ref], lr=1e-3, amsgrad=True)
+            for i in range(3):
+                grad = torch.randn(100, 50)
+                weight.grad, weight_ref.grad = grad.clone(), grad.clone()
+                opt.step()
+                opt_ref.step()
+                if i == 0:
+                    # the moments are compact from the first step on
+                    dtypes = {key: opt.state[weight][key].dtype for key in ['exp_avg', 'exp_avg_sq', 'max_exp_avg_sq']}
+                    self.assertEqual(dtypes, {'exp_avg': torch.int8, 'exp_avg_sq': torch.uint8,
+                                              'max_exp_avg_sq': torch.uint8})
+
+            state, state_ref = opt.state[weight], opt_ref.state[weight_ref]
+            self.assertEqual(state['exp_avg'].dtype, torch.int8)
+            self.assertEqual(state['exp_avg_sq'].dtype, torch.uint8)
+            self.assertEqual(state['exp_avg_absmax'].numel(), 3)  # 5000 values in blocks of 2048
+            self.assertEqual(weight, weight_ref, atol=5e-4, rtol=0)
+
+            # the state dict holds the moments like that of a regular optimizer
+            state_dict = opt.state_dict()
+            self.assertEqual(set(state_dict['state'][0]), set(state_ref))
+            for key in ['exp_avg', 'exp_avg_sq', 'max_exp_avg_sq']:
+                self.assertEqual(state_dict['state'][0][key].dtype, torch.float32)
+                self.assertEqual(state_dict['state'][0][key], state_ref[key],
+                                 atol=0.05 * state_ref[key].abs().max().item(), rtol=0)
+            opt_ref.load_state_dict(state_dict)
+            self.assertEqual(opt_ref.param_groups[0]['moment_dtype'], torch.int8)
+
     def test_adamw(self):
         for optimizer in [optim.AdamW, optim_mt.AdamW]:
             self._test_basic_cases(
@@ -468,18 +556,24 @@ class TestOptim(TestCase):
             with self.assertRaisesRegex(ValueError, "Invalid weight_decay value: -1"):
                 optimizer(None, lr=1e-2, weight_decay=-1)
 
+        for moment_dtype in [torch.bfloat16, torch.int8]:
+            self._test_basic_cases(
+                lambda weight, bias: optim.AdamW([weight, bias], lr=1e-3, amsgrad=True, moment_dtype=moment_dtype)
+            )
+
     def test_sparse_adam(self):
-        self._test_rosenbrock_sparse(
-            lambda params: optim.SparseAdam(params, lr=4e-2),
-            [],
-            True
-        )
-        with self.assertRaisesRegex(ValueError, "Invalid beta parameter at index 0: 1.0"):
-            optim.SparseAdam(None, lr=1e-2, betas=(1.0, 0.0))
-        with self.assertRaisesRegex(ValueError, "SparseAdam requires dense parameter tensors"):
-            optim.SparseAdam([torch.zeros(3, layout=torch.sparse_coo)])
-        with self.assertRaisesRegex(ValueError, "SparseAdam requires dense parameter tensors"):
-            optim.SparseAdam([{"params": [torch.zeros(3, layout=torch.sparse_coo)]}])
+        for optimizer in [optim.SparseAdam, optim_mt.SparseAdam]:
+            self._test_rosenbrock_sparse(
+                lambda params: optimizer(params, lr=4e-2),
+                [],
+                True
+            )
+            with self.assertRaisesRegex(ValueError, "Invalid beta parameter at index 0: 1.0"):
+                optimizer(None, lr=1e-2, betas=(1.0, 0.0))
+            with self.assertRaisesRegex(ValueError, "SparseAdam requires dense parameter tensors"):
+                optimizer([torch.zeros(3, layout=torch.sparse_coo)])
+            with self.assertRaisesRegex(ValueError, "SparseAdam requires dense parameter tensors"):
+                optimizer([{"params": [torch.zeros(3, layout=torch.sparse_coo)]}])
 
     # ROCm precision is too low to pass this test
     @skipIfRocm
@@ -505,43 +599,45 @@ class TestOptim(TestCase):
                 optimizer(None, lr=1e-2, rho=1.1)
 
     def test_adagrad(self):
-        self._test_basic_cases(
-            lambda weight, bias: optim.Adagrad([weight, bias], lr=1e-1)
-        )
-        self._test_basic_cases(
-            lambda weight, bias: optim.Adagrad([weight, bias], lr=1e-1,
-                                               initial_accumulator_value=0.1)
-        )
-        self._test_basic_cases(
-            lambda weight, bias: optim.Adagrad(
-                self._build_params_dict(weight, bias, lr=1e-2),
-                lr=1e-1)
-        )
-        self._test_basic_cases(
-            lambda weight, bias: optim.Adagrad(
-                self._build_params_dict(weight, bias, lr=1e-2),
-                lr=1e-1),
-            [lambda opt: ReduceLROnPlateau(opt)]
-        )
-        self._test_basic_cases(
-            lambda weight, bias: optim.Adagrad(
-                self._build_params_dict(weight, bias, lr=1e-2),
-                lr=1e-1),
-            [lambda opt: ReduceLROnPlateau(opt),
-             lambda opt: ExponentialLR(opt, gamma=0.99)]
-        )
-        with self.assertRaisesRegex(ValueError, "Invalid lr_decay value: -0.5"):
-            optim.Adagrad(None, lr=1e-2, lr_decay=-0.5)
+        for optimizer in [optim.Adagrad, optim_mt.Adagrad]:
+            self._test_basic_cases(
+                lambda weight, bias: optimizer([weight, bias], lr=1e-1)
+            )
+            self._test_basic_cases(
+                lambda weight, bias: optimizer([weight, bias], lr=1e-1,
+                                           initial_accumulator_value=0.1)
+            )
+            self._test_basic_cases(
+                lambda weight, bias: optimizer(
+                    self._build_params_dict(weight, bias, lr=1e-2),
+                    lr=1e-1)
+            )
+            self._test_basic_cases(
+                lambda weight, bias: optimizer(
+                    self._build_params_dict(weight, bias, lr=1e-2),
+                    lr=1e-1),
+                [lambda opt: ReduceLROnPlateau(opt)]
+            )
+            self._test_basic_cases(
+                lambda weight, bias: optimizer(
+                    self._build_params_dict(weight, bias, lr=1e-2),
+                    lr=1e-1),
+                [lambda opt: ReduceLROnPlateau(opt),
+                 lambda opt: ExponentialLR(opt, gamma=0.99)]
+            )
+            with self.assertRaisesRegex(ValueError, "Invalid lr_decay value: -0.5"):
+                optimizer(None, lr=1e-2, lr_decay=-0.5)
 
     def test_adagrad_sparse(self):
-        self._test_rosenbrock_sparse(
-            lambda params: optim.Adagrad(params, lr=1e-1)
-        )
-        self._test_rosenbrock_sparse(
-            lambda params: optim.Adagrad(params, lr=0.1),
-            [lambda opt: StepLR(opt, gamma=1 - 1e-5, step_size=500),
-             lambda opt: ReduceLROnPlateau(opt, threshold=1e-4)]
-        )
+        for optimizer in [optim.Adagrad, optim_mt.Adagrad]:
+            self._test_rosenbrock_sparse(
+                lambda params: optimizer(params, lr=1e-1)
+            )
+            self._test_rosenbrock_sparse(
+                lambda params: optimizer(params, lr=0.1),
+                [lambda opt: StepLR(opt, gamma=1 - 1e-5, step_size=500),
+                 lambda opt: ReduceLROnPlateau(opt, threshold=1e-4)]
+            )
 
     def test_adamax(self):
         for optimizer in [optim.Adamax, optim_mt.Adamax]:
@@ -624,14 +720,40 @@ class TestOptim(TestCase):
                 optimizer(None, lr=1e-2, etas=(1.0, 0.5))
 
     def test_lbfgs(self):
-        self._test_basic_cases(
-            lambda weight, bias: optim.LBFGS([weight, bias]),
-            ignore_multidevice=True
-        )
-        self._test_basic_cases(
-            lambda weight, bias: optim.LBFGS([weight, bias], line_search_fn="strong_wolfe"),
-            ignore_multidevice=True
-        )
+        for optimizer in [optim.LBFGS, optim_mt.LBFGS]:
+            self._test_basic_cases(
+                lambda weight, bias: optimizer([weight, bias]),
+                ignore_multidevice=True
+            )
+            self._test_basic_cases(
+                lambda weight, bias: optimizer([weight, bias], line_search_fn="strong_wolfe"),
+                ignore_multidevice=True
+            )
+
+    def test_lbfgs_flat_parameters(self):
+        # the multi tensor LBFGS updates parameters flattened by FlatParameters
+        # with single operations, with the same results
+        def run(optimizer, flatten):
+            torch.manual_seed(0)
+            model = torch.nn.Sequential(torch.nn.Linear(3, 4), torch.nn.Tanh(), torch.nn.Linear(4, 1)).double()
+            if flatten:
+                torch.nn.utils.FlatParameters(model)
+            input = torch.randn(8, 3, dtype=torch.double)
+            opt = optimizer(model.parameters(), line_search_fn="strong_wolfe")
+
+            def closure():
+                opt.zero_grad()
+                loss = model(input).pow(2).sum()
+                loss.backward()
+                return loss
+
+            for _ in range(3):
+                opt.step(closure)
+            return list(model.parameters())
+
+        expected = run(optim.LBFGS, False)
+        for p, p_ref in zip(run(optim_mt.LBFGS, True), expected):
+            self.assertEqual(p, p_ref)
 
     @unittest.skipIf(TEST_WITH_UBSAN, "division-by-zero error with UBSAN")
     def test_lbfgs_return_type(self):
@@ -1140,6 +1262,37 @@ class TestLRScheduler(TestCase):
         schedulers[1] = ExponentialLR(self.opt, gamma=0.1)
         self._test(schedulers, targets, epochs)
 
+    def test_chained_cosanneal_and_multistep_lr(self):
+        epochs = 10
+        eta_min = 1e-10
+        single_targets = [eta_min + (0.05 - eta_min) *
+                          (1 + math.cos(math.pi * x / epochs)) / 2
+                          for x in range(epochs)]
+        multipliers = [1] * 2 + [0.1] * 3 + [0.01] * 4 + [0.001]
+        single_targets = [x * y for x, y in zip(single_targets, multipliers)]
+        targets = [single_targets, list(map(lambda x: x * epochs, single_targets))]
+        scheduler = ChainedScheduler([CosineAnnealingLR(self.opt, T_max=epochs, eta_min=eta_min),
+                                      MultiStepLR(self.opt, gamma=0.1, milestones=[2, 5, 9])])
+        self._test([scheduler], targets, epochs)
+
+    def test_chained_lambda_and_exp_lr(self):
+        epochs = 10
+        lambdas = [lambda epoch: min(1., (epoch + 1) / 4), lambda epoch: 1.]
+        warmup = LambdaLR(self.opt, lr_lambda=lambdas)
+        scheduler = ChainedScheduler([warmup, ExponentialLR(self.opt, gamma=0.9)])
+        targets = [[0.05 * min(1., (x + 1) / 4) * 0.9 ** x for x in range(epochs)],
+                   [0.5 * 0.9 ** x for x in range(epochs)]]
+        self._test([scheduler], targets, epochs)
+        self.assertEqual(scheduler.get_last_lr(), [group['lr'] for group in self.opt.param_groups])
+
+        state_dict = deepcopy(scheduler.state_dict())
+        scheduler.step()
+        scheduler.load_state_dict(state_dict)
+        self.assertEqual(warmup.last_epoch, epochs)
+
+        with self.assertRaisesRegex(TypeError, "MultiplicativeLR has no closed form"):
+            ChainedScheduler([MultiplicativeLR(self.opt, lr_lambda=lambda epoch: 0.9)])
+
     def test_compound_reduce_lr_on_plateau1(self):
         epochs = 10
         for param_group in self.opt.param_groups:
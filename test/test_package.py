@@ -116,6 +116,112 @@ b = resources.load_binary('main', 'main_binary')
         self.assertEqual(m.t, "my string")
         self.assertEqual(m.b, "my string".encode('utf-8'))
 
+    def test_storage_dedup(self):
+        weight = torch.randn(4, 5)
+        filename = self.temp()
+        with PackageExporter(filename, verbose=False) as he:
+            he.save_pickle('obj', 'a.pkl', {'w': weight, 'zeros': torch.zeros(3), 'other_zeros': torch.zeros(3)})
+            he.save_pickle('obj', 'b.pkl', [weight.clone()])
+            # one record per distinct content
+            self.assertEqual(len(he.serialized_storages), 2)
+        hi = PackageImporter(filename)
+        a = hi.load_pickle('obj', 'a.pkl')
+        b = hi.load_pickle('obj', 'b.pkl')
+        self.assertEqual(a['w'], weight)
+        self.assertEqual(b[0], weight)
+        # identical contents still load as distinct storages
+        a['zeros'].add_(1)
+        self.assertEqual(a['other_zeros'], torch.zeros(3))
+
+    def test_blob_store(self):
+        from torch._package import BlobStore
+        backbone = torch.randn(10, 10)
+        with TemporaryDirectory() as directory:
+            store = BlobStore(directory)
+            filenames = []
+            for i in range(2):
+                filename = self.temp()
+                with PackageExporter(filename, verbose=False, blob_store=store) as he:
+                    he.save_pickle('model', 'state_dict.pkl', {'backbone': backbone, 'head': torch.full((3,), float(i))})
+                filenames.append(filename)
+            # the backbone is stored once, the two heads once each
+            self.assertEqual(len(list(Path(directory).iterdir())), 3)
+
+            for i, filename in enumerate(filenames):
+                state_dict = PackageImporter(filename, blob_store=store).load_pickle('model', 'state_dict.pkl')
+                self.assertEqual(state_dict['backbone'], backbone)
+                self.assertEqual(state_dict['head'], torch.full((3,), float(i)))
+
+            with self.assertRaisesRegex(RuntimeError, "exported with a blob store"):
+                PackageImporter(filenames[0]).load_pickle('model', 'state_dict.pkl')
+
+    def test_bytecode(self):
+        from unittest import mock
+        filename = self.temp()
+        with PackageExporter(filename, verbose=False, save_bytecode=True) as he:
+            he.save_source_file('foo', str(packaging_directory / 'module_a.py'))
+            he.save_source_file('foodir', str(packaging_directory / 'package_a'))
+        with mock.patch('torch._package.importer.compile', create=True) as compile_mock:
+            hi = PackageImporter(filename)
+            self.assertEqual(hi.import_module('foo').result, 'module_a')
+            self.assertEqual(hi.import_module('foodir.subpackage').result, 'package_a.subpackage')
+            compile_mock.assert_not_called()
+
+    def test_bytecode_stale(self):
+        from torch._package._importlib import _code_to_bytecode, _bytecode_to_code
+        source = b'result = 1\n'
+        data = _code_to_bytecode(compile(source, 'my_mod.py', 'exec', dont_inherit=True), source)
+        ns = {}
+        exec(_bytecode_to_code(data, source), ns)
+        self.assertEqual(ns['result'], 1)
+        # the bytecode no longer matches an edited source
+        self.assertIsNone(_bytecode_to_code(data, b'result = 2\n'))
+
+    def test_lazy_modules(self):
+        filename = self.temp()
+        with PackageExporter(filename, verbose=False) as he:
+            he.save_source_string('lazy_mod', 'raise RuntimeError("lazy_mod executed")\n')
+            he.save_source_string('eager_mod', 'result = 3\n')
+        hi = PackageImporter(filename, lazy_modules=True)
+        m = hi.import_module('lazy_mod')
+        self.assertEqual(m.__name__, 'lazy_mod')
+        with self.assertRaisesRegex(RuntimeError, "lazy_mod executed"):
+            m.anything
+        # the module that failed to load keeps failing, and is loaded again by the next import
+        with self.assertRaisesRegex(RuntimeError, "lazy_mod executed"):
+            m.anything
+        m2 = hi.import_module('lazy_mod')
+        self.assertIsNot(m2, m)
+        with self.assertRaisesRegex(RuntimeError, "lazy_mod executed"):
+            m2.anything
+        self.assertEqual(hi.import_module('eager_mod').result, 3)
+        with self.assertRaisesRegex(RuntimeError, "lazy_mod executed"):
+            PackageImporter(filename).import_module('lazy_mod')
+
+    def test_dependency_cache(self):
+        from unittest import mock
+        import torch._package.find_file_dependencies as find_file_dependencies
+        with TemporaryDirectory() as directory:
+            cache = str(Path(directory) / 'deps.json')
+            packages = []
+            for i in range(2):
+                filename = self.temp()
+                with mock.patch.object(find_file_dependencies, 'find_files_source_depends_on',
+                                       wraps=find_file_dependencies.find_files_source_depends_on) as find_mock:
+                    with PackageExporter(filename, verbose=False, dependency_cache=cache) as he:
+                        he.save_source_file('foodir', str(packaging_directory / 'package_a'))
+                    # the second export does not parse the unchanged sources again
+                    self.assertEqual(find_mock.called, i == 0)
+                packages.append(filename)
+            for filename in packages:
+                s = PackageImporter(filename).import_module('foodir.subpackage')
+                self.assertEqual(s.result, 'package_a.subpackage')
+
+            dependency_cache = find_file_dependencies.DependencyCache(cache)
+            src = 'import math\n'
+            self.assertEqual(dependency_cache.find_files_source_depends_on(src, 'foo'), [('math', None)])
+            self.assertTrue(dependency_cache.dirty)
+
     def test_extern(self):
         filename = self.temp()
         with PackageExporter(filename, verbose=False) as he:
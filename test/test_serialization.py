@@ -11,6 +11,7 @@ import copy
 import pickle
 import shutil
 import pathlib
+from collections import OrderedDict
 
 from torch._utils_internal import get_file_path_2
 from torch._utils import _rebuild_tensor
@@ -744,6 +745,122 @@ class TestSerialization(TestCase, SerializationMixin):
             torch.save(model, path)
             torch.load(path)
 
+    @unittest.skipIf(IS_WINDOWS, "NamedTemporaryFile on windows")
+    def test_serialization_mmap(self):
+        data = {
+            'float': torch.randn(5, 3),
+            'double': torch.randn(7, dtype=torch.double),
+            'int': torch.arange(11),
+            'bool': torch.tensor([True, False, True]),
+            'empty': torch.empty(0),
+        }
+        data['view'] = data['float'][1:, 1]
+        with tempfile.NamedTemporaryFile() as f:
+            torch.save(data, f)
+            f.flush()
+            result = torch.load(f.name, mmap=True)
+            self.assertEqual(result, data)
+            # views keep sharing their storage
+            self.assertEqual(result['view'].storage().data_ptr(), result['float'].storage().data_ptr())
+            # writes are private to the loaded tensors
+            result['float'].zero_()
+            self.assertEqual(torch.load(f.name)['float'], data['float'])
+            self.assertEqual(torch.load(pathlib.Path(f.name), mmap=True), data)
+
+    @unittest.skipIf(IS_WINDOWS, "NamedTemporaryFile on windows")
+    def test_serialization_mmap_errors(self):
+        buf = io.BytesIO()
+        torch.save(torch.randn(3), buf)
+        buf.seek(0)
+        with self.assertRaisesRegex(ValueError, "mmap=True requires f to be a file name"):
+            torch.load(buf, mmap=True)
+        with tempfile.NamedTemporaryFile() as f:
+            torch.serialization.save(torch.randn(3), f, _use_new_zipfile_serialization=False)
+            f.flush()
+            with self.assertRaisesRegex(RuntimeError, "only supported for files saved with the zipfile"):
+                torch.load(f.name, mmap=True)
+
+    def test_lazy_load(self):
+        model = torch.nn.Sequential(torch.nn.Linear(3, 4), torch.nn.BatchNorm1d(4))
+        state_dict = model.state_dict()
+        checkpoint = {'model': state_dict, 'step': 10, 'shared': [state_dict['0.weight'][1]]}
+
+        buf = io.BytesIO()
+        torch.save(checkpoint, buf)
+        buf.seek(0)
+        with torch.serialization.lazy_load(buf) as lazy:
+            self.assertEqual(set(lazy.keys()), set(checkpoint.keys()))
+            self.assertEqual(len(lazy._loaded_storages), 0)
+            self.assertEqual(lazy['step'], 10)
+            self.assertEqual(len(lazy._loaded_storages), 0)
+            loaded = lazy['model']
+            self.assertIsInstance(loaded, OrderedDict)
+            self.assertEqual(loaded, state_dict)
+            self.assertEqual(loaded._metadata, state_dict._metadata)
+            model.load_state_dict(loaded)
+            # views keep sharing their storage across keys
+            shared = lazy.load(['shared'])['shared'][0]
+            self.assertEqual(shared.storage().data_ptr(), loaded['0.weight'].storage().data_ptr())
+            with self.assertRaisesRegex(KeyError, "keys not found in checkpoint"):
+                lazy.load(['optimizer'])
+        with self.assertRaisesRegex(RuntimeError, "closed LazyCheckpoint"):
+            lazy['model']
+
+    def test_lazy_load_partial(self):
+        state_dict = torch.nn.Linear(3, 4).state_dict()
+        buf = io.BytesIO()
+        torch.save(state_dict, buf)
+        buf.seek(0)
+        lazy = torch.serialization.lazy_load(buf)
+        loaded = lazy.load(['bias'])
+        self.assertEqual(list(loaded.keys()), ['bias'])
+        self.assertEqual(loaded['bias'], state_dict['bias'])
+        self.assertEqual(len(lazy._loaded_storages), 1)
+        self.assertEqual(lazy.load(), state_dict)
+
+    @unittest.skipIf(IS_WINDOWS, "NamedTemporaryFile on windows")
+    def test_lazy_load_file(self):
+        state_dict = torch.nn.Linear(3, 4).state_dict()
+        with tempfile.NamedTemporaryFile() as f:
+            torch.save(state_dict, f)
+            f.flush()
+            for mmap in (False, True):
+                with torch.serialization.lazy_load(f.name, mmap=mmap) as lazy:
+                    self.assertEqual(lazy['weight'], state_dict['weight'])
+            torch.save(torch.randn(3), f.name)
+            with self.assertRaisesRegex(TypeError, "use torch.load instead"):
+                torch.serialization.lazy_load(f.name)
+
+    def test_save_num_threads(self):
+        data = self._test_serialization_data()
+        for num_threads in (1, 4):
+            buf = io.BytesIO()
+            torch.save(data, buf, num_threads=num_threads)
+            buf.seek(0)
+            self.assertEqual(torch.load(buf), data)
+        with self.assertRaisesRegex(ValueError, "num_threads should be a non-negative integer"):
+            torch.save(data, io.BytesIO(), num_threads=-1)
+
+    def test_save_async(self):
+        state_dict = torch.nn.Linear(5, 7).state_dict()
+        expected = copy.deepcopy(state_dict)
+        for num_threads in (0, 2):
+            buf = io.BytesIO()
+            future = torch.serialization.save_async(state_dict, buf, num_threads=num_threads)
+            # the saved data is snapshotted before save_async returns
+            for v in state_dict.values():
+                v.add_(1)
+            self.assertIsNone(future.result())
+            buf.seek(0)
+            self.assertEqual(torch.load(buf), expected)
+            expected = copy.deepcopy(state_dict)
+
+    def test_save_async_error(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            future = torch.serialization.save_async(torch.randn(3), os.path.join(dirname, 'missing', 'x.pt'))
+            with self.assertRaises(FileNotFoundError):
+                future.result()
+
     def run(self, *args, **kwargs):
         with serialization_method(use_zip=True):
             return super(TestSerialization, self).run(*args, **kwargs)
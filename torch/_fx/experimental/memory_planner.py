@@ -0,0 +1,104 @@
+from typing import Any, Dict, List, NamedTuple, Tuple
+from torch._fx.graph_module import GraphModule
+from torch._fx.node import Node, map_arg
+
+
+class MemoryPlan(NamedTuple):
+    """
+    Static memory plan of the intermediate values of a graph.
+
+    - `lifetimes`: for each node that allocates memory, the indices (in `graph.nodes`) of the
+      node and of the last node that uses its value or a view of it. Values that are part of the
+      graph's result live until the end of the graph (index `len(graph.nodes)`).
+    - `peak_bytes`: the maximum number of bytes of intermediate values alive at the same time,
+      a lower bound of the memory needed to run the graph.
+    - `buffer_sizes`: the sizes of the buffers of the plan, in bytes.
+    - `assignments`: the index (in `buffer_sizes`) of the buffer each value is stored in. Values
+      whose lifetimes do not overlap share buffers.
+    """
+    lifetimes: Dict[Node, Tuple[int, int]]
+    peak_bytes: int
+    buffer_sizes: List[int]
+    assignments: Dict[Node, int]
+
+    @property
+    def total_bytes(self) -> int:
+        """ the number of bytes of all the buffers of the plan """
+        return sum(self.buffer_sizes)
+
+def compute_lifetimes(fx_module: GraphModule) -> Dict[Node, Tuple[int, int]]:
+    """Returns the lifetimes of the values allocated by the nodes of `fx_module.graph` (see
+    :class:`MemoryPlan`), from the properties recorded by
+    :class:`~torch._fx.experimental.shape_prop.ShapeProp`.
+
+    Only the values of `call_function`, `call_method` and `call_module` nodes are considered:
+    inputs and attributes are not owned by the graph. Nodes computing views of other values
+    (or updating them in place) allocate no memory, but keep the values they alias alive."""
+    nodes = fx_module.graph.nodes
+    if any(not hasattr(node, 'nbytes') for node in nodes):
+        raise RuntimeError('compute_lifetimes needs the properties recorded by ShapeProp; '
+                           'call ShapeProp(fx_module).propagate(...) first')
+    index = {node: i for i, node in enumerate(nodes)}
+    last_use = {node: max((index[user] for user in node.users), default=i)
+                for i, node in enumerate(nodes)}
+    map_arg(fx_module.graph.result, lambda n: last_use.__setitem__(n, len(nodes)))
+    # ShapeProp records the node that computed each storage first, so views of views alias the
+    # original value directly
+    for node in nodes:
+        for owner in node.aliases:
+            last_use[owner] = max(last_use[owner], last_use[node])
+    return {node: (index[node], last_use[node]) for node in nodes
+            if node.op in ('call_function', 'call_method', 'call_module')
+            and node.nbytes > 0 and not node.aliases}
+
+def plan_memory(fx_module: GraphModule) -> MemoryPlan:
+    """Computes a static memory plan of the intermediate values of `fx_module.graph`, from the
+    properties recorded by :class:`~torch._fx.experimental.shape_prop.ShapeProp`.
+
+    Buffers are assigned greedily by size: each value, from the largest to the smallest, is
+    stored in the smallest existing buffer on its device that is free during its lifetime, or in
+    a new buffer otherwise.
+
+    Example:
+        gm = symbolic_trace(model)
+        ShapeProp(gm).propagate(torch.rand(1, 3, 224, 224))
+        plan = plan_memory(gm)
+        print(plan.peak_bytes, plan.total_bytes)
+    """
+    lifetimes = compute_lifetimes(fx_module)
+
+    events : List[Tuple[int, int]] = []
+    for node, (start, end) in lifetimes.items():
+        # a value is alive from its node to its last use, inclusively
+        events.append((start, node.nbytes))
+        events.append((end + 1, -node.nbytes))
+    peak_bytes = live_bytes = 0
+    # frees are sorted before allocations at the same index
+    for _, delta in sorted(events):
+        live_bytes += delta
+        peak_bytes = max(peak_bytes, live_bytes)
+
+    buffer_sizes : List[int] = []
+    buffer_devices : List[Any] = []
+    buffer_lifetimes : List[List[Tuple[int, int]]] = []
+    assignments : Dict[Node, int] = {}
+    for node in sorted(lifetimes, key=lambda n: (-n.nbytes, lifetimes[n][0])):
+        start, end = lifetimes[node]
+        device = node.device
+        best = None
+        for i, size in enumerate(buffer_sizes):
+            if buffer_devices[i] != device:
+                continue
+            if any(start <= e and s <= end for s, e in buffer_lifetimes[i]):
+                continue
+            # values are visited by decreasing size, so every buffer is large enough
+            if best is None or size < buffer_sizes[best]:
+                best = i
+        if best is None:
+            best = len(buffer_sizes)
+            buffer_sizes.append(node.nbytes)
+            buffer_devices.append(device)
+            buffer_lifetimes.append([])
+        buffer_lifetimes[best].append((start, end))
+        assignments[node] = best
+    return MemoryPlan(lifetimes, peak_bytes, buffer_sizes, assignments)
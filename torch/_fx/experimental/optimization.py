@@ -0,0 +1,463 @@
+import inspect
+import operator
+import torch
+from typing import Any, Dict, List, Optional, Set, Tuple
+from torch._fx.graph import Graph
+from torch._fx.graph_module import GraphModule
+from torch._fx.node import Node, Argument, base_types, map_arg
+
+
+"""Functions with side effects or nondeterministic results, whose calls must be neither removed,
+merged nor precomputed"""
+_IMPURE_FUNCTIONS = {
+    torch.Assert, print,
+    torch.rand, torch.randn, torch.randint, torch.randperm, torch.rand_like, torch.randn_like,
+    torch.randint_like, torch.bernoulli, torch.multinomial, torch.normal, torch.poisson,
+    torch.dropout, torch.alpha_dropout, torch.feature_alpha_dropout, torch.feature_dropout,
+    torch.nn.functional.dropout, torch.nn.functional.dropout2d, torch.nn.functional.dropout3d,
+    torch.nn.functional.alpha_dropout, torch.nn.functional.feature_alpha_dropout,
+    torch.nn.functional.gumbel_softmax, torch.nn.functional.rrelu,
+    operator.setitem, operator.delitem,
+    operator.iadd, operator.isub, operator.imul, operator.itruediv, operator.ifloordiv,
+    operator.imod, operator.ipow, operator.ilshift, operator.irshift, operator.iand,
+    operator.ior, operator.ixor, operator.imatmul,
+}
+
+"""Tensor methods with nondeterministic results"""
+_IMPURE_METHODS = {'bernoulli', 'multinomial', 'random_', 'uniform_', 'normal_'}
+
+_inplace_param_cache : Dict[Any, bool] = {}
+
+def _has_inplace_param(fn: Any) -> bool:
+    if fn not in _inplace_param_cache:
+        try:
+            _inplace_param_cache[fn] = 'inplace' in inspect.signature(fn).parameters
+        except (TypeError, ValueError):
+            _inplace_param_cache[fn] = False
+    return _inplace_param_cache[fn]
+
+def _is_inplace_call(node: Node) -> bool:
+    if node.kwargs.get('inplace', False) or 'out' in node.kwargs:
+        return True
+    if node.op == 'call_function' and _has_inplace_param(node.target):
+        try:
+            bound = inspect.signature(node.target).bind(*node.args, **node.kwargs)
+        except TypeError:
+            return True
+        return bool(bound.arguments.get('inplace', False))
+    return False
+
+def is_pure(node: Node) -> bool:
+    """Whether `node` only computes its value: it has no side effects (e.g. in-place updates
+    or assertions) and always computes the same value from the same inputs. Pure nodes can be
+    removed when unused, merged with identical nodes and precomputed.
+
+    `call_module` nodes are never considered pure, since modules may update their state (e.g.
+    the running statistics of batch norm) or be random (e.g. dropout)."""
+    if node.op == 'get_attr':
+        return True
+    if node.op == 'call_function':
+        if node.target in _IMPURE_FUNCTIONS:
+            return False
+        # e.g. operator.and_, whose in-place variant is operator.iand
+        if getattr(node.target, '__module__', None) == '_operator':
+            return True
+        name = getattr(node.target, '__name__', '')
+    elif node.op == 'call_method':
+        assert isinstance(node.target, str)
+        if node.target in _IMPURE_METHODS:
+            return False
+        name = node.target
+    else:
+        return False
+    # in-place variants, e.g. torch.relu_ or Tensor.add_
+    if name.endswith('_') and not name.endswith('__'):
+        return False
+    return not _is_inplace_call(node)
+
+def eliminate_dead_code(fx_module: GraphModule) -> GraphModule:
+    """Erases the pure nodes (see :func:`is_pure`) of `fx_module.graph` whose values are not used,
+    and regenerates the code of `fx_module`. Returns `fx_module`."""
+    graph = fx_module.graph
+    # users come after the nodes they use, so visiting nodes in reverse order erases whole
+    # dead subgraphs in one pass
+    for node in reversed(graph.nodes):
+        if node.uses == 0 and is_pure(node):
+            graph.erase_node(node)
+    fx_module.graph = graph
+    return fx_module
+
+"""Functions and tensor methods whose result may share its storage with their first argument"""
+_VIEW_FUNCTIONS = {
+    operator.getitem, torch.reshape, torch.flatten, torch.squeeze, torch.unsqueeze, torch.t,
+    torch.transpose, torch.narrow, torch.select, torch.split, torch.chunk, torch.unbind,
+    torch.diagonal, torch.as_strided, torch.detach, torch.view_as_real, torch.view_as_complex,
+}
+_VIEW_METHODS = {
+    '__getitem__', 'view', 'view_as', 'reshape', 'reshape_as', 'flatten', 'unflatten', 'squeeze',
+    'unsqueeze', 't', 'transpose', 'permute', 'expand', 'expand_as', 'narrow', 'select', 'split',
+    'chunk', 'unbind', 'unfold', 'diagonal', 'as_strided', 'detach', 'contiguous', 'real', 'imag',
+    'type_as', 'to', 'float', 'double', 'half', 'int', 'long', 'cpu', 'cuda',
+}
+
+"""Functions allocating a new tensor, which must not be merged since each call owns its storage"""
+_FACTORY_FUNCTIONS = {
+    torch.empty, torch.empty_like, torch.empty_strided, torch.zeros, torch.zeros_like, torch.ones,
+    torch.ones_like, torch.full, torch.full_like, torch.arange, torch.range, torch.linspace,
+    torch.logspace, torch.eye, torch.tensor, torch.as_tensor,
+}
+
+def _is_view(node: Node) -> bool:
+    if node.op == 'call_function':
+        return node.target in _VIEW_FUNCTIONS
+    return node.op == 'call_method' and node.target in _VIEW_METHODS
+
+def _may_mutate_args(node: Node, modules: Dict[str, torch.nn.Module]) -> bool:
+    if node.op == 'call_module':
+        # e.g. torch.nn.ReLU(inplace=True)
+        return bool(getattr(modules.get(node.target), 'inplace', False))  # type: ignore
+    return node.op in ('call_function', 'call_method') and not is_pure(node)
+
+def _mutated_nodes(fx_module: GraphModule) -> Set[Node]:
+    # Returns the nodes of `fx_module.graph` whose values may be updated in place after they are
+    # computed, either directly (e.g. `a.add_(1)`, `torch.add(x, y, out=a)` or `a[0] = 1`) or
+    # through a view of them, and the views of such nodes.
+    modules = dict(fx_module.named_modules())
+    mutated : Set[Node] = set()
+    # users come after the nodes they use, so the views of a node are visited before it
+    for node in reversed(fx_module.graph.nodes):
+        if any(_may_mutate_args(user, modules) or (user in mutated and _is_view(user))
+               for user in node.users):
+            mutated.add(node)
+    # each access to an attribute is a separate `get_attr` node
+    mutated_attrs = {node.target for node in mutated if node.op == 'get_attr'}
+    for node in fx_module.graph.nodes:
+        if node.op == 'get_attr' and node.target in mutated_attrs:
+            mutated.add(node)
+        elif _is_view(node) and node.args and isinstance(node.args[0], Node) and node.args[0] in mutated:
+            mutated.add(node)
+    return mutated
+
+def _hashable_arg(a: Argument) -> Any:
+    # Returns a hashable key of `a`. Constants are keyed with their type, so that e.g.
+    # `x + 1` and `x + 1.0` are not merged.
+    if isinstance(a, (tuple, list)):
+        return (type(a), tuple(_hashable_arg(elem) for elem in a))
+    elif isinstance(a, dict):
+        return (dict, tuple((k, _hashable_arg(v)) for k, v in a.items()))
+    elif isinstance(a, slice):
+        return (slice, _hashable_arg(a.start), _hashable_arg(a.stop), _hashable_arg(a.step))
+    elif isinstance(a, (Node, torch.Tensor)):
+        # by identity
+        return a
+    return (type(a), a)
+
+def eliminate_common_subexpressions(fx_module: GraphModule) -> GraphModule:
+    """Merges the pure nodes (see :func:`is_pure`) of `fx_module.graph` that apply the same
+    operation to the same arguments, and regenerates the code of `fx_module`. Returns
+    `fx_module`.
+
+    Nodes are not merged when their values, the values of their arguments or views of these
+    values are updated in place by the graph, since the merged nodes could then observe
+    different values. Calls to factory functions (e.g. `torch.zeros`) are not merged either, as
+    each of them allocates a distinct tensor."""
+    graph = fx_module.graph
+    mutated = _mutated_nodes(fx_module)
+    seen : Dict[Tuple[Any, ...], Node] = {}
+    for node in graph.nodes:
+        if not is_pure(node) or node in mutated:
+            continue
+        if node.op == 'call_function' and node.target in _FACTORY_FUNCTIONS:
+            continue
+        inputs : Set[Node] = set()
+        map_arg((node.args, node.kwargs), lambda n: inputs.add(n))
+        if any(n in mutated for n in inputs):
+            continue
+        # the arguments of `node` already refer to the representatives of merged nodes
+        try:
+            key = (node.op, node.target, _hashable_arg(node.args), _hashable_arg(node.kwargs))
+            existing = seen.get(key)
+        except TypeError:
+            # unhashable constant
+            continue
+        if existing is None:
+            seen[key] = node
+        else:
+            node.replace_all_uses_with(existing)
+            graph.erase_node(node)
+    fx_module.graph = graph
+    return fx_module
+
+def _fetch_attr(fx_module: GraphModule, target: str) -> Any:
+    attr_itr = fx_module
+    for atom in target.split('.'):
+        attr_itr = getattr(attr_itr, atom)
+    return attr_itr
+
+def fold_constants(fx_module: GraphModule, prefix: str = '_folded_constant') -> GraphModule:
+    """Precomputes the pure `call_function` and `call_method` nodes of `fx_module.graph` whose
+    inputs only depend on attributes of `fx_module` (`get_attr` nodes) and literals. Each such
+    subgraph is replaced by a buffer of `fx_module` named `<prefix>_<i>`, or by a literal when
+    its value is a number, a string, a boolean or a dtype. Dead nodes are then eliminated.
+    Returns `fx_module`.
+
+    Values computed from tensors that require grad (e.g. trainable parameters) are not folded,
+    since their buffers would not follow the parameters. To fold them for inference, call
+    `requires_grad_(False)` on the parameters first. Likewise, values that the graph updates in
+    place, directly or through a view (e.g. `self.buf.add_(1)`), are not constants and are
+    not folded, nor is anything computed from them.
+    """
+    graph = fx_module.graph
+    mutated = _mutated_nodes(fx_module)
+    values : Dict[Node, Any] = {}
+    folded : List[Node] = []
+
+    def load_arg(a: Argument) -> Any:
+        return map_arg(a, lambda n: values[n])
+
+    with torch.no_grad():
+        for node in graph.nodes:
+            if not is_pure(node) or node in mutated:
+                continue
+            inputs = set()
+            map_arg((node.args, node.kwargs), lambda n: inputs.add(n))
+            if not all(n in values for n in inputs):
+                continue
+            if node.op == 'get_attr':
+                assert isinstance(node.target, str)
+                value = _fetch_attr(fx_module, node.target)
+                if isinstance(value, torch.Tensor) and value.requires_grad:
+                    continue
+                values[node] = value
+                continue
+            args, kwargs = load_arg(node.args), load_arg(node.kwargs)
+            if node.op == 'call_function':
+                value = node.target(*args, **kwargs)
+            else:
+                self_obj, *args_tail = args
+                value = getattr(self_obj, node.target)(*args_tail, **kwargs)
+            values[node] = value
+            folded.append(node)
+
+    def is_folded_output(node: Node) -> bool:
+        # whether the value of `node` is needed by a node that is not folded
+        return any(user not in values for user in node.users) or node.uses > len(node.users)
+
+    counter = 0
+    for node in folded:
+        if not is_folded_output(node):
+            continue
+        value = values[node]
+        if isinstance(value, base_types) and not isinstance(value, torch.Tensor):
+            literal : Optional[Argument] = value
+        elif isinstance(value, torch.Tensor):
+            while hasattr(fx_module, f'{prefix}_{counter}'):
+                counter += 1
+            name = f'{prefix}_{counter}'
+            fx_module.register_buffer(name, value)
+            with graph.inserting_before(node):
+                literal = graph.get_attr(name)
+        else:
+            # e.g. a tuple of tensors, which cannot be stored as a buffer
+            continue
+        for user in list(node.users):
+            replace = lambda n: literal if n is node else n  # noqa: E731
+            user.args = map_arg(user.args, replace)  # type: ignore
+            user.kwargs = map_arg(user.kwargs, replace)  # type: ignore
+        if node.uses > 0:
+            graph.output(map_arg(graph.result, lambda n: literal if n is node else n))
+    return eliminate_dead_code(fx_module)
+
+"""Elementwise operations that fuse_elementwise may merge into a single callable"""
+_ELEMENTWISE_FUNCTIONS = {
+    torch.add, torch.sub, torch.mul, torch.div, torch.true_divide, torch.neg, torch.abs,
+    torch.relu, torch.sigmoid, torch.tanh, torch.exp, torch.log, torch.sqrt, torch.rsqrt,
+    torch.reciprocal, torch.clamp, torch.pow,
+    operator.add, operator.sub, operator.mul, operator.truediv, operator.neg, operator.pow,
+}
+_ELEMENTWISE_METHODS = {
+    'add', 'sub', 'mul', 'div', 'true_divide', 'neg', 'abs', 'relu', 'sigmoid', 'tanh', 'exp',
+    'log', 'sqrt', 'rsqrt', 'reciprocal', 'clamp', 'pow',
+}
+
+def _is_elementwise(node: Node) -> bool:
+    if node.op == 'call_function':
+        if node.target not in _ELEMENTWISE_FUNCTIONS:
+            return False
+    elif node.op == 'call_method':
+        if node.target not in _ELEMENTWISE_METHODS:
+            return False
+    else:
+        return False
+    # the fused code can only refer to other values and to scalar literals
+    args = list(node.args) + list(node.kwargs.values())
+    return (any(isinstance(a, Node) for a in args) and
+            all(isinstance(a, (Node, int, float, bool)) or a is None for a in args) and
+            is_pure(node))
+
+class FusedElementwise(torch.nn.Module):
+    """
+    Chain of elementwise operations merged by :func:`fuse_elementwise`. `fn` is a `GraphModule`
+    running the operations in Python; when `script` is set, calls whose arguments are all tensors
+    run a TorchScript version of `fn` instead, which the JIT fuser can compile into a single
+    kernel that does not allocate the intermediate values of the chain.
+    """
+    def __init__(self, fn: GraphModule, script: bool = True):
+        super().__init__()
+        self.fn = fn
+        self.script = script
+        self._init_scripted()
+
+    def _init_scripted(self):
+        # scripted modules cannot be pickled, so they are not submodules and are compiled again
+        # after unpickling
+        scripted : Optional[torch.jit.ScriptModule] = None
+        if self.script:
+            try:
+                scripted = torch.jit.script(self.fn)
+            except Exception:
+                # e.g. an operation TorchScript does not support
+                pass
+        self.__dict__['_scripted'] = scripted
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_scripted']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_scripted()
+
+    def forward(self, *args):
+        scripted = self.__dict__['_scripted']
+        if scripted is not None and all(isinstance(a, torch.Tensor) for a in args):
+            return scripted(*args)
+        return self.fn(*args)
+
+def fuse_elementwise(fx_module: GraphModule, script: bool = True, prefix: str = 'fused_elementwise') -> GraphModule:
+    """Replaces the chains of elementwise operations (e.g. `torch.relu(x * w + b)`) of
+    `fx_module.graph` by calls to :class:`FusedElementwise` submodules named `<prefix>_<i>`, and
+    regenerates the code of `fx_module`. Returns `fx_module`.
+
+    A chain is a set of at least two pure elementwise nodes whose values are each used exactly
+    once by another node of the set, except for the last node of the chain. Only the value of
+    the last node is visible outside of the chain, so the intermediate values never need to be
+    materialized."""
+    graph = fx_module.graph
+    # last node of each chain under construction -> the nodes of the chain, in a valid order
+    chains : Dict[Node, List[Node]] = {}
+    for node in graph.nodes:
+        if not _is_elementwise(node):
+            continue
+        chain : List[Node] = []
+        inputs : Dict[Node, None] = {}
+        map_arg((node.args, node.kwargs), lambda n: inputs.setdefault(n))
+        for n in inputs:
+            # `node` is the only user of n, so the chain of n can be extended by node
+            if n in chains and n.uses == 1:
+                chain.extend(chains.pop(n))
+        chain.append(node)
+        chains[node] = chain
+
+    counter = 0
+    for last, chain in chains.items():
+        if len(chain) < 2:
+            continue
+        members = set(chain)
+        chain_inputs : Dict[Node, None] = {}
+        for node in chain:
+            map_arg((node.args, node.kwargs),
+                    lambda n: chain_inputs.setdefault(n) if n not in members else None)
+
+        fused_graph = Graph()
+        env : Dict[Node, Node] = {}
+        for n in chain_inputs:
+            env[n] = fused_graph.placeholder(n.name)
+        for node in chain:
+            env[node] = fused_graph.node_copy(node, lambda n: env[n])
+        fused_graph.output(env[last])
+
+        while hasattr(fx_module, f'{prefix}_{counter}'):
+            counter += 1
+        name = f'{prefix}_{counter}'
+        fx_module.add_module(name, FusedElementwise(GraphModule(torch.nn.Module(), fused_graph), script))
+        with graph.inserting_before(last):
+            fused = graph.call_module(name, tuple(chain_inputs))
+        last.replace_all_uses_with(fused)
+        for node in reversed(chain):
+            graph.erase_node(node)
+    fx_module.graph = graph
+    return fx_module
+
+"""Pairs of module types whose batch norm can be folded into the preceding module"""
+_BN_FOLDABLE_PATTERNS = [
+    (torch.nn.Conv1d, torch.nn.BatchNorm1d),
+    (torch.nn.Conv2d, torch.nn.BatchNorm2d),
+    (torch.nn.Conv3d, torch.nn.BatchNorm3d),
+    (torch.nn.Linear, torch.nn.BatchNorm1d),
+]
+
+def _can_fold_bn(node: Node, modules: Dict[str, torch.nn.Module], module_uses: Dict[str, int]) -> bool:
+    if node.op != 'call_module' or len(node.args) != 1 or node.kwargs:
+        return False
+    prev = node.args[0]
+    if not isinstance(prev, Node) or prev.op != 'call_module' or prev.uses != 1:
+        return False
+    assert isinstance(node.target, str) and isinstance(prev.target, str)
+    # the weights of a module called from several places cannot be changed for one of them
+    if module_uses[prev.target] != 1:
+        return False
+    mod, bn = modules[prev.target], modules[node.target]
+    if not any(type(mod) is mod_type and type(bn) is bn_type for mod_type, bn_type in _BN_FOLDABLE_PATTERNS):
+        return False
+    if mod.training or bn.training or not bn.track_running_stats:
+        return False
+    if isinstance(mod, torch.nn.Linear):
+        # the batch norm must normalize the features computed by the linear layer, which are
+        # along dimension 1 only for 2D inputs, as recorded by ShapeProp
+        shape = getattr(prev, 'shape', None)
+        if mod.out_features != bn.num_features or shape is None or len(shape) != 2:
+            return False
+    elif mod.out_channels != bn.num_features:
+        return False
+    return True
+
+def fold_batch_norms(fx_module: GraphModule) -> GraphModule:
+    """Folds the batch norm submodules of `fx_module` that directly follow a convolution or a
+    linear layer into the weights of that layer, removes their nodes from `fx_module.graph` and
+    regenerates the code of `fx_module`. Returns `fx_module`.
+
+    Only modules in eval mode are folded, since batch norm then applies a fixed affine transform.
+    A layer is only folded if it is called once and its value is only used by the batch norm.
+    Linear layers are only folded if :class:`ShapeProp` recorded that their output is 2D, so
+    that the batch norm normalizes their features.
+
+    Example:
+        traced = symbolic_trace(model.eval())
+        fold_batch_norms(traced)
+    """
+    graph = fx_module.graph
+    modules = dict(fx_module.named_modules())
+    module_uses : Dict[str, int] = {}
+    for node in graph.nodes:
+        if node.op == 'call_module':
+            assert isinstance(node.target, str)
+            module_uses[node.target] = module_uses.get(node.target, 0) + 1
+    for node in graph.nodes:
+        if not _can_fold_bn(node, modules, module_uses):
+            continue
+        prev = node.args[0]
+        assert isinstance(node.target, str) and isinstance(prev, Node) and isinstance(prev.target, str)
+        mod, bn = modules[prev.target], modules[node.target]
+        if isinstance(mod, torch.nn.Linear):
+            fused = torch.nn.utils.fuse_linear_bn_eval(mod, bn)
+        else:
+            fused = torch.nn.utils.fuse_conv_bn_eval(mod, bn)
+        *parent, field = prev.target.split('.')
+        setattr(_fetch_attr(fx_module, '.'.join(parent)) if parent else fx_module, field, fused)
+        modules[prev.target] = fused
+        node.replace_all_uses_with(prev)
+        graph.erase_node(node)
+    fx_module.graph = graph
+    return fx_module
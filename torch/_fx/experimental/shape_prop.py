@@ -0,0 +1,106 @@
+import torch
+from typing import Any, Dict, Iterator
+from torch._fx.graph_module import GraphModule
+from torch._fx.node import Node, map_arg
+
+
+def _tensors_in(value: Any) -> Iterator[torch.Tensor]:
+    # the tensors of `value`, looking into tuples, lists and dicts (e.g. the result of torch.split)
+    if isinstance(value, torch.Tensor):
+        yield value
+    elif isinstance(value, (tuple, list)):
+        for elem in value:
+            yield from _tensors_in(elem)
+    elif isinstance(value, dict):
+        for elem in value.values():
+            yield from _tensors_in(elem)
+
+class ShapeProp:
+    """
+    Runs a `GraphModule` node by node with example inputs, and records on each node:
+
+    - `shape` and `dtype`: the properties of the tensor computed by the node, or None if the node
+      does not compute a tensor
+    - `device`: the device of the tensors computed by the node, or None if it computes none
+    - `nbytes`: the number of bytes of the tensors computed by the node (including the tensors
+      of a tuple or list, e.g. the result of torch.split)
+    - `aliases`: the nodes that first computed the storages of the node's tensors, when the node
+      computes views of (or updates in place) the values of other nodes
+
+    Example:
+        gm = symbolic_trace(model)
+        ShapeProp(gm).propagate(torch.rand(1, 3, 224, 224))
+        for node in gm.graph.nodes:
+            print(node.name, node.shape, node.dtype)
+    """
+    def __init__(self, mod: GraphModule):
+        self.mod = mod
+        self.graph = mod.graph
+        self.modules = dict(self.mod.named_modules())
+
+    def _fetch_attr(self, target: str) -> Any:
+        attr_itr = self.mod
+        for atom in target.split('.'):
+            if not hasattr(attr_itr, atom):
+                raise RuntimeError(f"Node referenced nonexistent target {target}")
+            attr_itr = getattr(attr_itr, atom)
+        return attr_itr
+
+    def propagate(self, *args: Any, **kwargs: Any) -> Any:
+        """Runs the graph on `args` and `kwargs` (bound to the placeholders in order) and returns
+        its result, recording the properties of the values of all nodes."""
+        args_iter = iter(args)
+        env : Dict[Node, Any] = {}
+        # data_ptr of each storage seen so far -> the node that computed it first
+        storage_owners : Dict[int, Node] = {}
+
+        def load_arg(a: Any) -> Any:
+            return map_arg(a, lambda n: env[n])
+
+        for node in self.graph.nodes:
+            if node.op == 'placeholder':
+                assert isinstance(node.target, str)
+                if node.target.startswith('**'):
+                    result = kwargs
+                elif node.target.startswith('*'):
+                    result = tuple(args_iter)
+                else:
+                    result = next(args_iter)
+            elif node.op == 'get_attr':
+                assert isinstance(node.target, str)
+                result = self._fetch_attr(node.target)
+            elif node.op == 'call_function':
+                result = node.target(*load_arg(node.args), **load_arg(node.kwargs))
+            elif node.op == 'call_method':
+                assert isinstance(node.target, str)
+                self_obj, *args_tail = load_arg(node.args)
+                result = getattr(self_obj, node.target)(*args_tail, **load_arg(node.kwargs))
+            elif node.op == 'call_module':
+                assert isinstance(node.target, str)
+                result = self.modules[node.target](*load_arg(node.args), **load_arg(node.kwargs))
+            else:
+                raise NotImplementedError(f'node: {node.op} {node.target}')
+            env[node] = result
+            self._record(node, result, storage_owners)
+
+        return load_arg(self.graph.result)
+
+    def _record(self, node: Node, result: Any, storage_owners: Dict[int, Node]):
+        if isinstance(result, torch.Tensor):
+            node.shape = result.shape
+            node.dtype = result.dtype
+        else:
+            node.shape = node.dtype = None
+        node.device = None
+        node.nbytes = 0
+        aliases : Dict[Node, None] = {}
+        for t in _tensors_in(result):
+            if node.device is None:
+                node.device = t.device
+            node.nbytes += t.numel() * t.element_size()
+            if t.numel() == 0:
+                continue
+            owner = storage_owners.setdefault(t.storage().data_ptr(), node)
+            if owner is not node:
+                aliases[owner] = None
+        node.aliases = list(aliases)
@@ -1,6 +1,7 @@
-from .node import Node, Argument, Target
+from .node import Node, Argument, Target, map_arg, _link_before
 
-from typing import Callable, Any, List, Dict, Optional, Tuple, Set
+from typing import Callable, Any, List, Dict, Optional, Tuple, Set, Iterator
+from contextlib import contextmanager
 import builtins
 import torch
 import keyword
@@ -52,41 +53,103 @@ def _format_target(base: str, target: str) -> str:
             r = f'{r}.{e}'
     return r
 
-def map_arg(a: Argument, fn: Callable[[Node], Argument]) -> Argument:
-    """ apply fn to each Node appearing arg. arg may be a list, tuple, slice, or dict with string keys. """
-    if isinstance(a, (tuple, list)):
-        return type(a)(map_arg(elem, fn) for elem in a)
-    elif isinstance(a, dict):
-        return {k: map_arg(v, fn) for k, v in a.items()}
-    elif isinstance(a, slice):
-        return slice(map_arg(a.start, fn), map_arg(a.stop, fn), map_arg(a.step, fn))
-    elif isinstance(a, Node):
-        return fn(a)
-    else:
-        return a
+class _NodeListRoot:
+    """ Sentinel of the circular doubly-linked list of the nodes of a Graph """
+    __slots__ = ['_prev', '_next']
+
+    def __init__(self):
+        self._prev : Any = self
+        self._next : Any = self
 
 class Graph:
     def __init__(self):
-        self._nodes : List[Node] = []
+        # Nodes are kept in a doubly-linked list, so that inserting, moving and erasing
+        # a node takes constant time
+        self._root = _NodeListRoot()
+        self._len = 0
+        # new nodes are inserted before this node, or at the end when it is `_root`
+        self._insert_point : Any = self._root
         self._used_names : Dict[str, int] = {}  # base name -> number
 
     @property
-    def nodes(self):
-        return tuple(self._nodes)
+    def nodes(self) -> Tuple[Node, ...]:
+        """ the nodes of this graph in order, as a tuple that is not affected by later edits """
+        return tuple(self._iter_nodes())
+
+    def _iter_nodes(self) -> Iterator[Node]:
+        n = self._root._next
+        while n is not self._root:
+            # read the next node first, so that the current node may be erased or moved
+            next_node = n._next
+            yield n
+            n = next_node
+
+    def __len__(self) -> int:
+        return self._len
 
     def graph_copy(self, g : 'Graph'):
         """
         Append all nodes from graph `g` to this graph
         """
         val_map : Dict[Node, Node] = {}
-        for node in g._nodes:
+        for node in g._iter_nodes():
             val_map[node] = self.node_copy(node, lambda n : val_map[n])
 
-    def _mark_uses(self, a: Argument):
-        def add_use(n: Node):
-            n.uses += 1
-            return n
-        map_arg(a, add_use)
+    def __deepcopy__(self, memo) -> 'Graph':
+        # copy node by node, rather than recursively through the linked list
+        g = Graph()
+        memo[id(self)] = g
+        val_map : Dict[Node, Node] = {}
+        for node in self._iter_nodes():
+            args = map_arg(node.args, lambda n : val_map[n])
+            kwargs = map_arg(node.kwargs, lambda n : val_map[n])
+            assert isinstance(args, tuple)
+            assert isinstance(kwargs, dict)
+            val_map[node] = g.create_node(node.op, node.target, args, kwargs, node.name)
+        if hasattr(self, 'result'):
+            g.output(map_arg(self.result, lambda n : val_map[n]))
+        return g
+
+    @contextmanager
+    def inserting_before(self, n : Optional[Node] = None):
+        """
+        Context manager in which `create_node` (and the methods using it) inserts new nodes
+        right before `n`, in creation order. When `n` is None, nodes are appended to the end
+        of the graph.
+        """
+        assert n is None or n.graph is self, "Cannot insert relative to a Node of another Graph"
+        saved = self._insert_point
+        self._insert_point = self._root if n is None else n
+        try:
+            yield
+        finally:
+            self._insert_point = saved
+
+    def inserting_after(self, n : Node):
+        """
+        Context manager in which `create_node` (and the methods using it) inserts new nodes
+        right after `n`, in creation order.
+        """
+        assert n.graph is self, "Cannot insert relative to a Node of another Graph"
+        next_node = n._next
+        return self.inserting_before(next_node if isinstance(next_node, Node) else None)
+
+    def erase_node(self, to_erase : Node) -> None:
+        """
+        Erase `to_erase` from this graph. `to_erase` must not have any uses left, see
+        `Node.replace_all_uses_with`. Takes constant time.
+        """
+        if to_erase.graph is not self:
+            raise RuntimeError(f'Node \'{to_erase}\' does not belong to this Graph')
+        if to_erase.uses > 0:
+            raise RuntimeError(f'Tried to erase Node {to_erase} but it still has {to_erase.uses} '
+                               f'uses in the graph: {list(to_erase.users)}')
+        if self._insert_point is to_erase:
+            self._insert_point = to_erase._next
+        to_erase._remove_from_list()
+        self._len -= 1
+        # drop the uses of the inputs of the erased node
+        to_erase._update_args_kwargs((), {})
 
     def create_node(self, op: str, target: Target,
                     args: Optional[Tuple[Argument, ...]] = None,
@@ -95,11 +158,10 @@ class Graph:
         assert op in ('call_function', 'call_method', 'get_attr', 'call_module', 'placeholder')
         args = () if args is None else args
         kwargs = {} if kwargs is None else kwargs
-        self._mark_uses(args)
-        self._mark_uses(kwargs)
         sanitized_name = self._register_name_used(name) if name is not None else self._name(target)
         n = Node(self, sanitized_name, op, target, args, kwargs)
-        self._nodes.append(n)
+        _link_before(self._insert_point, n)
+        self._len += 1
         return n
 
     # sugar for above when you know the op
@@ -157,8 +219,14 @@ class Graph:
         return self.create_node(node.op, node.target, args, kwargs, name)
 
     def output(self, result: Argument):
+        def update_use(n : Node, delta : int) -> Node:
+            n._uses += delta
+            return n
+        # replacing the result drops the uses of the previous result
+        if hasattr(self, 'result'):
+            map_arg(self.result, lambda n: update_use(n, -1))
         self.result = result
-        self._mark_uses(result)
+        map_arg(result, lambda n: update_use(n, 1))
 
     def _name(self, target: Target) -> str:
         if callable(target):
@@ -197,7 +265,7 @@ class Graph:
     def python_code(self, root_module: str) -> Tuple[str, str, List[str]]:
         free_vars: List[str] = []
         body: List[str] = []
-        for node in self._nodes:
+        for node in self._iter_nodes():
             if node.op == 'placeholder':
                 assert isinstance(node.target, str)
                 free_vars.append(node.target)
@@ -273,7 +341,7 @@ class Graph:
                        f'args = {format_arg(n.args)}, kwargs = {format_arg(n.kwargs)})'
 
 
-        node_strs = [format_node(node) for node in self._nodes]
+        node_strs = [format_node(node) for node in self._iter_nodes()]
         param_str = ', '.join(placeholder_names)
         s = f'graph({param_str}):'
         for node_str in node_strs:
@@ -302,10 +370,12 @@ class Graph:
             if arg not in seen_values:
                 raise RuntimeError(f'Argument \'{arg}\'{context_str}was used before it has been '
                                    f'defined! Please check that Nodes in the graph are topologically ordered\n{self}')
+            if n is not None and n not in arg.users:
+                raise RuntimeError(f'Node \'{n}\' uses \'{arg}\' but is not in its users!')
 
         seen_names : Set[str] = set()
         seen_values : Set[Node] = set()
-        for node in self._nodes:
+        for node in self._iter_nodes():
             if node.op not in ['placeholder', 'call_method', 'call_module', 'call_function', 'get_attr']:
                 raise RuntimeError(f'Node {node} had unknown opcode {node.op}!')
             if node.graph is not self:
@@ -323,7 +393,7 @@ class Graph:
 
         # Check targets are legit
         if root:
-            for node in self._nodes:
+            for node in self._iter_nodes():
                 if node.op in ['get_attr', 'call_module']:
                     assert isinstance(node.target, str)
                     target_atoms = node.target.split('.')
@@ -31,9 +31,127 @@ class Node:
             assert isinstance(target, str)
         self.target = target  # for method/module/function, the name of the method/module/function/attr
         # being invoked, e.g add, layer1, or torch.add
-        self.args = args
-        self.kwargs = kwargs
-        self.uses = 0
+        # the nodes that use this node in their args or kwargs, in insertion order
+        self.users : Dict['Node', None] = {}
+        # number of times this node appears in args, kwargs and the graph's result
+        self._uses = 0
+        self._args : Tuple[Argument, ...] = ()
+        self._kwargs : Dict[str, Argument] = {}
+        self._update_args_kwargs(args, kwargs)
+        # neighbours in the graph's doubly-linked list of nodes, maintained by Graph
+        self._prev : Any = None
+        self._next : Any = None
+
+    @property
+    def args(self) -> Tuple[Argument, ...]:
+        return self._args
+
+    @args.setter
+    def args(self, a : Tuple[Argument, ...]):
+        self._update_args_kwargs(a, self._kwargs)
+
+    @property
+    def kwargs(self) -> Dict[str, Argument]:
+        return self._kwargs
+
+    @kwargs.setter
+    def kwargs(self, k : Dict[str, Argument]):
+        self._update_args_kwargs(self._args, k)
+
+    @property
+    def uses(self) -> int:
+        """ number of times this node is used by other nodes and by the graph's result """
+        return self._uses
+
+    @property
+    def next(self) -> Optional['Node']:
+        """ the node after this one in its graph, or None if this is the last node """
+        n = self._next
+        return n if isinstance(n, Node) else None
+
+    @property
+    def prev(self) -> Optional['Node']:
+        """ the node before this one in its graph, or None if this is the first node """
+        n = self._prev
+        return n if isinstance(n, Node) else None
+
+    def _update_args_kwargs(self, new_args : Tuple[Argument, ...], new_kwargs : Dict[str, Argument]):
+        # keep the def-use chains of the old and new inputs up to date
+        old_inputs : Dict[Node, None] = {}
+        map_arg((self._args, self._kwargs), lambda n: _count_use(n, -1, old_inputs))
+        new_inputs : Dict[Node, None] = {}
+        map_arg((new_args, new_kwargs), lambda n: _count_use(n, 1, new_inputs))
+        for n in old_inputs:
+            if n not in new_inputs:
+                n.users.pop(self, None)
+        for n in new_inputs:
+            n.users.setdefault(self)
+        self._args = new_args
+        self._kwargs = new_kwargs
+
+    def replace_all_uses_with(self, replace_with : 'Node') -> List['Node']:
+        """
+        Replace all uses of this node by `replace_with`, in the nodes using it and in the
+        result of the graph. Takes time proportional to the number of users.
+
+        Returns the list of nodes whose arguments were modified.
+        """
+        to_process = list(self.users)
+        for user in to_process:
+            def maybe_replace_node(n : Node) -> Node:
+                return replace_with if n is self else n
+            new_args = map_arg(user.args, maybe_replace_node)
+            new_kwargs = map_arg(user.kwargs, maybe_replace_node)
+            assert isinstance(new_args, tuple)
+            assert isinstance(new_kwargs, dict)
+            user._update_args_kwargs(new_args, new_kwargs)
+        if self._uses > 0 and hasattr(self.graph, 'result'):
+            self.graph.output(map_arg(self.graph.result, lambda n: replace_with if n is self else n))
+        assert self._uses == 0
+        return to_process
+
+    def prepend(self, x : 'Node') -> None:
+        """ Move `x`, a node of the same graph, right before this node """
+        assert self.graph is x.graph, "Attempting to move a Node into a different Graph"
+        if x is not self:
+            _link_before(self, x)
+
+    def append(self, x : 'Node') -> None:
+        """ Move `x`, a node of the same graph, right after this node """
+        assert self.graph is x.graph, "Attempting to move a Node into a different Graph"
+        if x is not self and self._next is not x:
+            _link_before(self._next, x)
+
+    def _remove_from_list(self) -> None:
+        if self._prev is not None:
+            p, n = self._prev, self._next
+            p._next, n._prev = n, p
+        self._prev = self._next = None
 
     def __repr__(self) -> str:
         return self.name
+
+def _link_before(anchor : Any, x : Node) -> None:
+    # `anchor` is a node or the sentinel of a graph's node list
+    x._remove_from_list()
+    p = anchor._prev
+    p._next, x._prev = x, p
+    x._next, anchor._prev = anchor, x
+
+def _count_use(n : Node, delta : int, inputs : Dict[Node, None]) -> Node:
+    n._uses += delta
+    inputs.setdefault(n)
+    return n
+
+def map_arg(a: Argument, fn: Callable[[Node], Argument]) -> Argument:
+    """ apply fn to each Node appearing arg. arg may be a list, tuple, slice, or dict with string keys. """
+    if isinstance(a, (tuple, list)):
+        return type(a)(map_arg(elem, fn) for elem in a)
+    elif isinstance(a, dict):
+        return {k: map_arg(v, fn) for k, v in a.items()}
+    elif isinstance(a, slice):
+        return slice(map_arg(a.start, fn), map_arg(a.stop, fn), map_arg(a.step, fn))
+    elif isinstance(a, Node):
+        return fn(a)
+    else:
+        return a
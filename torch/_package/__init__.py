@@ -7,3 +7,5 @@
 """
 from .importer import PackageImporter
 from .exporter import PackageExporter
+from .blob_store import BlobStore
+from .find_file_dependencies import DependencyCache
@@ -1,5 +1,8 @@
 import _warnings
+import importlib.util
+import marshal
 import os.path
+import sys
 # note: implementations 
 # copied from cpython's import code
 
@@ -81,3 +84,37 @@ def _normalize_path(path):
         raise ValueError('{!r} must be only a file name'.format(path))
     else:
         return file_name
+
+# Bytecode caches are stored as hash-based .pyc files (PEP 552) that are checked
+# against the source, under a directory tagged with the interpreter version,
+# e.g. `.bytecode/cpython-38/my_package/__init__.pyc`.
+_BYTECODE_FLAGS = 0b11  # hash-based, checked
+# hash-based .pyc files need Python 3.7
+_BYTECODE_SUPPORTED = hasattr(importlib.util, 'source_hash')
+
+def _bytecode_path(source_path):
+    """Return the path of the bytecode cache of `source_path` for this interpreter,
+    or None if the interpreter does not support bytecode caches."""
+    cache_tag = sys.implementation.cache_tag
+    if cache_tag is None:
+        return None
+    return '.bytecode/{}/{}c'.format(cache_tag, source_path)
+
+def _code_to_bytecode(code, source):
+    """Serialize `code`, compiled from `source`, into a checked hash-based .pyc."""
+    data = bytearray(importlib.util.MAGIC_NUMBER)
+    data.extend(_BYTECODE_FLAGS.to_bytes(4, 'little'))
+    data.extend(importlib.util.source_hash(source))
+    data.extend(marshal.dumps(code))
+    return bytes(data)
+
+def _bytecode_to_code(data, source):
+    """Return the code object of the .pyc `data`, or None if it was not written by this
+    interpreter version or does not match `source`."""
+    if not _BYTECODE_SUPPORTED or data[:4] != importlib.util.MAGIC_NUMBER:
+        return None
+    if int.from_bytes(data[4:8], 'little') != _BYTECODE_FLAGS:
+        return None
+    if data[8:16] != importlib.util.source_hash(source):
+        return None
+    return marshal.loads(data[16:])
@@ -0,0 +1,87 @@
+import torch
+from torch.serialization import _should_read_directly
+import hashlib
+import io
+import os
+from typing import Any, Dict
+
+# CPU storage types keyed by the dtype of their elements, used to map blobs
+_dtype_to_storage : Dict[Any, Any] = {
+    torch.double: torch.DoubleStorage,
+    torch.float: torch.FloatStorage,
+    torch.half: torch.HalfStorage,
+    torch.bfloat16: torch.BFloat16Storage,
+    torch.complex128: torch.ComplexDoubleStorage,
+    torch.complex64: torch.ComplexFloatStorage,
+    torch.long: torch.LongStorage,
+    torch.int: torch.IntStorage,
+    torch.short: torch.ShortStorage,
+    torch.int8: torch.CharStorage,
+    torch.uint8: torch.ByteStorage,
+    torch.bool: torch.BoolStorage,
+    torch.quint8: torch.QUInt8Storage,
+    torch.qint8: torch.QInt8Storage,
+    torch.qint32: torch.QInt32Storage,
+}
+
+def storage_digest(storage) -> str:
+    """Returns the content hash of `storage`: the hex SHA-256 digest of its raw bytes. Storages
+    with identical bytes have identical digests, whatever their type."""
+    return hashlib.sha256(storage_bytes(storage)).hexdigest()
+
+def storage_bytes(storage) -> bytes:
+    """Returns the raw bytes of `storage`, copying it to the CPU if needed."""
+    buf = io.BytesIO()
+    storage._write_file(buf, _should_read_directly(buf), False)
+    return buf.getvalue()
+
+class BlobStore:
+    """A directory of storage contents keyed by their content hash (see :func:`storage_digest`),
+    shared by many packages.
+
+    When a :class:`PackageExporter` is given a blob store, it writes the storages of the package
+    to the store (skipping the ones that are already there) instead of the archive, which only
+    records their digests. A :class:`PackageImporter` given the same store resolves these digests
+    against it. Packages of model variants sharing most of their weights then store the shared
+    weights once.
+
+    Blobs are immutable: a blob is only written if its digest is not in the store yet, and is
+    moved into place atomically so that concurrent exporters and importers never see partial blobs.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Open (and create if needed) the blob store in `directory`.
+
+        Args:
+            directory: e.g. /shared/model_blobs
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest)
+
+    def __contains__(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, digest: str, data: bytes):
+        """Store `data` under `digest`, unless a blob with this digest is already stored."""
+        if digest in self:
+            return
+        path = self.path(digest)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get_storage(self, digest: str, numel: int, dtype):
+        """Returns a storage of `numel` elements of type `dtype` mapped (copy-on-write) from the
+        blob `digest`."""
+        if digest not in self:
+            raise RuntimeError(f'blob {digest} is not in the blob store {self.directory}')
+        storage_type = _dtype_to_storage[dtype]
+        if numel == 0:
+            # empty files cannot be mapped
+            return storage_type()
+        return storage_type.from_file(self.path(digest), False, numel)
@@ -1,14 +1,16 @@
 import torch
-from torch.serialization import normalize_storage_type, location_tag, _should_read_directly
+from torch.serialization import normalize_storage_type, location_tag
 import io
 import pickle
 import pickletools
-from .find_file_dependencies import find_files_source_depends_on
+from .find_file_dependencies import find_files_source_depends_on, DependencyCache
 from ._custom_import_pickler import CustomImportPickler
-from ._importlib import _normalize_path
+from ._importlib import _normalize_path, _normalize_line_endings, _bytecode_path, _code_to_bytecode, \
+    _BYTECODE_SUPPORTED
+from .blob_store import BlobStore, storage_digest, storage_bytes
 import types
 import importlib
-from typing import List, Any, Callable, Dict, Tuple
+from typing import List, Any, Callable, Dict, Optional, Tuple
 from distutils.sysconfig import get_python_lib
 from pathlib import Path
 import linecache
@@ -44,6 +46,17 @@ class PackageExporter:
     resolves relative references to qualified module names, and calls :method:`require_module`
     on each it finds, recursively resolving dependencies.
 
+
+    Storages
+    --------
+
+    Tensor storages are stored by content: each distinct content is written once, to the record
+    `data/<digest>` where `<digest>` is its SHA-256 hash, so identical tensors saved in one or
+    several pickles take space once. The file `storage_digests` in the zip archive maps the keys
+    pickles refer to storages by to these digests; storages stay distinct objects when loaded.
+    When a :class:`BlobStore` is given, contents are written to the blob store instead of the
+    archive, so that they are also shared across packages.
+
     """
 
     importers: List[Callable[[str], Any]]
@@ -56,7 +69,8 @@ class PackageExporter:
     """
 
 
-    def __init__(self, filename: str, verbose: bool = True):
+    def __init__(self, filename: str, verbose: bool = True, blob_store: Optional[BlobStore] = None,
+                 save_bytecode: bool = False, dependency_cache: Optional[str] = None):
         """
         Create an exporter.
 
@@ -64,9 +78,28 @@ class PackageExporter:
             filename: e.g. my_package.zip
             verbose: Print information about dependency resolution to stdout.
                 Useful for tracking down why certain files get included.
+            blob_store: If present, storages are written to this blob store instead of the archive
+                (see :ref:`Storages`). The package can then only be loaded along with the blob store.
+            save_bytecode: Also save the bytecode of each source file, compiled by this interpreter.
+                Importers running the same Python version use it instead of compiling the source,
+                which speeds up imports. The bytecode is ignored if the source is edited. Requires
+                Python 3.7 or later.
+            dependency_cache: If present, a file caching the imports found in each source file across
+                exports (see :class:`DependencyCache`), so that unchanged files are not parsed again.
         """
+        if save_bytecode and not _BYTECODE_SUPPORTED:
+            raise RuntimeError('save_bytecode requires Python 3.7 or later, which checks bytecode against its '
+                               'source with hash-based .pyc files')
         self.zip_file = torch._C.PyTorchFileWriter(filename)
+        self.blob_store = blob_store
+        self.save_bytecode = save_bytecode
+        self.dependency_cache = DependencyCache(dependency_cache) if dependency_cache is not None else None
+        # storages keyed by their digest, one per distinct content
         self.serialized_storages : Dict[str, Any] = {}
+        # digests of the storages pickles refer to, keyed by the key pickles use
+        self.storage_digests : Dict[str, str] = {}
+        # keeps every pickled storage alive so that their keys are not reused
+        self._pickled_storages : Dict[str, Any] = {}
         self.external : List[str] = []
         self.provided : Dict[str, bool] = {}
         self.verbose = verbose
@@ -131,9 +164,14 @@ class PackageExporter:
         extension = '/__init__.py' if is_package else '.py'
         filename = module_name.replace('.', '/') + extension
         self._write(filename, src)
+        if self.save_bytecode:
+            self._write_bytecode(filename, src)
         if dependencies:
             package = module_name if is_package else module_name.rsplit('.', maxsplit=1)[0]
-            dep_pairs = find_files_source_depends_on(src, package)
+            if self.dependency_cache is not None:
+                dep_pairs = self.dependency_cache.find_files_source_depends_on(src, package)
+            else:
+                dep_pairs = find_files_source_depends_on(src, package)
             dep_list = {}
             for dep_module_name, dep_module_obj in dep_pairs:
                 # handle the case where someone did something like `from pack import sub`
@@ -161,6 +199,15 @@ class PackageExporter:
             for dep in dep_list.keys():
                 self.require_module_if_not_provided(dep)
 
+    def _write_bytecode(self, filename: str, src: str):
+        bytecode_path = _bytecode_path(filename)
+        if bytecode_path is None:
+            return
+        # compile exactly as PackageImporter does, so that code objects refer to the archive
+        source = _normalize_line_endings(src.encode('utf-8'))
+        code = compile(source, filename, 'exec', dont_inherit=True)
+        self._write(bytecode_path, _code_to_bytecode(code, source))
+
     def _module_exists(self, module_name: str) -> bool:
         try:
             self._import_module(module_name)
@@ -442,7 +489,11 @@ class PackageExporter:
             storage_type = normalize_storage_type(type(obj))
             obj_key = str(obj._cdata)
             location = location_tag(obj)
-            self.serialized_storages[obj_key] = obj
+            if obj_key not in self.storage_digests:
+                digest = storage_digest(obj)
+                self.storage_digests[obj_key] = digest
+                self._pickled_storages[obj_key] = obj
+                self.serialized_storages.setdefault(digest, obj)
 
             return ('storage',
                     storage_type,
@@ -472,23 +523,28 @@ class PackageExporter:
         if self.verbose:
             print(f"Dependency graph for exported package: {self._write_dep_graph()}")
 
-        # Write each tensor to a file named tensor/the_tensor_key in the zip archive
-        for key in sorted(self.serialized_storages.keys()):
-            name = 'data/{}'.format(key)
-            storage = self.serialized_storages[key]
-            if storage.device.type == 'cpu':
+        # Write each distinct storage to a file named data/the_digest in the zip archive,
+        # or to the blob store
+        for digest in sorted(self.serialized_storages.keys()):
+            name = 'data/{}'.format(digest)
+            storage = self.serialized_storages[digest]
+            if self.blob_store is not None:
+                if digest not in self.blob_store:
+                    self.blob_store.put(digest, storage_bytes(storage))
+            elif storage.device.type == 'cpu':
                 # If it's on the CPU we can directly copy it into the zip file
                 num_bytes = storage.size() * storage.element_size()
                 self.zip_file.write_record(name, storage.data_ptr(), num_bytes)
             else:
                 # Copy to a buffer, then serialize that
-                buf = io.BytesIO()
-                storage._write_file(buf, _should_read_directly(buf))
-                buf_value = buf.getvalue()
-                self._write(name, buf_value)
+                self._write(name, storage_bytes(storage))
+        digests = ''.join(f'{key} {digest}\n' for key, digest in sorted(self.storage_digests.items()))
+        self._write('storage_digests', digests)
         contents = ('\n'.join(self.external) + '\n')
         self._write('extern_modules', contents)
         del self.zip_file
+        if self.dependency_cache is not None:
+            self.dependency_cache.save()
 
 
     def _filename(self, package, resource):
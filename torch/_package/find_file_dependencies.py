@@ -1,5 +1,8 @@
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import ast
+import hashlib
+import json
+import os
 from ._importlib import _resolve_name
 
 class _ExtractModuleReferences(ast.NodeVisitor):
@@ -40,3 +43,51 @@ class _ExtractModuleReferences(ast.NodeVisitor):
                 self.references[(name, None)] = True
 
 find_files_source_depends_on = _ExtractModuleReferences.run
+
+
+class DependencyCache:
+    """A persistent cache of the module references found by :func:`find_files_source_depends_on`,
+    so that re-exporting mostly unchanged code does not parse it again.
+
+    Entries are keyed by a hash of the source and the package it is resolved against, so edited
+    files are parsed again and stale entries are never used. The cache is stored as JSON in
+    `filename`, which is created by :meth:`save` if it does not exist.
+    """
+    version = 1
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.entries : Dict[str, List[Tuple[str, Optional[str]]]] = {}
+        self.dirty = False
+        try:
+            with open(filename, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # missing or unreadable cache: start afresh
+            return
+        if isinstance(data, dict) and data.get('version') == self.version:
+            self.entries = {key: [tuple(ref) for ref in refs] for key, refs in data['entries'].items()}
+
+    @staticmethod
+    def _key(src: str, package: str) -> str:
+        h = hashlib.sha256(src.encode('utf-8'))
+        h.update(b'\0' + package.encode('utf-8'))
+        return h.hexdigest()
+
+    def find_files_source_depends_on(self, src: str, package: str) -> List[Tuple[str, Optional[str]]]:
+        key = self._key(src, package)
+        refs = self.entries.get(key)
+        if refs is None:
+            refs = self.entries[key] = find_files_source_depends_on(src, package)
+            self.dirty = True
+        return list(refs)
+
+    def save(self):
+        """Write the cache to `filename` if it has new entries."""
+        if not self.dirty:
+            return
+        tmp_filename = f'{self.filename}.{os.getpid()}.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump({'version': self.version, 'entries': self.entries}, f)
+        os.replace(tmp_filename, self.filename)
+        self.dirty = False
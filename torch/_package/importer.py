@@ -7,10 +7,12 @@ import torch
 import _compat_pickle  # type: ignore
 import types
 import os.path
+import weakref
 
 from ._importlib import _normalize_line_endings, _resolve_name, _sanity_check, _calc___package__, \
-    _normalize_path
-from ._mock_zipreader import MockZipReader
+    _normalize_path, _bytecode_path, _bytecode_to_code
+from ._mock_zipreader import MockZipReader, _HasStorage
+from .blob_store import BlobStore
 
 class PackageImporter:
     """Importers allow you to load code written to packages by PackageExporter.
@@ -31,7 +33,8 @@ class PackageImporter:
     local to this importer.
     """
 
-    def __init__(self, filename: str, module_allowed: Callable[[str], bool] = lambda module_name: True):
+    def __init__(self, filename: str, module_allowed: Callable[[str], bool] = lambda module_name: True,
+                 blob_store: Optional[BlobStore] = None, lazy_modules: bool = False):
         """Open `filename` for importing. This checks that the imported package only requires modules
         allowed by `module_allowed`
 
@@ -41,11 +44,18 @@ class PackageImporter:
             module_allowed (Callable[[str], bool], optional): A method to determine if a externally provided module
                 should be allowed. Can be used to ensure packages loaded do not depend on modules that the server
                 does not support. Defaults to allowing anything.
+            blob_store (BlobStore, optional): Blob store to load the storages that are not in the archive from,
+                for packages exported with a blob store.
+            lazy_modules (bool, optional): If True, the body of a module is only executed the first time one of
+                its attributes is accessed, rather than when it is imported. This speeds up loading packages
+                with many modules of which only a few are used, but delays errors raised by module bodies.
+                Defaults to False.
 
         Raises:
             ImportError: If the package will use a disallowed module.
         """
         self.filename = filename
+        self.lazy_modules = lazy_modules
         self.zip_reader : Any
         if not os.path.isdir(self.filename):
             self.zip_reader = torch._C.PyTorchFileReader(self.filename)
@@ -62,9 +72,13 @@ class PackageImporter:
                                   f"but that module has been disallowed")
             self._add_extern(extern_module)
 
-        for filename in self.zip_reader.get_all_records():
+        self.records = set(self.zip_reader.get_all_records())
+        for filename in self.records:
             self._add_file(filename)
 
+        self.blob_store = blob_store
+        self.storage_digests = self._read_storage_digests()
+
         self.patched_builtins = builtins.__dict__.copy()
         self.patched_builtins['__import__'] = self.__import__
         # allow pickles from archive using `import resources`
@@ -129,12 +143,32 @@ class PackageImporter:
             Any: the unpickled object.
         """
         pickle_file = self._zipfile_path(package, resource)
-        return _load(self.zip_reader, map_location, self, pickle_file=pickle_file)
+        return _load(_StorageResolver(self), map_location, self, pickle_file=pickle_file)
 
 
     def _read_extern(self):
         return self.zip_reader.get_record('extern_modules').decode('utf-8').splitlines(keepends=False)
 
+    def _read_storage_digests(self) -> Dict[str, str]:
+        if 'storage_digests' not in self.records:
+            # packages exported before storages were stored by content
+            return {}
+        lines = self.zip_reader.get_record('storage_digests').decode('utf-8').splitlines(keepends=False)
+        return dict(line.split(' ') for line in lines)
+
+    def _get_storage_from_record(self, name: str, numel: int, dtype):
+        key = name[len('data/'):]
+        digest = self.storage_digests.get(key)
+        if digest is None:
+            return self.zip_reader.get_storage_from_record(name, numel, dtype)
+        record = f'data/{digest}'
+        if record in self.records:
+            return self.zip_reader.get_storage_from_record(record, numel, dtype)
+        if self.blob_store is None:
+            raise RuntimeError(f"storage {digest} is not in package '{self.filename}', "
+                               f"which was exported with a blob store; pass it as `blob_store`")
+        return _HasStorage(self.blob_store.get_storage(digest, numel, dtype))
+
     def _make_module(self, name: str, filename: Optional[str], is_package: bool):
         spec = importlib.machinery.ModuleSpec(name, self, is_package=is_package)  # type: ignore
         module = importlib.util.module_from_spec(spec)
@@ -146,10 +180,16 @@ class PackageImporter:
         ns['__cached__'] = None
         ns['__builtins__'] = self.patched_builtins
         if filename is not None:
-            code = self._compile_source(filename)
-            exec(code, ns)
+            if self.lazy_modules:
+                module.__class__ = _LazyModule
+            else:
+                self._exec_module(module)
         return module
 
+    def _exec_module(self, module: types.ModuleType):
+        code = self._compile_source(module.__file__)
+        exec(code, module.__dict__)
+
     def _load_module(self, name: str):
         cur : _PathNode = self.root
         for atom in name.split('.'):
@@ -166,6 +206,11 @@ class PackageImporter:
     def _compile_source(self, fullpath):
         source = self.zip_reader.get_record(fullpath)
         source = _normalize_line_endings(source)
+        bytecode_path = _bytecode_path(fullpath)
+        if bytecode_path is not None and bytecode_path in self.records:
+            code = _bytecode_to_code(self.zip_reader.get_record(bytecode_path), source)
+            if code is not None:
+                return code
         return compile(source, fullpath, 'exec', dont_inherit=True)
 
     # note: named `get_source` so that linecache can find the source
@@ -355,6 +400,57 @@ _NEEDS_LOADING = object()
 _ERR_MSG_PREFIX = 'No module named '
 _ERR_MSG = _ERR_MSG_PREFIX + '{!r}'
 
+# attributes set on a module before its body is executed, which do not trigger loading a _LazyModule
+_LAZY_MODULE_ATTRS = {'__spec__', '__loader__', '__file__', '__cached__', '__builtins__', '__name__',
+                      '__path__', '__package__', '__doc__', '__class__', '__dict__'}
+
+class _LazyModule(types.ModuleType):
+    """Module of a PackageImporter with `lazy_modules=True` whose body has not been executed yet.
+    The first access to an attribute that the body may define executes it, and turns the module
+    into a regular module."""
+    def __getattribute__(self, attr):
+        if attr in _LAZY_MODULE_ATTRS:
+            return super().__getattribute__(attr)
+        _load_lazy_module(self)
+        return getattr(self, attr)
+
+    def __delattr__(self, attr):
+        _load_lazy_module(self)
+        delattr(self, attr)
+
+# the error raised by the body of each _LazyModule that failed to load
+_lazy_module_errors : 'weakref.WeakKeyDictionary[types.ModuleType, BaseException]' = weakref.WeakKeyDictionary()
+
+def _load_lazy_module(module):
+    error = _lazy_module_errors.get(module)
+    if error is not None:
+        raise error
+    # switch the class first, so that accesses from the body itself do not recurse
+    object.__setattr__(module, '__class__', types.ModuleType)
+    try:
+        module.__loader__._exec_module(module)
+    except BaseException as e:
+        # as after a failed import, the importer forgets the module, and the half initialized
+        # module raises the error again on every later access instead of being used
+        object.__setattr__(module, '__class__', _LazyModule)
+        _lazy_module_errors[module] = e
+        modules = module.__loader__.modules
+        if modules.get(module.__name__) is module:
+            del modules[module.__name__]
+        raise
+
+class _StorageResolver:
+    """Zip reader handed to torch.serialization._load, which resolves the keys pickles refer to
+    storages by to their content in the archive or the blob store."""
+    def __init__(self, importer):
+        self._importer = importer
+
+    def get_record(self, name):
+        return self._importer.zip_reader.get_record(name)
+
+    def get_storage_from_record(self, name, numel, dtype):
+        return self._importer._get_storage_from_record(name, numel, dtype)
+
 class _UnpicklerWrapper(pickle._Unpickler):  # type: ignore
     def __init__(self, importer, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -778,6 +778,8 @@ void initJITBindings(PyObject* module) {
       .def(py::init<std::string>())
       .def(py::init([](const py::object& buffer) {
         auto writer_func = [=](const void* data, size_t size) {
+          // write_record may be called without the GIL
+          py::gil_scoped_acquire acquire;
           auto bytes = py::bytes(reinterpret_cast<const char*>(data), size);
           buffer.attr("write")(std::move(bytes));
           return size;
@@ -800,7 +802,10 @@ void initJITBindings(PyObject* module) {
              size_t size) {
             return self.writeRecord(
                 name, reinterpret_cast<const char*>(data), size);
-          });
+          },
+          // Storages are written (and checksummed) without the GIL so that
+          // torch.serialization.save_async does not stall other threads.
+          py::call_guard<py::gil_scoped_release>());
 
   py::enum_<MobileOptimizerType>(m, "MobileOptimizerType")
       .value("CONV_BN_FUSION", MobileOptimizerType::CONV_BN_FUSION)
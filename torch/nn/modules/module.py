@@ -713,6 +713,13 @@ class Module:
         return result
 
     def _call_impl(self, *input, **kwargs):
+        forward_call = (self._slow_forward if torch._C._get_tracing_state() else self.forward)
+        # Without any hooks, which is the common case, skip the hook bookkeeping below
+        # and call forward directly. Checking the hook dicts themselves (rather than a
+        # cached flag) keeps this correct when hooks are removed through their handles.
+        if not (self._backward_hooks or self._forward_hooks or self._forward_pre_hooks or
+                _global_backward_hooks or _global_forward_hooks or _global_forward_pre_hooks):
+            return forward_call(*input, **kwargs)
         for hook in itertools.chain(
                 _global_forward_pre_hooks.values(),
                 self._forward_pre_hooks.values()):
@@ -721,10 +728,7 @@ class Module:
                 if not isinstance(result, tuple):
                     result = (result,)
                 input = result
-        if torch._C._get_tracing_state():
-            result = self._slow_forward(*input, **kwargs)
-        else:
-            result = self.forward(*input, **kwargs)
+        result = forward_call(*input, **kwargs)
         for hook in itertools.chain(
                 _global_forward_hooks.values(),
                 self._forward_hooks.values()):
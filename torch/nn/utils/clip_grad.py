@@ -1,44 +1,88 @@
 import warnings
 import torch
+from collections import OrderedDict
 from torch._six import inf
-from typing import Union, Iterable
+from typing import Dict, Iterable, List, Tuple, Union
+from .flat_parameters import _flat_view
 
 _tensor_or_tensors = Union[torch.Tensor, Iterable[torch.Tensor]]
 
 
-def clip_grad_norm_(parameters: _tensor_or_tensors, max_norm: float, norm_type: float = 2.0) -> torch.Tensor:
+def clip_grad_norm_(parameters: _tensor_or_tensors, max_norm: float, norm_type: float = 2.0,
+                    per_parameter_norms: bool = False) -> Union[torch.Tensor, Tuple[torch.Tensor, List[torch.Tensor]]]:
     r"""Clips gradient norm of an iterable of parameters.
 
     The norm is computed over all gradients together, as if they were
     concatenated into a single vector. Gradients are modified in-place.
 
+    Gradients are always scaled by a coefficient clamped on their device
+    (which leaves gradients under ``max_norm`` unchanged), so this function
+    never waits for the device. When the gradients on a device are contiguous
+    slices of a single tensor (e.g. after
+    :class:`~torch.nn.utils.FlatParameters`), their norm and their scaling
+    each take a single operation.
+
     Arguments:
         parameters (Iterable[Tensor] or Tensor): an iterable of Tensors or a
             single Tensor that will have gradients normalized
         max_norm (float or int): max norm of the gradients
         norm_type (float or int): type of the used p-norm. Can be ``'inf'`` for
             infinity norm.
+        per_parameter_norms (bool): if ``True``, also return the norm of the
+            gradient of each parameter (before clipping), computed on the way
+            to the total norm. Default: ``False``
 
     Returns:
-        Total norm of the parameters (viewed as a single vector).
+        Total norm of the parameters (viewed as a single vector), and, if
+        :attr:`per_parameter_norms` is ``True``, the list of the norms of the
+        gradients of the parameters that have one, on their devices.
     """
     if isinstance(parameters, torch.Tensor):
         parameters = [parameters]
-    parameters = [p for p in parameters if p.grad is not None]
+    grads = [p.grad.detach() for p in parameters if p.grad is not None]
     max_norm = float(max_norm)
     norm_type = float(norm_type)
-    if len(parameters) == 0:
-        return torch.tensor(0.)
-    device = parameters[0].grad.device
-    if norm_type == inf:
-        total_norm = max(p.grad.detach().abs().max().to(device) for p in parameters)
-    else:
-        total_norm = torch.norm(torch.stack([torch.norm(p.grad.detach(), norm_type).to(device) for p in parameters]), norm_type)
+    if len(grads) == 0:
+        total_norm = torch.tensor(0.)
+        return (total_norm, []) if per_parameter_norms else total_norm
+    device = grads[0].device
+
+    def norm(t: torch.Tensor) -> torch.Tensor:
+        return t.abs().max() if norm_type == inf else torch.norm(t, norm_type)
+
+    # gradients grouped by device and dtype, in order
+    groups: Dict[Tuple[torch.device, torch.dtype], List[int]] = OrderedDict()
+    for i, g in enumerate(grads):
+        groups.setdefault((g.device, g.dtype), []).append(i)
+
+    norms: List[torch.Tensor] = [torch.empty(0)] * len(grads)
+    flat_grads: Dict[Tuple[torch.device, torch.dtype], torch.Tensor] = {}
+    group_norms = []
+    for key, indices in groups.items():
+        group = [grads[i] for i in indices]
+        flat_grad = _flat_view(group)
+        if flat_grad is not None:
+            flat_grads[key] = flat_grad
+        if flat_grad is not None and not per_parameter_norms:
+            group_norms.append(norm(flat_grad).to(device))
+        else:
+            group_param_norms = [norm(g) for g in group]
+            for i, n in zip(indices, group_param_norms):
+                norms[i] = n
+            group_norms.append(norm(torch.stack(group_param_norms)).to(device))
+    total_norm = norm(torch.stack(group_norms))
+
     clip_coef = max_norm / (total_norm + 1e-6)
-    if clip_coef < 1:
-        for p in parameters:
-            p.grad.detach().mul_(clip_coef.to(p.grad.device))
-    return total_norm
+    # scaling by the clamped coefficient, rather than only when it is below 1, avoids a sync
+    clip_coef_clamped = torch.clamp(clip_coef, max=1.0)
+    for key, indices in groups.items():
+        coef = clip_coef_clamped.to(key[0])
+        if key in flat_grads:
+            flat_grads[key].mul_(coef)
+        else:
+            for i in indices:
+                grads[i].mul_(coef)
+    return (total_norm, norms) if per_parameter_norms else total_norm
 
 
 def clip_grad_norm(parameters: _tensor_or_tensors, max_norm: float, norm_type: float = 2.) -> torch.Tensor:
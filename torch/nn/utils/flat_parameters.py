@@ -0,0 +1,325 @@
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import torch
+from torch.nn.parameter import Parameter
+
+# a buffer, with the module holding it and its name
+_BufferSlot = Tuple[torch.nn.Module, str, torch.Tensor]
+
+def _flat_view(tensors):
+    # Returns a 1-D view covering all of `tensors` if they are dense, contiguous
+    # and laid out back to back in the same storage (e.g. parameters flattened by
+    # FlatParameters, and their gradients), and None otherwise.
+    first = tensors[0]
+    if first is None or first.is_sparse:
+        return None
+    storage_ptr = first.storage().data_ptr()
+    offset = first.storage_offset()
+    for t in tensors:
+        if (t is None or t.is_sparse or not t.is_contiguous() or t.dtype != first.dtype or
+                t.device != first.device or t.storage().data_ptr() != storage_ptr or
+                t.storage_offset() != offset):
+            return None
+        offset += t.numel()
+    return first.new_empty(0).set_(first.storage(), first.storage_offset(),
+                                   (offset - first.storage_offset(),))
+
+
+class _TrackedDict(OrderedDict):
+    # The `_parameters` and `_modules` of the modules whose parameters are
+    # flattened: any change to them bumps the version of the FlatParameters
+    # tracking them, so that other modules pay nothing for the tracking.
+    _counter = '_version'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super(_TrackedDict, self).__init__(*args, **kwargs)
+        self._trackers: 'weakref.WeakSet[FlatParameters]' = weakref.WeakSet()
+
+    def _changed(self) -> None:
+        for tracker in self._trackers:
+            setattr(tracker, self._counter, getattr(tracker, self._counter) + 1)
+
+    def __setitem__(self, key, value) -> None:
+        self._changed()
+        super(_TrackedDict, self).__setitem__(key, value)
+
+    def __delitem__(self, key) -> None:
+        self._changed()
+        super(_TrackedDict, self).__delitem__(key)
+
+    def pop(self, *args):
+        self._changed()
+        return super(_TrackedDict, self).pop(*args)
+
+    def popitem(self, *args, **kwargs):
+        self._changed()
+        return super(_TrackedDict, self).popitem(*args, **kwargs)
+
+    def clear(self) -> None:
+        self._changed()
+        super(_TrackedDict, self).clear()
+
+    def __reduce__(self):
+        # copies and pickles of the module are not tracked
+        return OrderedDict, (list(self.items()),)
+
+
+class _TrackedBufferDict(_TrackedDict):
+    # The `_buffers` of the modules, which modules also replace while running
+    # (e.g. `num_batches_tracked` of batch norm), and have a version of their own.
+    _counter = '_buffer_version'
+
+
+class FlatParameters(object):
+    r"""Stores the parameters of a module, and their gradients, as views into
+    one contiguous tensor per dtype, device and ``requires_grad``, and its
+    buffers as views into one contiguous tensor per dtype and device.
+
+    Whole-model operations then take a single kernel per flat tensor instead
+    of one per parameter: the flat tensors returned by :meth:`flat_params`
+    are parameters whose ``.grad`` is the matching flat gradient, so they can
+    be passed to an optimizer (or to :func:`clip_grad_norm_`) in place of
+    the parameters of the module.
+
+    :meth:`parameters` returns a cached list of the parameters of the module,
+    without walking the module tree on every call. The parameters of the
+    module change when a parameter or a submodule is added, replaced or
+    removed anywhere in its tree, or when parameters are converted (e.g. by
+    ``.to()``). Until :meth:`flat_params` or :meth:`flat_grads` is called,
+    the parameters are then flattened again. Afterwards, the flat tensors
+    already handed out (e.g. to an optimizer) would no longer hold the
+    parameters of the module, so a ``RuntimeError`` is raised instead: make
+    such changes before creating the :class:`FlatParameters`, or create a
+    new one (and a new optimizer) after them.
+
+    :meth:`flat_buffers` returns the flat tensors holding the buffers, e.g.
+    to broadcast or average them with one collective per flat tensor. The
+    same rules apply when buffers are added or removed, or change shape,
+    dtype or device. Modules may however replace a buffer with a new tensor
+    of the same shape, dtype and device while running (e.g. batch norm
+    increments ``num_batches_tracked`` out of place): the flat buffers do not
+    see such values until :meth:`flat_buffers` is called again, which copies
+    them back into the flat buffers and makes the buffers views again.
+
+    .. note::
+        Gradients stay views into the flat gradients as long as autograd
+        accumulates them in place, which is the case unless ``create_graph``
+        is used or they are reset to ``None``. :meth:`flat_grads` and
+        :meth:`zero_grad` make gradients views again when needed, but
+        optimizers given :meth:`flat_params` directly do not check them.
+
+    .. note::
+        Flattened parameters are contiguous, whatever their previous memory
+        format.
+
+    Arguments:
+        module (Module): the module whose parameters are flattened
+
+    Example::
+
+        >>> flat = nn.utils.FlatParameters(model)
+        >>> optimizer = torch.optim.SGD(flat.flat_params(), lr=0.1)
+        >>> flat.zero_grad()
+        >>> loss_fn(model(input), target).backward()
+        >>> optimizer.step()
+    """
+
+    def __init__(self, module: torch.nn.Module) -> None:
+        self.module = module
+        # bumped by the _TrackedDict of the modules of the tree on changes
+        self._version = 0
+        self._flat_version = -1
+        self._handed_out = False
+        self._params: List[Parameter] = []
+        self._flat_params: List[Parameter] = []
+        # for each parameter, its flat tensor and its offset in it
+        self._slots: List[Tuple[Parameter, int, int]] = []
+        # bumped by the _TrackedBufferDict of the modules of the tree on changes
+        self._buffer_version = 0
+        self._flat_buffer_version = -1
+        self._buffer_tree_version = -1
+        self._buffers_handed_out = False
+        self._flat_buffers: List[torch.Tensor] = []
+        # for each buffer, its module, its name and its view into its flat tensor
+        self._buffer_slots: List[_BufferSlot] = []
+        self._flatten()
+        self._flatten_buffers(self._current_buffers())
+
+    def _track(self) -> None:
+        for m in self.module.modules():
+            for name, cls in (('_parameters', _TrackedDict), ('_modules', _TrackedDict),
+                              ('_buffers', _TrackedBufferDict)):
+                d = getattr(m, name)
+                if not isinstance(d, cls):
+                    d = cls(d)
+                    object.__setattr__(m, name, d)
+                d._trackers.add(self)
+
+    def _flatten(self) -> None:
+        self._track()
+        params = list(self.module.parameters())
+        groups: Dict[Tuple[torch.dtype, torch.device, bool], List[Parameter]] = OrderedDict()
+        for p in params:
+            groups.setdefault((p.dtype, p.device, p.requires_grad), []).append(p)
+
+        self._flat_params = []
+        self._slots = []
+        with torch.no_grad():
+            for (_, _, requires_grad), group in groups.items():
+                flat = Parameter(torch.cat([p.detach().reshape(-1) for p in group]), requires_grad)
+                if requires_grad:
+                    flat.grad = torch.zeros_like(flat)
+                offset = 0
+                for p in group:
+                    p.data = flat[offset:offset + p.numel()].view_as(p)
+                    if requires_grad:
+                        self._attach_grad(p, flat, offset)
+                    self._slots.append((p, len(self._flat_params), offset))
+                    offset += p.numel()
+                self._flat_params.append(flat)
+        self._params = params
+        self._flat_version = self._version
+
+    def _current_buffers(self) -> List[_BufferSlot]:
+        self._track()
+        return [(m, name, b) for m in self.module.modules()
+                for name, b in m._buffers.items() if b is not None]
+
+    def _flatten_buffers(self, buffers: List[_BufferSlot]) -> None:
+        # buffers shared by several modules are flattened once
+        unique: Dict[int, torch.Tensor] = OrderedDict()
+        for _, _, b in buffers:
+            unique.setdefault(id(b), b)
+        groups: Dict[Tuple[torch.dtype, torch.device], List[torch.Tensor]] = OrderedDict()
+        for b in unique.values():
+            groups.setdefault((b.dtype, b.device), []).append(b)
+
+        views: Dict[int, torch.Tensor] = {}
+        self._flat_buffers = []
+        with torch.no_grad():
+            for group in groups.values():
+                flat = torch.cat([b.detach().reshape(-1) for b in group])
+                offset = 0
+                for b in group:
+                    views[id(b)] = flat[offset:offset + b.numel()].view_as(b)
+                    offset += b.numel()
+                self._flat_buffers.append(flat)
+        self._buffer_slots = []
+        for m, name, b in buffers:
+            m._buffers[name] = views[id(b)]
+            self._buffer_slots.append((m, name, views[id(b)]))
+        self._flat_buffer_version = self._buffer_version
+        self._buffer_tree_version = self._version
+
+    def _check_buffers(self) -> None:
+        if (self._buffer_version == self._flat_buffer_version and
+                self._version == self._buffer_tree_version):
+            return
+        buffers = self._current_buffers()
+        if (len(buffers) == len(self._buffer_slots) and
+                all(m is slot_m and name == slot_name and b.shape == view.shape and
+                    b.dtype == view.dtype and b.device == view.device and not b.is_sparse
+                    for (m, name, b), (slot_m, slot_name, view) in zip(buffers, self._buffer_slots))):
+            # buffers replaced with new values while running: copy them back
+            with torch.no_grad():
+                for (m, name, b), (_, _, view) in zip(buffers, self._buffer_slots):
+                    if b is not view:
+                        view.copy_(b)
+                        m._buffers[name] = view
+            self._flat_buffer_version = self._buffer_version
+            self._buffer_tree_version = self._version
+            return
+        if self._buffers_handed_out:
+            raise RuntimeError(
+                "the buffers of the module flattened by FlatParameters changed after its "
+                "flat buffers were handed out, which no longer hold them; create a new "
+                "FlatParameters after changing the buffers")
+        self._flatten_buffers(buffers)
+
+    @staticmethod
+    def _attach_grad(p: Parameter, flat: Parameter, offset: int) -> None:
+        grad = flat.grad[offset:offset + p.numel()].view_as(p)
+        if p.grad is None:
+            grad.zero_()
+        else:
+            grad.copy_(p.grad)
+        p.grad = grad
+
+    def _moved(self) -> bool:
+        # whether parameters were given new data (e.g. by `.to()`) instead of
+        # being views into their flat tensor
+        for p, i, offset in self._slots:
+            flat = self._flat_params[i]
+            if (p.device != flat.device or p.dtype != flat.dtype or
+                    p.data_ptr() != flat.data_ptr() + offset * flat.element_size()):
+                return True
+        return False
+
+    def _check(self, check_data: bool = True) -> None:
+        if self._version == self._flat_version and not (check_data and self._moved()):
+            return
+        if self._handed_out:
+            raise RuntimeError(
+                "the parameters of the module flattened by FlatParameters changed after its "
+                "flat parameters or gradients were handed out, which no longer hold them; "
+                "create a new FlatParameters (and optimizer) after changing the parameters")
+        self._flatten()
+
+    def _sync_grads(self) -> None:
+        # make the gradients that autograd or the user replaced views again
+        for p, i, offset in self._slots:
+            flat = self._flat_params[i]
+            if flat.grad is None:
+                continue
+            if p.grad is None or p.grad.data_ptr() != flat.grad[offset:].data_ptr():
+                with torch.no_grad():
+                    self._attach_grad(p, flat, offset)
+
+    def _grads(self) -> List[torch.Tensor]:
+        self._check()
+        self._sync_grads()
+        return [flat.grad for flat in self._flat_params if flat.grad is not None]
+
+    def parameters(self) -> List[Parameter]:
+        r"""Returns the parameters of the module, in the order of
+        :meth:`Module.parameters`."""
+        # converted parameters are still the parameters of the module
+        self._check(check_data=False)
+        return self._params
+
+    def buffers(self) -> List[torch.Tensor]:
+        r"""Returns the buffers of the module, in the order of
+        :meth:`Module.buffers`."""
+        self._check_buffers()
+        unique: Dict[int, torch.Tensor] = OrderedDict()
+        for _, _, view in self._buffer_slots:
+            unique.setdefault(id(view), view)
+        return list(unique.values())
+
+    def flat_params(self) -> List[Parameter]:
+        r"""Returns the flat tensors holding the parameters of the module."""
+        self._check()
+        self._handed_out = True
+        return self._flat_params
+
+    def flat_grads(self) -> List[torch.Tensor]:
+        r"""Returns the flat tensors holding the gradients of the parameters
+        that require grad."""
+        grads = self._grads()
+        self._handed_out = True
+        return grads
+
+    def flat_buffers(self) -> List[torch.Tensor]:
+        r"""Returns the flat tensors holding the buffers of the module, after
+        copying the buffers the module replaced into them."""
+        self._check_buffers()
+        self._buffers_handed_out = True
+        return self._flat_buffers
+
+    def zero_grad(self) -> None:
+        r"""Sets the gradients of all parameters to zero, with one kernel per
+        flat gradient."""
+        for grad in self._grads():
+            grad.zero_()
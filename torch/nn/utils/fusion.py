@@ -16,9 +16,27 @@ def fuse_conv_bn_eval(conv, bn):
 def fuse_conv_bn_weights(conv_w, conv_b, bn_rm, bn_rv, bn_eps, bn_w, bn_b):
     if conv_b is None:
         conv_b = bn_rm.new_zeros(bn_rm.shape)
+    if bn_w is None:
+        bn_w = bn_rm.new_ones(bn_rm.shape)
+    if bn_b is None:
+        bn_b = bn_rm.new_zeros(bn_rm.shape)
     bn_var_rsqrt = torch.rsqrt(bn_rv + bn_eps)
 
     conv_w = conv_w * (bn_w * bn_var_rsqrt).reshape([-1] + [1] * (len(conv_w.shape) - 1))
     conv_b = (conv_b - bn_rm) * bn_var_rsqrt * bn_w + bn_b
 
     return torch.nn.Parameter(conv_w), torch.nn.Parameter(conv_b)
+
+def fuse_linear_bn_eval(linear, bn):
+    assert(not (linear.training or bn.training)), "Fusion only for eval!"
+    fused_linear = copy.deepcopy(linear)
+
+    fused_linear.weight, fused_linear.bias = \
+        fuse_linear_bn_weights(fused_linear.weight, fused_linear.bias,
+                               bn.running_mean, bn.running_var, bn.eps, bn.weight, bn.bias)
+
+    return fused_linear
+
+def fuse_linear_bn_weights(linear_w, linear_b, bn_rm, bn_rv, bn_eps, bn_w, bn_b):
+    # a linear layer is a 1x1 convolution whose output channels are its output features
+    return fuse_conv_bn_weights(linear_w, linear_b, bn_rm, bn_rv, bn_eps, bn_w, bn_b)
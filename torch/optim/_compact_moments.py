@@ -0,0 +1,90 @@
+r"""Compact storage of the moments of Adam and AdamW (see their ``moment_dtype`` argument).
+
+Moments are stored either as ``torch.float16`` or ``torch.bfloat16`` tensors, or quantized to
+8 bits per value by blocks of ``_BLOCK_SIZE`` values, each with its own scale (the largest
+absolute value of the block). Quantized values are companded before being rounded, so that the
+small values of a block keep some precision: first moments are stored as
+``int8(round(127 * sign(x) * sqrt(|x| / absmax)))`` and second moments, which are
+non-negative and span a larger range, as ``uint8(round(255 * (x / absmax) ** (1 / 4)))``.
+
+A quantized moment ``key`` of a parameter is held in its state as the 8 bits ``state[key]``, in
+the shape of the parameter, and the scales ``state[key + '_absmax']``.
+"""
+import torch
+
+_BLOCK_SIZE = 2048
+_MOMENT_DTYPES = (torch.float16, torch.bfloat16, torch.int8)
+# signed moments (the first one) are quantized to int8, the others are non-negative
+_SIGNED_MOMENTS = ('exp_avg',)
+
+
+def _check_moment_dtype(moment_dtype):
+    if moment_dtype is not None and moment_dtype not in _MOMENT_DTYPES:
+        raise ValueError("Invalid moment_dtype: {}".format(moment_dtype))
+
+
+def _blocks(t):
+    # the values of `t` as rows of _BLOCK_SIZE values, padded with zeros
+    flat = t.reshape(-1)
+    padding = -flat.numel() % _BLOCK_SIZE
+    if padding:
+        flat = torch.cat([flat, flat.new_zeros(padding)])
+    return flat.view(-1, _BLOCK_SIZE)
+
+
+def _quantize_blockwise(value, signed):
+    blocks = _blocks(value.float())
+    absmax = blocks.abs().max(dim=1, keepdim=True)[0]
+    normed = blocks / absmax.clamp(min=torch.finfo(torch.float32).tiny)
+    if signed:
+        codes = normed.abs().sqrt_().mul_(normed.sign()).mul_(127).round_().to(torch.int8)
+    else:
+        codes = normed.pow_(0.25).mul_(255).round_().to(torch.uint8)
+    return codes.view(-1)[:value.numel()].view_as(value), absmax.view(-1)
+
+
+def _dequantize_blockwise(codes, absmax, signed, dtype):
+    normed = _blocks(codes.float())
+    if signed:
+        normed.div_(127)
+        normed.mul_(normed.abs())
+    else:
+        normed.div_(255).pow_(4)
+    value = normed.mul_(absmax.view(-1, 1)).view(-1)[:codes.numel()]
+    return value.view(codes.shape).to(dtype)
+
+
+def _load_moment(state, key, param):
+    r"""Returns the moment ``state[key]`` of ``param``, as a tensor of the dtype of ``param``."""
+    value = state[key]
+    absmax = state.get(key + '_absmax')
+    if absmax is None:
+        return value.to(param.dtype)
+    return _dequantize_blockwise(value, absmax, key in _SIGNED_MOMENTS, param.dtype)
+
+
+def _store_moment(state, key, value, moment_dtype):
+    r"""Stores ``value`` as the moment ``state[key]``, in the compact form of ``moment_dtype``."""
+    if moment_dtype == torch.int8:
+        state[key], state[key + '_absmax'] = _quantize_blockwise(value, key in _SIGNED_MOMENTS)
+        return
+    state.pop(key + '_absmax', None)
+    stored = state.get(key)
+    if stored is not None and stored.dtype == moment_dtype and stored.shape == value.shape:
+        if stored is not value:
+            stored.copy_(value)
+    else:
+        state[key] = value.to(moment_dtype)
+
+
+def _dequantized_state(state):
+    r"""Returns ``state``, with its quantized moments replaced by ``torch.float32`` tensors, as
+    they are stored by any Adam or AdamW."""
+    keys = [key[:-len('_absmax')] for key in state if key.endswith('_absmax')]
+    if not keys:
+        return state
+    state = dict(state)
+    for key in keys:
+        state[key] = _dequantize_blockwise(state[key], state.pop(key + '_absmax'),
+                                           key in _SIGNED_MOMENTS, torch.float32)
+    return state
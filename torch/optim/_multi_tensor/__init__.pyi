@@ -5,4 +5,7 @@ from .rmsprop import RMSprop as RMSprop
 from .rprop import Rprop as Rprop
 from .asgd import ASGD as ASGD
 from .adamax import Adamax as Adamax
-from .adadelta import Adadelta as Adadelta
\ No newline at end of file
+from .adadelta import Adadelta as Adadelta
+from .adagrad import Adagrad as Adagrad
+from .sparse_adam import SparseAdam as SparseAdam
+from .lbfgs import LBFGS as LBFGS
@@ -0,0 +1,196 @@
+from collections import OrderedDict
+
+import torch
+from torch._six import inf
+from torch.nn.utils.flat_parameters import _flat_view
+
+
+def _grad_scaler_args(optimizer, grad_scaler):
+    # Returns the grad_scale and found_inf tensors to step `optimizer` with on behalf of
+    # GradScaler.step, and records found_inf where GradScaler.update looks for it.
+    from torch.cuda.amp.grad_scaler import OptState
+
+    state = grad_scaler._per_optimizer_states[id(optimizer)]
+    scale = grad_scaler._get_scale_async()
+    if state["stage"] is OptState.UNSCALED:
+        # grad_scaler.unscale_(optimizer) was called, the gradients are already unscaled
+        found_inf = torch.zeros(1, dtype=torch.float32, device=scale.device)
+        for per_device_found_inf in state["found_inf_per_device"].values():
+            found_inf.add_(per_device_found_inf.to(scale.device, non_blocking=True))
+        return None, found_inf
+    found_inf = torch.zeros(1, dtype=torch.float32, device=scale.device)
+    state["found_inf_per_device"] = {scale.device: found_inf}
+    return scale, found_inf
+
+
+def _mul_(tensors, other):
+    flat = _flat_view(tensors)
+    if flat is not None:
+        flat.mul_(other)
+    else:
+        for t in tensors:
+            t.mul_(other)
+
+
+def _unscale_clip_and_check_(grads, grad_scale=None, found_inf=None, max_grad_norm=None, norm_type=2.0):
+    r"""Prepares `grads` for an optimizer step without synchronizing with the host.
+
+    The gradients are divided in place by `grad_scale` and clipped to a total norm of
+    `max_grad_norm` (see :func:`torch.nn.utils.clip_grad_norm_`), both applied with a single
+    multiplication when both are given. When `grad_scale` is given, `found_inf` is set to 1 if
+    any of the gradients has an inf or a NaN.
+
+    Returns a dict holding, for each device of `grads`, a 0-dim double tensor that is 1 if the
+    step must be taken and 0 if it must be skipped (`found_inf` is not 0). The gradients of a
+    skipped step are zeroed, so that updates computed from them, then multiplied by 0, stay
+    finite. Since whether the step is skipped is only known on the device, this takes a pass
+    over all the gradients on every step: a single kernel per device when the gradients are
+    views into one flat tensor (see :class:`torch.nn.utils.FlatParameters`), and one kernel
+    per gradient otherwise.
+    """
+    if any(g.is_sparse for g in grads):
+        raise RuntimeError('grad_scale, found_inf and max_grad_norm do not support sparse gradients')
+    if found_inf is None:
+        found_inf = torch.zeros(1, dtype=torch.float32,
+                                device=grads[0].device if grad_scale is None else grad_scale.device)
+    inv_scale = None
+    if grad_scale is not None:
+        inv_scale = grad_scale.double().reciprocal().float()
+
+    groups = OrderedDict()
+    for g in grads:
+        groups.setdefault(g.device, []).append(g)
+
+    if max_grad_norm is not None:
+        norm_type = float(norm_type)
+
+        def norm(t):
+            return t.abs().max() if norm_type == inf else torch.norm(t, norm_type)
+
+        # the norm of the scaled gradients is finite if and only if all of them are
+        group_norms = []
+        for device, group in groups.items():
+            flat = _flat_view(group)
+            if flat is not None:
+                group_norms.append(norm(flat).to(found_inf.device))
+            else:
+                group_norms.append(norm(torch.stack([norm(g) for g in group])).to(found_inf.device))
+        total_norm = norm(torch.stack(group_norms))
+        if inv_scale is not None:
+            found_inf.masked_fill_(torch.isfinite(total_norm).logical_not(), 1.)
+            total_norm = total_norm * inv_scale
+        coef = torch.clamp(max_grad_norm / (total_norm + 1e-6), max=1.0)
+        if inv_scale is not None:
+            coef = coef * inv_scale
+        for device, group in groups.items():
+            _mul_(group, coef.to(device))
+    elif inv_scale is not None:
+        for device, group in groups.items():
+            device_found_inf = found_inf if device == found_inf.device else torch.zeros_like(found_inf, device=device)
+            device_inv_scale = inv_scale.to(device)
+            if device.type == 'cuda':
+                # unscales and checks each gradient in a single pass
+                for g in group:
+                    torch._amp_non_finite_check_and_unscale_(g, device_found_inf, device_inv_scale)
+            else:
+                _mul_(group, device_inv_scale)
+                finite = torch.stack([torch.isfinite(g).all() for g in group]).all()
+                device_found_inf.masked_fill_(finite.logical_not(), 1.)
+            if device_found_inf is not found_inf:
+                found_inf.add_(device_found_inf.to(found_inf.device))
+
+    skip = found_inf.sum().ne(0)
+    take_step = {}
+    for device, group in groups.items():
+        device_skip = skip.to(device)
+        flat = _flat_view(group)
+        for g in (group if flat is None else [flat]):
+            g.masked_fill_(device_skip, 0.)
+        # in double precision, so that the factors computed from it are as exact as python floats
+        take_step[device] = device_skip.logical_not().double()
+    return take_step
+
+
+def _prepare_step(optimizer, grad_scale=None, found_inf=None, max_grad_norm=None, grad_scaler=None):
+    # Returns the result of _unscale_clip_and_check_ on the gradients of all the parameters of
+    # `optimizer`, or None if the step needs no preparation.
+    if grad_scaler is not None:
+        grad_scale, found_inf = _grad_scaler_args(optimizer, grad_scaler)
+    if grad_scale is None and found_inf is None and max_grad_norm is None:
+        return None
+    grads = [p.grad for group in optimizer.param_groups for p in group['params'] if p.grad is not None]
+    if not grads:
+        return None
+    return _unscale_clip_and_check_(grads, grad_scale, found_inf, max_grad_norm)
+
+
+def _adam_bias_corrections(params, states, betas, take_step):
+    # Returns, for each of `params`, 0-dim tensors of its dtype holding take_step / (1 - beta1 ** t)
+    # and sqrt(1 - beta2 ** t), where t is the number of steps the parameter took, this one
+    # included unless it is skipped. state['step'] counts skipped steps too, t is counted on the
+    # device by state['taken_steps'].
+    beta1, beta2 = betas
+    groups = OrderedDict()
+    for i, (p, state) in enumerate(zip(params, states)):
+        if 'taken_steps' not in state:
+            # state['step'] was already advanced for this step
+            state['taken_steps'] = torch.full((), state['step'] - 1, dtype=torch.double, device=p.device)
+        groups.setdefault((p.device, p.dtype), []).append(i)
+
+    step_factors = [None] * len(params)
+    bias_corrections2_sqrt = [None] * len(params)
+    for (device, dtype), indices in groups.items():
+        taken_steps = [states[i]['taken_steps'] for i in indices]
+        torch._foreach_add_(taken_steps, [take_step[device]] * len(indices))
+        # a parameter whose steps were all skipped took none, but its update is multiplied by 0
+        t = torch.stack(taken_steps).clamp_(min=1)
+        factors = (take_step[device] / (1 - torch.pow(beta1, t))).to(dtype)
+        corrections2_sqrt = (1 - torch.pow(beta2, t)).sqrt_().to(dtype)
+        for i, factor, correction2_sqrt in zip(indices, factors.unbind(), corrections2_sqrt.unbind()):
+            step_factors[i] = factor
+            bias_corrections2_sqrt[i] = correction2_sqrt
+    return step_factors, bias_corrections2_sqrt
+
+
+def _skip_factors(factor, take_step):
+    # `factor` on each device, or 1 if the step is skipped
+    return {device: take * factor + (1 - take) for device, take in take_step.items()}
+
+
+def _expand(factors, tensors):
+    # Expands the 0-dim `factors`, one for each of `tensors`, to the size of their tensor. The
+    # list overloads of the foreach ops need tensors of matching sizes, and take a per-tensor
+    # path for expanded ones, which still dispatches all the tensors in one call.
+    return [f.expand_as(t) for f, t in zip(factors, tensors)]
+
+
+def _device_factors(factors, tensors):
+    # `factors[t.device]` for each of `tensors`, in its dtype
+    cast = {}
+    result = []
+    for t in tensors:
+        key = (t.device, t.dtype)
+        if key not in cast:
+            cast[key] = factors[t.device].to(t.dtype)
+        result.append(cast[key])
+    return result
+
+
+def _mul_unless_skipped_(tensors, factor, take_step):
+    factors = _skip_factors(factor, take_step)
+    flat = _flat_view(tensors)
+    if flat is not None:
+        flat.mul_(factors[flat.device])
+    else:
+        torch._foreach_mul_(tensors, _expand(_device_factors(factors, tensors), tensors))
+
+
+def _add_unless_skipped(tensors, others, alpha, take_step):
+    # tensors + alpha * others, or tensors if the step is skipped
+    return torch._foreach_addcmul(tensors, others, _expand(_device_factors(take_step, others), others),
+                                  value=alpha)
+
+
+def _add_unless_skipped_(tensors, others, alpha, take_step):
+    torch._foreach_addcmul_(tensors, others, _expand(_device_factors(take_step, others), others),
+                            value=alpha)
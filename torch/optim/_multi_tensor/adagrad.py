@@ -0,0 +1,114 @@
+import torch
+from ..optimizer import Optimizer
+from ..functional import _make_sparse
+
+class Adagrad(Optimizer):
+    r"""Implements Adagrad algorithm with multi tensor APIs.
+
+    It has been proposed in `Adaptive Subgradient Methods for Online Learning
+    and Stochastic Optimization`_.
+
+    Arguments:
+        params (iterable): iterable of parameters to optimize or dicts defining
+            parameter groups
+        lr (float, optional): learning rate (default: 1e-2)
+        lr_decay (float, optional): learning rate decay (default: 0)
+        weight_decay (float, optional): weight decay (L2 penalty) (default: 0)
+        eps (float, optional): term added to the denominator to improve
+            numerical stability (default: 1e-10)
+
+    .. _Adaptive Subgradient Methods for Online Learning and Stochastic
+        Optimization: http://jmlr.org/papers/v12/duchi11a.html
+    """
+
+    def __init__(self, params, lr=1e-2, lr_decay=0, weight_decay=0, initial_accumulator_value=0, eps=1e-10):
+        if not 0.0 <= lr:
+            raise ValueError("Invalid learning rate: {}".format(lr))
+        if not 0.0 <= lr_decay:
+            raise ValueError("Invalid lr_decay value: {}".format(lr_decay))
+        if not 0.0 <= weight_decay:
+            raise ValueError("Invalid weight_decay value: {}".format(weight_decay))
+        if not 0.0 <= initial_accumulator_value:
+            raise ValueError("Invalid initial_accumulator_value value: {}".format(initial_accumulator_value))
+        if not 0.0 <= eps:
+            raise ValueError("Invalid epsilon value: {}".format(eps))
+
+        defaults = dict(lr=lr, lr_decay=lr_decay, eps=eps, weight_decay=weight_decay,
+                        initial_accumulator_value=initial_accumulator_value)
+        super(Adagrad, self).__init__(params, defaults)
+
+        for group in self.param_groups:
+            for p in group['params']:
+                state = self.state[p]
+                state['step'] = 0
+                state['sum'] = torch.full_like(p, initial_accumulator_value, memory_format=torch.preserve_format)
+
+    def share_memory(self):
+        for group in self.param_groups:
+            for p in group['params']:
+                state = self.state[p]
+                state['sum'].share_memory_()
+
+    @torch.no_grad()
+    def step(self, closure=None):
+        """Performs a single optimization step.
+
+        Arguments:
+            closure (callable, optional): A closure that reevaluates the model
+                and returns the loss.
+        """
+        loss = None
+        if closure is not None:
+            with torch.enable_grad():
+                loss = closure()
+
+        for group in self.param_groups:
+            params_with_grad = []
+            grads = []
+            state_sums = []
+            clrs = []
+
+            for p in group['params']:
+                if p.grad is None:
+                    continue
+                state = self.state[p]
+                state['step'] += 1
+                clr = group['lr'] / (1 + (state['step'] - 1) * group['lr_decay'])
+
+                if p.grad.is_sparse:
+                    # sparse gradients cannot be batched, update them one by one
+                    if group['weight_decay'] != 0:
+                        raise RuntimeError("weight_decay option is not compatible with sparse gradients")
+                    grad = p.grad.coalesce()  # the update is non-linear so indices must be unique
+                    grad_indices = grad._indices()
+                    grad_values = grad._values()
+                    state['sum'].add_(_make_sparse(grad, grad_indices, grad_values.pow(2)))
+                    std = state['sum'].sparse_mask(grad)
+                    std_values = std._values().sqrt_().add_(group['eps'])
+                    p.add_(_make_sparse(grad, grad_indices, grad_values / std_values), alpha=-clr)
+                    continue
+
+                params_with_grad.append(p)
+                grads.append(p.grad)
+                state_sums.append(state['sum'])
+                clrs.append(clr)
+
+            if not params_with_grad:
+                continue
+
+            if group['weight_decay'] != 0:
+                grads = torch._foreach_add(grads, params_with_grad, alpha=group['weight_decay'])
+
+            torch._foreach_addcmul_(state_sums, grads, grads, value=1)
+            std = torch._foreach_sqrt(state_sums)
+            torch._foreach_add_(std, group['eps'])
+
+            if all(clr == clrs[0] for clr in clrs):
+                torch._foreach_addcdiv_(params_with_grad, grads, std, value=-clrs[0])
+            else:
+                # parameters that did not always have a gradient are at different steps
+                updates = torch._foreach_div(grads, std)
+                torch._foreach_mul_scalar_list_(updates, [-clr for clr in clrs])
+                torch._foreach_add_(params_with_grad, updates)
+
+        return loss
@@ -1,6 +1,7 @@
 import math
 import torch
 from ..optimizer import Optimizer
+from ._grad_scaling import _prepare_step, _mul_unless_skipped_, _add_unless_skipped, _adam_bias_corrections, _expand
 
 class Adam(Optimizer):
     r"""Implements Adam algorithm with multi tensor APIs.
@@ -51,19 +52,41 @@ class Adam(Optimizer):
         for group in self.param_groups:
             group.setdefault('amsgrad', False)
 
+    # GradScaler.step passes itself to step, see the grad_scaler argument
+    _step_supports_amp_scaling = True
+
     @torch.no_grad()
-    def step(self, closure=None):
+    def step(self, closure=None, grad_scale=None, found_inf=None, max_grad_norm=None, grad_scaler=None):
         """Performs a single optimization step.
 
+        The gradients can be unscaled, checked for infs and NaNs, and clipped
+        as part of the step, which is then skipped if needed without
+        synchronizing with the host. ``state['step']`` then counts skipped
+        steps too, while the bias corrections use the number of steps taken,
+        counted on the device by ``state['taken_steps']``.
+
         Arguments:
             closure (callable, optional): A closure that reevaluates the model
                 and returns the loss.
+            grad_scale (Tensor, optional): the factor the gradients were scaled
+                by. The gradients are unscaled in place, and :attr:`found_inf`
+                is set to 1 if any of them has an inf or a NaN.
+            found_inf (Tensor, optional): a one-element float tensor; the step
+                is skipped if it is not zero.
+            max_grad_norm (float, optional): if given, the gradients of all
+                parameter groups are clipped in place to this total norm (see
+                :func:`torch.nn.utils.clip_grad_norm_`).
+            grad_scaler (GradScaler, optional): set by
+                :meth:`torch.cuda.amp.GradScaler.step`, which then provides
+                :attr:`grad_scale` and :attr:`found_inf`.
         """
         loss = None
         if closure is not None:
             with torch.enable_grad():
                 loss = closure()
 
+        take_step = _prepare_step(self, grad_scale, found_inf, max_grad_norm, grad_scaler)
+
         for group in self.param_groups:
             amsgrad = group['amsgrad']
 
@@ -106,37 +129,53 @@ class Adam(Optimizer):
 
             beta1, beta2 = group['betas']
 
-            bias_correction1 = [1 - beta1 ** state['step'] for state in states] 
-            bias_correction2 = [1 - beta2 ** state['step'] for state in states] 
+            if take_step is None:
+                bias_correction1 = [1 - beta1 ** state['step'] for state in states]
+                bias_correction2 = [1 - beta2 ** state['step'] for state in states]
+            else:
+                # the bias corrections only count the steps taken
+                step_factors, bias_correction2_sqrt = _adam_bias_corrections(
+                    params_with_grad, states, group['betas'], take_step)
             if group['weight_decay'] != 0:
-                grads = torch._foreach_add(grads, params_with_grad, alpha=group['weight_decay'])
+                if take_step is None:
+                    grads = torch._foreach_add(grads, params_with_grad, alpha=group['weight_decay'])
+                else:
+                    # the gradients of a skipped step are zero, the penalty must be too
+                    grads = _add_unless_skipped(grads, params_with_grad, group['weight_decay'], take_step)
 
             #
             # Decay the first and second moment running average coefficient
             #
-            torch._foreach_mul_(exp_avg, beta1)
+            if take_step is None:
+                torch._foreach_mul_(exp_avg, beta1)
+                torch._foreach_mul_(exp_avg_sq, beta2)
+            else:
+                _mul_unless_skipped_(exp_avg, beta1, take_step)
+                _mul_unless_skipped_(exp_avg_sq, beta2, take_step)
             torch._foreach_add_(exp_avg, grads, alpha=1 - beta1)
-
-            torch._foreach_mul_(exp_avg_sq, beta2)
             torch._foreach_addcmul_(exp_avg_sq, grads, grads, 1 - beta2)
 
             if amsgrad:
                 # Maintains the maximum of all 2nd moment running avg. till now
                 [torch.max(a, b, out=a) for a, b in zip(max_exp_avg_sq, exp_avg_sq)]
                 # Use the max. for normalizing running avg. of gradient
-                max_exp_avg_sq_sqrt = torch._foreach_sqrt(max_exp_avg_sq)
-                bias_correction_sqrt = [math.sqrt(bc) for bc in bias_correction2]
-                torch._foreach_div_scalar_list_(max_exp_avg_sq_sqrt, bias_correction_sqrt)
-                denom = torch._foreach_add(max_exp_avg_sq_sqrt, group['eps'])
+                exp_avg_sq_sqrt = torch._foreach_sqrt(max_exp_avg_sq)
             else:
                 exp_avg_sq_sqrt = torch._foreach_sqrt(exp_avg_sq)
+            if take_step is None:
                 bias_correction_sqrt = [math.sqrt(bc) for bc in bias_correction2]
                 torch._foreach_div_scalar_list_(exp_avg_sq_sqrt, bias_correction_sqrt)
-                denom = torch._foreach_add(exp_avg_sq_sqrt, group['eps'])
-
-            step_size = [group['lr'] / bc for bc in bias_correction1]
+            else:
+                torch._foreach_div_(exp_avg_sq_sqrt, _expand(bias_correction2_sqrt, exp_avg_sq_sqrt))
+            denom = torch._foreach_add(exp_avg_sq_sqrt, group['eps'])
 
-            for i in range(len(step_size)):
-                params_with_grad[i].addcdiv_(exp_avg[i], denom[i], value=-step_size[i])
+            if take_step is None:
+                step_size = [group['lr'] / bc for bc in bias_correction1]
+                for i in range(len(step_size)):
+                    params_with_grad[i].addcdiv_(exp_avg[i], denom[i], value=-step_size[i])
+            else:
+                updates = torch._foreach_div(exp_avg, denom)
+                torch._foreach_addcmul_(params_with_grad, updates, _expand(step_factors, updates),
+                                        value=-group['lr'])
 
         return loss
@@ -1,5 +1,7 @@
-from typing import Tuple
+from typing import Any, Callable, Optional, Tuple
+from ... import Tensor
 from ..optimizer import _params_t, Optimizer
 
 class AdamW(Optimizer):
     def __init__(self, params: _params_t, lr: float=..., betas: Tuple[float, float]=..., eps: float=..., weight_decay: float=..., amsgrad: bool = ...) -> None: ...
+    def step(self, closure: Optional[Callable[[], float]]=..., grad_scale: Optional[Tensor]=..., found_inf: Optional[Tensor]=..., max_grad_norm: Optional[float]=..., grad_scaler: Optional[Any]=...) -> Optional[float]: ...
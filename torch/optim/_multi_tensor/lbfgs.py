@@ -0,0 +1,69 @@
+import torch
+from torch.nn.utils.flat_parameters import _flat_view
+from .. import lbfgs
+
+
+class LBFGS(lbfgs.LBFGS):
+    """Implements L-BFGS algorithm with multi tensor APIs, heavily inspired by `minFunc
+    <https://www.cs.ubc.ca/~schmidtm/Software/minFunc.html>`.
+
+    The updates of the parameters are batched. When the parameters, and their
+    gradients, are contiguous slices of a single flat tensor (e.g. after
+    :class:`torch.nn.utils.FlatParameters`), gathering the gradients and
+    updating the parameters each take a single operation on the flat tensors.
+
+    .. warning::
+        This optimizer doesn't support per-parameter options and parameter
+        groups (there can be only one).
+
+    .. warning::
+        Right now all parameters have to be on a single device. This will be
+        improved in the future.
+
+    .. note::
+        This is a very memory intensive optimizer (it requires additional
+        ``param_bytes * (history_size + 1)`` bytes). If it doesn't fit in memory
+        try reducing the history size, or use a different algorithm.
+
+    Arguments:
+        lr (float): learning rate (default: 1)
+        max_iter (int): maximal number of iterations per optimization step
+            (default: 20)
+        max_eval (int): maximal number of function evaluations per optimization
+            step (default: max_iter * 1.25).
+        tolerance_grad (float): termination tolerance on first order optimality
+            (default: 1e-5).
+        tolerance_change (float): termination tolerance on function
+            value/parameter changes (default: 1e-9).
+        history_size (int): update history size (default: 100).
+        line_search_fn (str): either 'strong_wolfe' or None (default: None).
+    """
+
+    def _gather_flat_grad(self):
+        flat_grad = _flat_view([p.grad for p in self._params])
+        if flat_grad is not None:
+            # the gradients are overwritten by the next evaluation of the closure
+            return flat_grad.clone()
+        return super(LBFGS, self)._gather_flat_grad()
+
+    def _add_grad(self, step_size, update):
+        flat_param = _flat_view(self._params)
+        if flat_param is not None:
+            flat_param.add_(update, alpha=step_size)
+            return
+        updates = update.split([p.numel() for p in self._params])
+        # view as to avoid deprecated pointwise semantics
+        torch._foreach_add_(self._params, [u.view_as(p) for u, p in zip(updates, self._params)], alpha=step_size)
+
+    def _clone_param(self):
+        flat_param = _flat_view(self._params)
+        if flat_param is not None:
+            return [flat_param.clone()]
+        return super(LBFGS, self)._clone_param()
+
+    def _set_param(self, params_data):
+        flat_param = _flat_view(self._params)
+        if flat_param is not None and len(params_data) == 1:
+            flat_param.copy_(params_data[0].view(-1))
+            return
+        super(LBFGS, self)._set_param(params_data)
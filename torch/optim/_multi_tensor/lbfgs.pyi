@@ -0,0 +1,6 @@
+from typing import Tuple, Optional
+from ..optimizer import _params_t
+from .. import lbfgs
+
+class LBFGS(lbfgs.LBFGS):
+    def __init__(self, params: _params_t, lr: float=..., max_iter: int=..., max_eval: Optional[int]=..., tolerance_grad: float=..., tolerance_change: float=..., history_size: int=..., line_search_fn: Optional[str]=...) -> None: ...
@@ -1,5 +1,6 @@
 import torch
 from ..optimizer import Optimizer, required
+from ._grad_scaling import _prepare_step, _mul_unless_skipped_, _add_unless_skipped, _add_unless_skipped_
 
 
 class SGD(Optimizer):
@@ -72,19 +73,42 @@ class SGD(Optimizer):
         for group in self.param_groups:
             group.setdefault('nesterov', False)
 
+    # GradScaler.step passes itself to step, see the grad_scaler argument
+    _step_supports_amp_scaling = True
+
     @torch.no_grad()
-    def step(self, closure=None):
+    def step(self, closure=None, grad_scale=None, found_inf=None, max_grad_norm=None, grad_scaler=None):
         """Performs a single optimization step.
 
+        The gradients can be unscaled, checked for infs and NaNs, and clipped
+        as part of the step, which is then skipped if needed without
+        synchronizing with the host. A momentum buffer created by a skipped
+        step is zero, so with ``dampening`` the first step taken afterwards
+        dampens the gradient it adds to it, unlike the first step of a buffer
+        created by a step taken.
+
         Arguments:
             closure (callable, optional): A closure that reevaluates the model
                 and returns the loss.
+            grad_scale (Tensor, optional): the factor the gradients were scaled
+                by. The gradients are unscaled in place, and :attr:`found_inf`
+                is set to 1 if any of them has an inf or a NaN.
+            found_inf (Tensor, optional): a one-element float tensor; the step
+                is skipped if it is not zero.
+            max_grad_norm (float, optional): if given, the gradients of all
+                parameter groups are clipped in place to this total norm (see
+                :func:`torch.nn.utils.clip_grad_norm_`).
+            grad_scaler (GradScaler, optional): set by
+                :meth:`torch.cuda.amp.GradScaler.step`, which then provides
+                :attr:`grad_scale` and :attr:`found_inf`.
         """
         loss = None
         if closure is not None:
             with torch.enable_grad():
                 loss = closure()
 
+        take_step = _prepare_step(self, grad_scale, found_inf, max_grad_norm, grad_scaler)
+
         for group in self.param_groups:
             weight_decay = group['weight_decay']
             momentum = group['momentum']
@@ -112,7 +136,11 @@ class SGD(Optimizer):
                 return loss
 
             if weight_decay != 0:
-                grads = torch._foreach_add(grads, params_with_grad, alpha=weight_decay)
+                if take_step is None:
+                    grads = torch._foreach_add(grads, params_with_grad, alpha=weight_decay)
+                else:
+                    # the gradients of a skipped step are zero, the penalty must be too
+                    grads = _add_unless_skipped(grads, params_with_grad, weight_decay, take_step)
 
             if momentum != 0:
                 bufs = []
@@ -126,7 +154,10 @@ class SGD(Optimizer):
                         bufs.append(states[i]['momentum_buffer'])
 
                 if all_states_with_momentum_buffer:
-                    torch._foreach_mul_(bufs, momentum)
+                    if take_step is None:
+                        torch._foreach_mul_(bufs, momentum)
+                    else:
+                        _mul_unless_skipped_(bufs, momentum, take_step)
                     torch._foreach_add_(bufs, grads, alpha=1 - dampening)
                 else:
                     bufs = []
@@ -135,7 +166,11 @@ class SGD(Optimizer):
                             buf = states[i]['momentum_buffer'] = torch.clone(grads[i]).detach()
                         else:
                             buf = states[i]['momentum_buffer']
-                            buf.mul_(momentum).add_(grads[i], alpha=1 - dampening)
+                            if take_step is None:
+                                buf.mul_(momentum)
+                            else:
+                                _mul_unless_skipped_([buf], momentum, take_step)
+                            buf.add_(grads[i], alpha=1 - dampening)
 
                         bufs.append(buf)
 
@@ -144,7 +179,9 @@ class SGD(Optimizer):
                 else:
                     grads = bufs
 
-            if not has_sparse_grad:
+            if take_step is not None:
+                _add_unless_skipped_(params_with_grad, grads, -group['lr'], take_step)
+            elif not has_sparse_grad:
                 torch._foreach_add_(params_with_grad, grads, alpha=-group['lr'])
             else:
                 # foreach APIs dont support sparse
@@ -1,4 +1,7 @@
+from typing import Any, Callable, Optional
+from ... import Tensor
 from ..optimizer import _params_t, Optimizer
 
 class SGD(Optimizer):
     def __init__(self, params: _params_t, lr: float, momentum: float=..., dampening: float=..., weight_decay:float=..., nesterov:bool=...) -> None: ...
+    def step(self, closure: Optional[Callable[[], float]]=..., grad_scale: Optional[Tensor]=..., found_inf: Optional[Tensor]=..., max_grad_norm: Optional[float]=..., grad_scaler: Optional[Any]=...) -> Optional[float]: ...
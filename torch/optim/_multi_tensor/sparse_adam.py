@@ -0,0 +1,138 @@
+import math
+import torch
+from ..optimizer import Optimizer
+from ..functional import _make_sparse
+
+class SparseAdam(Optimizer):
+    r"""Implements lazy version of Adam algorithm suitable for sparse tensors with
+    multi tensor APIs.
+
+    In this variant, only moments that show up in the gradient get updated, and
+    only those portions of the gradient get applied to the parameters. The
+    arithmetic on the values of the gradients of all parameters of a group is
+    batched, only the sparse masking and updates are done per parameter.
+
+    Arguments:
+        params (iterable): iterable of parameters to optimize or dicts defining
+            parameter groups
+        lr (float, optional): learning rate (default: 1e-3)
+        betas (Tuple[float, float], optional): coefficients used for computing
+            running averages of gradient and its square (default: (0.9, 0.999))
+        eps (float, optional): term added to the denominator to improve
+            numerical stability (default: 1e-8)
+
+    .. _Adam\: A Method for Stochastic Optimization:
+        https://arxiv.org/abs/1412.6980
+    """
+
+    def __init__(self, params, lr=1e-3, betas=(0.9, 0.999), eps=1e-8):
+        if not 0.0 < lr:
+            raise ValueError("Invalid learning rate: {}".format(lr))
+        if not 0.0 < eps:
+            raise ValueError("Invalid epsilon value: {}".format(eps))
+        if not 0.0 <= betas[0] < 1.0:
+            raise ValueError("Invalid beta parameter at index 0: {}".format(betas[0]))
+        if not 0.0 <= betas[1] < 1.0:
+            raise ValueError("Invalid beta parameter at index 1: {}".format(betas[1]))
+
+        sparse_params = []
+        for index, param in enumerate(params):
+            if isinstance(param, dict):
+                for d_index, d_param in enumerate(param.get("params", [])):
+                    if d_param.is_sparse:
+                        sparse_params.append([index, d_index])
+            elif param.is_sparse:
+                sparse_params.append(index)
+        if sparse_params:
+            raise ValueError(
+                f"Sparse params at indices {sparse_params}: SparseAdam requires dense parameter tensors"
+            )
+
+        defaults = dict(lr=lr, betas=betas, eps=eps)
+        super(SparseAdam, self).__init__(params, defaults)
+
+    @torch.no_grad()
+    def step(self, closure=None):
+        """Performs a single optimization step.
+
+        Arguments:
+            closure (callable, optional): A closure that reevaluates the model
+                and returns the loss.
+        """
+        loss = None
+        if closure is not None:
+            with torch.enable_grad():
+                loss = closure()
+
+        for group in self.param_groups:
+            params_with_grad = []
+            grads = []
+            grad_values = []
+            exp_avgs = []
+            exp_avg_sqs = []
+            old_exp_avg_values = []
+            old_exp_avg_sq_values = []
+            step_sizes = []
+            beta1, beta2 = group['betas']
+
+            for p in group['params']:
+                if p.grad is None:
+                    continue
+                if not p.grad.is_sparse:
+                    raise RuntimeError('SparseAdam does not support dense gradients, please consider Adam instead')
+
+                state = self.state[p]
+
+                # State initialization
+                if len(state) == 0:
+                    state['step'] = 0
+                    # Exponential moving average of gradient values
+                    state['exp_avg'] = torch.zeros_like(p, memory_format=torch.preserve_format)
+                    # Exponential moving average of squared gradient values
+                    state['exp_avg_sq'] = torch.zeros_like(p, memory_format=torch.preserve_format)
+
+                state['step'] += 1
+
+                grad = p.grad.coalesce()  # the update is non-linear so indices must be unique
+                params_with_grad.append(p)
+                grads.append(grad)
+                grad_values.append(grad._values())
+                exp_avgs.append(state['exp_avg'])
+                exp_avg_sqs.append(state['exp_avg_sq'])
+                old_exp_avg_values.append(state['exp_avg'].sparse_mask(grad)._values())
+                old_exp_avg_sq_values.append(state['exp_avg_sq'].sparse_mask(grad)._values())
+
+                bias_correction1 = 1 - beta1 ** state['step']
+                bias_correction2 = 1 - beta2 ** state['step']
+                step_sizes.append(-group['lr'] * math.sqrt(bias_correction2) / bias_correction1)
+
+            if not params_with_grad:
+                continue
+
+            # Decay the first and second moment running average coefficient
+            #      old <- b * old + (1 - b) * new
+            # <==> old += (1 - b) * (new - old)
+            exp_avg_update_values = torch._foreach_sub(grad_values, old_exp_avg_values)
+            torch._foreach_mul_(exp_avg_update_values, 1 - beta1)
+            exp_avg_sq_update_values = torch._foreach_mul(grad_values, grad_values)
+            torch._foreach_sub_(exp_avg_sq_update_values, old_exp_avg_sq_values)
+            torch._foreach_mul_(exp_avg_sq_update_values, 1 - beta2)
+            for grad, exp_avg, exp_avg_sq, exp_avg_update, exp_avg_sq_update in zip(
+                    grads, exp_avgs, exp_avg_sqs, exp_avg_update_values, exp_avg_sq_update_values):
+                exp_avg.add_(_make_sparse(grad, grad._indices(), exp_avg_update))
+                exp_avg_sq.add_(_make_sparse(grad, grad._indices(), exp_avg_sq_update))
+
+            # Dense addition again is intended, avoiding another sparse_mask
+            torch._foreach_add_(exp_avg_update_values, old_exp_avg_values)
+            numer = exp_avg_update_values
+            torch._foreach_add_(exp_avg_sq_update_values, old_exp_avg_sq_values)
+            denom = exp_avg_sq_update_values
+            torch._foreach_sqrt_(denom)
+            torch._foreach_add_(denom, group['eps'])
+            torch._foreach_div_(numer, denom)
+            torch._foreach_mul_scalar_list_(numer, step_sizes)
+
+            for p, grad, update in zip(params_with_grad, grads, numer):
+                p.add_(_make_sparse(grad, grad._indices(), update))
+
+        return loss
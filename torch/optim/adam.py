@@ -1,6 +1,7 @@
 import torch
 from . import functional as F
 from .optimizer import Optimizer
+from ._compact_moments import _check_moment_dtype, _load_moment, _store_moment, _dequantized_state
 
 
 class Adam(Optimizer):
@@ -22,6 +23,14 @@ class Adam(Optimizer):
         amsgrad (boolean, optional): whether to use the AMSGrad variant of this
             algorithm from the paper `On the Convergence of Adam and Beyond`_
             (default: False)
+        moment_dtype (torch.dtype, optional): if given, the moments are stored
+            as ``torch.float16`` or ``torch.bfloat16`` tensors, or quantized to
+            8 bits by blocks of 2048 values if ``torch.int8``, instead of in
+            the dtype of the parameters. They are converted back one parameter
+            at a time during :meth:`step`, and :meth:`state_dict` dequantizes
+            them, so that it can be loaded by any optimizer of this class.
+            ``torch.bfloat16`` is preferred over ``torch.float16``, in which
+            small second moments underflow. (default: None)
 
     .. _Adam\: A Method for Stochastic Optimization:
         https://arxiv.org/abs/1412.6980
@@ -32,7 +41,7 @@ class Adam(Optimizer):
     """
 
     def __init__(self, params, lr=1e-3, betas=(0.9, 0.999), eps=1e-8,
-                 weight_decay=0, amsgrad=False):
+                 weight_decay=0, amsgrad=False, moment_dtype=None):
         if not 0.0 <= lr:
             raise ValueError("Invalid learning rate: {}".format(lr))
         if not 0.0 <= eps:
@@ -43,14 +52,21 @@ class Adam(Optimizer):
             raise ValueError("Invalid beta parameter at index 1: {}".format(betas[1]))
         if not 0.0 <= weight_decay:
             raise ValueError("Invalid weight_decay value: {}".format(weight_decay))
+        _check_moment_dtype(moment_dtype)
         defaults = dict(lr=lr, betas=betas, eps=eps,
-                        weight_decay=weight_decay, amsgrad=amsgrad)
+                        weight_decay=weight_decay, amsgrad=amsgrad, moment_dtype=moment_dtype)
         super(Adam, self).__init__(params, defaults)
 
     def __setstate__(self, state):
         super(Adam, self).__setstate__(state)
         for group in self.param_groups:
             group.setdefault('amsgrad', False)
+            group.setdefault('moment_dtype', None)
+
+    def state_dict(self):
+        state_dict = super(Adam, self).state_dict()
+        state_dict['state'] = {k: _dequantized_state(v) for k, v in state_dict['state'].items()}
+        return state_dict
 
     @torch.no_grad()
     def step(self, closure=None):
@@ -85,19 +101,22 @@ class Adam(Optimizer):
                     # Lazy state initialization
                     if len(state) == 0:
                         state['step'] = 0
-                        # Exponential moving average of gradient values
-                        state['exp_avg'] = torch.zeros_like(p, memory_format=torch.preserve_format)
-                        # Exponential moving average of squared gradient values
-                        state['exp_avg_sq'] = torch.zeros_like(p, memory_format=torch.preserve_format)
-                        if group['amsgrad']:
-                            # Maintains max of all exp. moving avg. of sq. grad. values
-                            state['max_exp_avg_sq'] = torch.zeros_like(p, memory_format=torch.preserve_format)
-
-                    exp_avgs.append(state['exp_avg'])
-                    exp_avg_sqs.append(state['exp_avg_sq'])
+                        # compact moments are initialized by _compact_step
+                        if group['moment_dtype'] is None:
+                            # Exponential moving average of gradient values
+                            state['exp_avg'] = torch.zeros_like(p, memory_format=torch.preserve_format)
+                            # Exponential moving average of squared gradient values
+                            state['exp_avg_sq'] = torch.zeros_like(p, memory_format=torch.preserve_format)
+                            if group['amsgrad']:
+                                # Maintains max of all exp. moving avg. of sq. grad. values
+                                state['max_exp_avg_sq'] = torch.zeros_like(p, memory_format=torch.preserve_format)
+
+                    if group['moment_dtype'] is None:
+                        exp_avgs.append(state['exp_avg'])
+                        exp_avg_sqs.append(state['exp_avg_sq'])
 
-                    if group['amsgrad']:
-                        max_exp_avg_sqs.append(state['max_exp_avg_sq'])
+                        if group['amsgrad']:
+                            max_exp_avg_sqs.append(state['max_exp_avg_sq'])
 
                     # update the steps for each param group update
                     state['step'] += 1
@@ -105,6 +124,9 @@ class Adam(Optimizer):
                     state_steps.append(state['step'])
 
             beta1, beta2 = group['betas']
+            if group['moment_dtype'] is not None:
+                self._compact_step(group, params_with_grad, grads, state_steps)
+                continue
             F.adam(params_with_grad,
                    grads,
                    exp_avgs,
@@ -119,3 +141,29 @@ class Adam(Optimizer):
                    group['eps']
                    )
         return loss
+
+    def _compact_step(self, group, params, grads, state_steps):
+        # the moments of a single parameter are converted to its dtype at a time
+        keys = ['exp_avg', 'exp_avg_sq'] + (['max_exp_avg_sq'] if group['amsgrad'] else [])
+        beta1, beta2 = group['betas']
+        for param, grad, step in zip(params, grads, state_steps):
+            state = self.state[param]
+            if 'exp_avg' in state:
+                moments = [_load_moment(state, key, param) for key in keys]
+            else:
+                moments = [torch.zeros_like(param, memory_format=torch.preserve_format) for _ in keys]
+            F.adam([param],
+                   [grad],
+                   [moments[0]],
+                   [moments[1]],
+                   moments[2:],
+                   [step],
+                   group['amsgrad'],
+                   beta1,
+                   beta2,
+                   group['lr'],
+                   group['weight_decay'],
+                   group['eps']
+                   )
+            for key, moment in zip(keys, moments):
+                _store_moment(state, key, moment, group['moment_dtype'])
@@ -1,6 +1,7 @@
 import math
 import torch
 from .optimizer import Optimizer
+from ._compact_moments import _check_moment_dtype, _load_moment, _store_moment, _dequantized_state
 
 
 class AdamW(Optimizer):
@@ -21,6 +22,14 @@ class AdamW(Optimizer):
         amsgrad (boolean, optional): whether to use the AMSGrad variant of this
             algorithm from the paper `On the Convergence of Adam and Beyond`_
             (default: False)
+        moment_dtype (torch.dtype, optional): if given, the moments are stored
+            as ``torch.float16`` or ``torch.bfloat16`` tensors, or quantized to
+            8 bits by blocks of 2048 values if ``torch.int8``, instead of in
+            the dtype of the parameters. They are converted back one parameter
+            at a time during :meth:`step`, and :meth:`state_dict` dequantizes
+            them, so that it can be loaded by any optimizer of this class.
+            ``torch.bfloat16`` is preferred over ``torch.float16``, in which
+            small second moments underflow. (default: None)
 
     .. _Adam\: A Method for Stochastic Optimization:
         https://arxiv.org/abs/1412.6980
@@ -31,7 +40,7 @@ class AdamW(Optimizer):
     """
 
     def __init__(self, params, lr=1e-3, betas=(0.9, 0.999), eps=1e-8,
-                 weight_decay=1e-2, amsgrad=False):
+                 weight_decay=1e-2, amsgrad=False, moment_dtype=None):
         if not 0.0 <= lr:
             raise ValueError("Invalid learning rate: {}".format(lr))
         if not 0.0 <= eps:
@@ -42,14 +51,21 @@ class AdamW(Optimizer):
             raise ValueError("Invalid beta parameter at index 1: {}".format(betas[1]))
         if not 0.0 <= weight_decay:
             raise ValueError("Invalid weight_decay value: {}".format(weight_decay))
+        _check_moment_dtype(moment_dtype)
         defaults = dict(lr=lr, betas=betas, eps=eps,
-                        weight_decay=weight_decay, amsgrad=amsgrad)
+                        weight_decay=weight_decay, amsgrad=amsgrad, moment_dtype=moment_dtype)
         super(AdamW, self).__init__(params, defaults)
 
     def __setstate__(self, state):
         super(AdamW, self).__setstate__(state)
         for group in self.param_groups:
             group.setdefault('amsgrad', False)
+            group.setdefault('moment_dtype', None)
+
+    def state_dict(self):
+        state_dict = super(AdamW, self).state_dict()
+        state_dict['state'] = {k: _dequantized_state(v) for k, v in state_dict['state'].items()}
+        return state_dict
 
     @torch.no_grad()
     def step(self, closure=None):
@@ -91,9 +107,16 @@ class AdamW(Optimizer):
                         # Maintains max of all exp. moving avg. of sq. grad. values
                         state['max_exp_avg_sq'] = torch.zeros_like(p, memory_format=torch.preserve_format)
 
-                exp_avg, exp_avg_sq = state['exp_avg'], state['exp_avg_sq']
-                if amsgrad:
-                    max_exp_avg_sq = state['max_exp_avg_sq']
+                moment_dtype = group['moment_dtype']
+                if moment_dtype is None:
+                    exp_avg, exp_avg_sq = state['exp_avg'], state['exp_avg_sq']
+                    if amsgrad:
+                        max_exp_avg_sq = state['max_exp_avg_sq']
+                else:
+                    # the moments of a single parameter are converted to its dtype at a time
+                    exp_avg, exp_avg_sq = _load_moment(state, 'exp_avg', p), _load_moment(state, 'exp_avg_sq', p)
+                    if amsgrad:
+                        max_exp_avg_sq = _load_moment(state, 'max_exp_avg_sq', p)
                 beta1, beta2 = group['betas']
 
                 state['step'] += 1
@@ -115,4 +138,10 @@ class AdamW(Optimizer):
 
                 p.addcdiv_(exp_avg, denom, value=-step_size)
 
+                if moment_dtype is not None:
+                    _store_moment(state, 'exp_avg', exp_avg, moment_dtype)
+                    _store_moment(state, 'exp_avg_sq', exp_avg_sq, moment_dtype)
+                    if amsgrad:
+                        _store_moment(state, 'max_exp_avg_sq', max_exp_avg_sq, moment_dtype)
+
         return loss
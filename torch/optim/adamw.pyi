@@ -1,5 +1,6 @@
-from typing import Tuple
+from typing import Optional, Tuple
+from .. import dtype
 from .optimizer import _params_t, Optimizer
 
 class AdamW(Optimizer):
-    def __init__(self, params: _params_t, lr: float=..., betas: Tuple[float, float]=..., eps: float=..., weight_decay: float=..., amsgrad: bool = ...) -> None: ...
+    def __init__(self, params: _params_t, lr: float=..., betas: Tuple[float, float]=..., eps: float=..., weight_decay: float=..., amsgrad: bool = ..., moment_dtype: Optional[dtype]=...) -> None: ...
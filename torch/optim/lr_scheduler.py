@@ -21,6 +21,30 @@ EPOCH_DEPRECATION_WARNING = (
 
 SAVE_STATE_WARNING = "Please also save or load the state of the optimizer when saving or loading the scheduler."
 
+
+def _per_group(fn, *values):
+    # Applies `fn` to `values`, or to the values of each group if some of them are lists
+    # of per-group values.
+    lengths = [len(value) for value in values if isinstance(value, list)]
+    if not lengths:
+        return fn(*values)
+    return [fn(*group_values) for group_values in
+            zip(*[value if isinstance(value, list) else [value] * lengths[0] for value in values])]
+
+
+def _affine_lrs(base_lrs, scale, shift):
+    # The learning rates `scale * base_lr + shift`, where `scale` and `shift` are shared by all
+    # groups or lists of per-group values, so that schedules are evaluated once per step.
+    return _per_group(lambda base_lr, scale, shift: scale * base_lr + shift, base_lrs, scale, shift)
+
+
+def _lambda_values(lr_lambdas, epoch):
+    # Evaluates the lambdas of the groups at `epoch`, once if all groups share the same one.
+    if all(lmbda is lr_lambdas[0] for lmbda in lr_lambdas):
+        return lr_lambdas[0](epoch)
+    return [lmbda(epoch) for lmbda in lr_lambdas]
+
+
 class _LRScheduler(object):
 
     def __init__(self, optimizer, last_epoch=-1, verbose=False):
@@ -247,8 +271,10 @@ class LambdaLR(_LRScheduler):
             warnings.warn("To get the last learning rate computed by the scheduler, "
                           "please use `get_last_lr()`.")
 
-        return [base_lr * lmbda(self.last_epoch)
-                for lmbda, base_lr in zip(self.lr_lambdas, self.base_lrs)]
+        return _affine_lrs(self.base_lrs, *self._get_closed_form_coefficients())
+
+    def _get_closed_form_coefficients(self):
+        return _lambda_values(self.lr_lambdas, self.last_epoch), 0.
 
 
 class MultiplicativeLR(_LRScheduler):
@@ -325,8 +351,8 @@ class MultiplicativeLR(_LRScheduler):
                           "please use `get_last_lr()`.", UserWarning)
 
         if self.last_epoch > 0:
-            return [group['lr'] * lmbda(self.last_epoch)
-                    for lmbda, group in zip(self.lr_lambdas, self.optimizer.param_groups)]
+            lrs = [group['lr'] for group in self.optimizer.param_groups]
+            return _affine_lrs(lrs, _lambda_values(self.lr_lambdas, self.last_epoch), 0.)
         else:
             return list(self.base_lrs)
 
@@ -374,9 +400,11 @@ class StepLR(_LRScheduler):
         return [group['lr'] * self.gamma
                 for group in self.optimizer.param_groups]
 
+    def _get_closed_form_coefficients(self):
+        return self.gamma ** (self.last_epoch // self.step_size), 0.
+
     def _get_closed_form_lr(self):
-        return [base_lr * self.gamma ** (self.last_epoch // self.step_size)
-                for base_lr in self.base_lrs]
+        return _affine_lrs(self.base_lrs, *self._get_closed_form_coefficients())
 
 
 class MultiStepLR(_LRScheduler):
@@ -421,10 +449,12 @@ class MultiStepLR(_LRScheduler):
         return [group['lr'] * self.gamma ** self.milestones[self.last_epoch]
                 for group in self.optimizer.param_groups]
 
-    def _get_closed_form_lr(self):
+    def _get_closed_form_coefficients(self):
         milestones = list(sorted(self.milestones.elements()))
-        return [base_lr * self.gamma ** bisect_right(milestones, self.last_epoch)
-                for base_lr in self.base_lrs]
+        return self.gamma ** bisect_right(milestones, self.last_epoch), 0.
+
+    def _get_closed_form_lr(self):
+        return _affine_lrs(self.base_lrs, *self._get_closed_form_coefficients())
 
 
 class ExponentialLR(_LRScheduler):
@@ -453,9 +483,11 @@ class ExponentialLR(_LRScheduler):
         return [group['lr'] * self.gamma
                 for group in self.optimizer.param_groups]
 
+    def _get_closed_form_coefficients(self):
+        return self.gamma ** self.last_epoch, 0.
+
     def _get_closed_form_lr(self):
-        return [base_lr * self.gamma ** self.last_epoch
-                for base_lr in self.base_lrs]
+        return _affine_lrs(self.base_lrs, *self._get_closed_form_coefficients())
 
 
 class CosineAnnealingLR(_LRScheduler):
@@ -511,19 +543,21 @@ class CosineAnnealingLR(_LRScheduler):
         if self.last_epoch == 0:
             return self.base_lrs
         elif (self.last_epoch - 1 - self.T_max) % (2 * self.T_max) == 0:
-            return [group['lr'] + (base_lr - self.eta_min) *
-                    (1 - math.cos(math.pi / self.T_max)) / 2
+            increase = (1 - math.cos(math.pi / self.T_max)) / 2
+            return [group['lr'] + (base_lr - self.eta_min) * increase
                     for base_lr, group in
                     zip(self.base_lrs, self.optimizer.param_groups)]
-        return [(1 + math.cos(math.pi * self.last_epoch / self.T_max)) /
-                (1 + math.cos(math.pi * (self.last_epoch - 1) / self.T_max)) *
-                (group['lr'] - self.eta_min) + self.eta_min
+        ratio = ((1 + math.cos(math.pi * self.last_epoch / self.T_max)) /
+                 (1 + math.cos(math.pi * (self.last_epoch - 1) / self.T_max)))
+        return [ratio * (group['lr'] - self.eta_min) + self.eta_min
                 for group in self.optimizer.param_groups]
 
+    def _get_closed_form_coefficients(self):
+        scale = (1 + math.cos(math.pi * self.last_epoch / self.T_max)) / 2
+        return scale, self.eta_min * (1 - scale)
+
     def _get_closed_form_lr(self):
-        return [self.eta_min + (base_lr - self.eta_min) *
-                (1 + math.cos(math.pi * self.last_epoch / self.T_max)) / 2
-                for base_lr in self.base_lrs]
+        return _affine_lrs(self.base_lrs, *self._get_closed_form_coefficients())
 
 
 class ReduceLROnPlateau(object):
@@ -899,24 +933,18 @@ class CyclicLR(_LRScheduler):
         else:
             scale_factor = (x - 1) / (self.step_ratio - 1)
 
-        lrs = []
-        for base_lr, max_lr in zip(self.base_lrs, self.max_lrs):
-            base_height = (max_lr - base_lr) * scale_factor
-            if self.scale_mode == 'cycle':
-                lr = base_lr + base_height * self.scale_fn(cycle)
-            else:
-                lr = base_lr + base_height * self.scale_fn(self.last_epoch)
-            lrs.append(lr)
+        # the scale is shared by all groups
+        if self.scale_mode == 'cycle':
+            scale = self.scale_fn(cycle)
+        else:
+            scale = self.scale_fn(self.last_epoch)
+
+        lrs = [base_lr + (max_lr - base_lr) * scale_factor * scale
+               for base_lr, max_lr in zip(self.base_lrs, self.max_lrs)]
 
         if self.cycle_momentum:
-            momentums = []
-            for base_momentum, max_momentum in zip(self.base_momentums, self.max_momentums):
-                base_height = (max_momentum - base_momentum) * scale_factor
-                if self.scale_mode == 'cycle':
-                    momentum = max_momentum - base_height * self.scale_fn(cycle)
-                else:
-                    momentum = max_momentum - base_height * self.scale_fn(self.last_epoch)
-                momentums.append(momentum)
+            momentums = [max_momentum - (max_momentum - base_momentum) * scale_factor * scale
+                         for base_momentum, max_momentum in zip(self.base_momentums, self.max_momentums)]
             for param_group, momentum in zip(self.optimizer.param_groups, momentums):
                 param_group['momentum'] = momentum
 
@@ -971,8 +999,8 @@ class CosineAnnealingWarmRestarts(_LRScheduler):
             warnings.warn("To get the last learning rate computed by the scheduler, "
                           "please use `get_last_lr()`.", UserWarning)
 
-        return [self.eta_min + (base_lr - self.eta_min) * (1 + math.cos(math.pi * self.T_cur / self.T_i)) / 2
-                for base_lr in self.base_lrs]
+        scale = (1 + math.cos(math.pi * self.T_cur / self.T_i)) / 2
+        return _affine_lrs(self.base_lrs, scale, self.eta_min * (1 - scale))
 
     def step(self, epoch=None):
         """Step could be called after every batch update
@@ -1247,18 +1275,25 @@ class OneCycleLR(_LRScheduler):
             raise ValueError("Tried to step {} times. The specified number of total steps is {}"
                              .format(step_num + 1, self.total_steps))
 
+        # the annealing is evaluated once, as the weight of the end values of all groups
+        if step_num <= self.step_size_up:
+            up = True
+            weight = self.anneal_func(0., 1., step_num / self.step_size_up)
+        else:
+            up = False
+            weight = self.anneal_func(0., 1., (step_num - self.step_size_up) / self.step_size_down)
+
         for group in self.optimizer.param_groups:
-            if step_num <= self.step_size_up:
-                computed_lr = self.anneal_func(group['initial_lr'], group['max_lr'], step_num / self.step_size_up)
+            if up:
+                computed_lr = group['initial_lr'] + (group['max_lr'] - group['initial_lr']) * weight
                 if self.cycle_momentum:
-                    computed_momentum = self.anneal_func(group['max_momentum'], group['base_momentum'],
-                                                         step_num / self.step_size_up)
+                    computed_momentum = (group['max_momentum'] +
+                                         (group['base_momentum'] - group['max_momentum']) * weight)
             else:
-                down_step_num = step_num - self.step_size_up
-                computed_lr = self.anneal_func(group['max_lr'], group['min_lr'], down_step_num / self.step_size_down)
+                computed_lr = group['max_lr'] + (group['min_lr'] - group['max_lr']) * weight
                 if self.cycle_momentum:
-                    computed_momentum = self.anneal_func(group['base_momentum'], group['max_momentum'],
-                                                         down_step_num / self.step_size_down)
+                    computed_momentum = (group['base_momentum'] +
+                                         (group['max_momentum'] - group['base_momentum']) * weight)
 
             lrs.append(computed_lr)
             if self.cycle_momentum:
@@ -1269,3 +1304,87 @@ class OneCycleLR(_LRScheduler):
                     group['momentum'] = computed_momentum
 
         return lrs
+
+
+class ChainedScheduler(object):
+    """Chains schedulers of the same optimizer that have a closed form:
+    :class:`LambdaLR`, :class:`StepLR`, :class:`MultiStepLR`,
+    :class:`ExponentialLR` and :class:`CosineAnnealingLR`. Each scheduler is
+    applied to the learning rates computed by the previous ones, as if they
+    were stepped one after the other, but the learning rates of all groups
+    are computed from their initial values in a single pass at each step,
+    from the schedules of all schedulers evaluated once.
+
+    The schedulers must not be stepped on their own once chained.
+
+    Args:
+        schedulers (list): The schedulers to chain, in the order they apply.
+
+    Example:
+        >>> # Assuming optimizer uses lr = 0.05 for all groups
+        >>> # lr = 0.05 * min(1, (epoch + 1) / 10) * 0.95 ** epoch
+        >>> warmup = LambdaLR(optimizer, lambda epoch: min(1., (epoch + 1) / 10))
+        >>> decay = ExponentialLR(optimizer, gamma=0.95)
+        >>> scheduler = ChainedScheduler([warmup, decay])
+        >>> for epoch in range(100):
+        >>>     train(...)
+        >>>     validate(...)
+        >>>     scheduler.step()
+    """
+
+    def __init__(self, schedulers):
+        if len(schedulers) == 0:
+            raise ValueError("ChainedScheduler expects at least one scheduler")
+        self.optimizer = schedulers[0].optimizer
+        for scheduler in schedulers:
+            if scheduler.optimizer is not self.optimizer:
+                raise ValueError("ChainedScheduler expects all schedulers to belong to the same optimizer")
+            if not hasattr(scheduler, '_get_closed_form_coefficients'):
+                raise TypeError("{} has no closed form and cannot be chained".format(
+                    type(scheduler).__name__))
+        self.schedulers = list(schedulers)
+        self._set_lrs()
+
+    def step(self):
+        for scheduler in self.schedulers:
+            scheduler.last_epoch += 1
+        self._set_lrs()
+
+    def _set_lrs(self):
+        # each schedule maps a learning rate lr to scale * lr + shift, so their
+        # composition is also affine
+        scale, shift = 1., 0.
+        for scheduler in self.schedulers:
+            scheduler_scale, scheduler_shift = scheduler._get_closed_form_coefficients()
+            scale, shift = (_per_group(lambda a, b: a * b, scheduler_scale, scale),
+                            _per_group(lambda a, b, c: a * b + c, scheduler_scale, shift, scheduler_shift))
+        lrs = _affine_lrs(self.schedulers[0].base_lrs, scale, shift)
+        for param_group, lr in zip(self.optimizer.param_groups, lrs):
+            param_group['lr'] = lr
+        self._last_lr = lrs
+        for scheduler in self.schedulers:
+            scheduler._last_lr = lrs
+
+    def get_last_lr(self):
+        """ Return last computed learning rate by the chained schedulers.
+        """
+        return self._last_lr
+
+    def state_dict(self):
+        """Returns the state of the chained schedulers as a :class:`dict`.
+
+        It contains an entry for the state of each scheduler.
+        """
+        return {'_last_lr': self._last_lr,
+                'schedulers': [scheduler.state_dict() for scheduler in self.schedulers]}
+
+    def load_state_dict(self, state_dict):
+        """Loads the state of the chained schedulers.
+
+        Arguments:
+            state_dict (dict): state of the chained schedulers. Should be an
+                object returned from a call to :meth:`state_dict`.
+        """
+        for scheduler, scheduler_state_dict in zip(self.schedulers, state_dict['schedulers']):
+            scheduler.load_state_dict(scheduler_state_dict)
+        self._last_lr = state_dict['_last_lr']
@@ -37,3 +37,10 @@ class CyclicLR(_LRScheduler):
 
 class CosineAnnealingWarmRestarts(_LRScheduler):
     def __init__(self, optimizer: Optimizer, T_0: int=..., T_mult: int=..., eta_min: int=..., last_epoch: int=...) -> None: ...
+
+class ChainedScheduler:
+    def __init__(self, schedulers: List[_LRScheduler]) -> None: ...
+    def step(self) -> None: ...
+    def get_last_lr(self) -> List[float]: ...
+    def state_dict(self) -> dict: ...
+    def load_state_dict(self, state_dict: dict) -> None: ...
@@ -1,19 +1,25 @@
+import copy
 import difflib
 import os
 import io
+import itertools
 import shutil
 import struct
 import sys
 import torch
 import tarfile
 import tempfile
+import threading
 import warnings
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import closing, contextmanager
 from ._utils import _import_dotted_name
-from ._six import string_classes as _string_classes
+from ._six import string_classes as _string_classes, container_abcs
 from torch._utils_internal import get_source_lines_and_file
 from torch.types import Storage
-from typing import Any, BinaryIO, cast, Dict, Optional, Type, Tuple, Union
+from typing import Any, BinaryIO, cast, Dict, Iterable, Iterator, Optional, Type, Tuple, Union
 import copyreg
 import pickle
 import pathlib
@@ -331,7 +337,8 @@ def _check_dill_version(pickle_module) -> None:
             ))
 
 def save(obj, f: Union[str, os.PathLike, BinaryIO],
-         pickle_module=pickle, pickle_protocol=DEFAULT_PROTOCOL, _use_new_zipfile_serialization=True) -> None:
+         pickle_module=pickle, pickle_protocol=DEFAULT_PROTOCOL, _use_new_zipfile_serialization=True,
+         *, num_threads: int = 0) -> None:
     """Saves an object to a disk file.
 
     See also: `saving-loading-tensors`
@@ -342,6 +349,10 @@ def save(obj, f: Union[str, os.PathLike, BinaryIO],
            os.PathLike object containing a file name
         pickle_module: module used for pickling metadata and objects
         pickle_protocol: can be specified to override the default protocol
+        num_threads: if positive, storages that are not on the CPU are copied
+            to the CPU by that many threads while the storages before them
+            are written, with at most ``num_threads + 1`` copies held at a
+            time. Only supported by the zipfile-based format.
 
     .. note::
         A common PyTorch convention is to save tensors using .pt file extension.
@@ -366,14 +377,85 @@ def save(obj, f: Union[str, os.PathLike, BinaryIO],
     """
     _check_dill_version(pickle_module)
 
+    if num_threads < 0:
+        raise ValueError("num_threads should be a non-negative integer, but got num_threads={}"
+                         .format(num_threads))
+    if num_threads > 0 and not _use_new_zipfile_serialization:
+        raise ValueError("num_threads is only supported by the zipfile-based format of torch.save")
+
     with _open_file_like(f, 'wb') as opened_file:
         if _use_new_zipfile_serialization:
             with _open_zipfile_writer(opened_file) as opened_zipfile:
-                _save(obj, opened_zipfile, pickle_module, pickle_protocol)
+                _save(obj, opened_zipfile, pickle_module, pickle_protocol, num_threads)
                 return
         _legacy_save(obj, opened_file, pickle_module, pickle_protocol)
 
 
+def save_async(obj, f: Union[str, os.PathLike, BinaryIO],
+               pickle_module=pickle, pickle_protocol=DEFAULT_PROTOCOL, *, num_threads: int = 0) -> Future:
+    """Saves an object to a disk file in the background, like :func:`torch.save`.
+
+    The object is pickled and its storages are snapshotted (copied to the CPU)
+    before this function returns, so the tensors of :attr:`obj` can be modified
+    right away, e.g., by the next optimizer step. The file is then written by a
+    background thread, which does not hold the GIL while writing storages.
+
+    Args:
+        obj: saved object
+        f: a file-like object (has to implement write and flush) or a string or
+           os.PathLike object containing a file name. A file-like object must
+           not be used until the returned future is done.
+        pickle_module: module used for pickling metadata and objects
+        pickle_protocol: can be specified to override the default protocol
+        num_threads: if positive, storages are snapshotted by that many threads
+
+    Returns:
+        a :class:`concurrent.futures.Future` whose result is ``None`` once the
+        file is written, or which raises the error that occurred while writing.
+
+    .. note::
+        The snapshot holds a CPU copy of every storage of :attr:`obj` until
+        the file is written.
+
+    Example:
+        >>> future = torch.serialization.save_async(model.state_dict(), 'checkpoint.pt')
+        >>> optimizer.step()  # does not modify the checkpoint being written
+        >>> future.result()  # waits for the file to be written
+    """
+    _check_dill_version(pickle_module)
+
+    if num_threads < 0:
+        raise ValueError("num_threads should be a non-negative integer, but got num_threads={}"
+                         .format(num_threads))
+
+    data_value, serialized_storages = _pickle_storages(obj, pickle_module, pickle_protocol)
+    keys = sorted(serialized_storages.keys())
+    storages = [serialized_storages[key] for key in keys]
+    if num_threads > 0:
+        with ThreadPoolExecutor(num_threads) as executor:
+            staged = list(executor.map(_snapshot_storage, storages))
+    else:
+        staged = [_snapshot_storage(storage) for storage in storages]
+    del storages, serialized_storages
+
+    future = Future()  # type: Future
+    future.set_running_or_notify_cancel()
+
+    def write():
+        try:
+            with _open_file_like(f, 'wb') as opened_file:
+                with _open_zipfile_writer(opened_file) as opened_zipfile:
+                    _write_records(opened_zipfile, data_value, zip(keys, staged))
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+
+    thread = threading.Thread(target=write, name='torch.save_async')
+    thread.start()
+    return future
+
+
 def _legacy_save(obj, f, pickle_module, pickle_protocol) -> None:
     import torch.nn as nn
     serialized_container_types = {}
@@ -447,7 +529,35 @@ def _legacy_save(obj, f, pickle_module, pickle_protocol) -> None:
         serialized_storages[key]._write_file(f, _should_read_directly(f), True)
 
 
-def _save(obj, zip_file, pickle_module, pickle_protocol):
+def _save(obj, zip_file, pickle_module, pickle_protocol, num_threads=0):
+    data_value, serialized_storages = _pickle_storages(obj, pickle_module, pickle_protocol)
+    keys = sorted(serialized_storages.keys())
+    storages = [serialized_storages[key] for key in keys]
+    if num_threads > 0:
+        # Records are written in order by this thread, as soon as the pool has
+        # staged them.
+        with ThreadPoolExecutor(num_threads) as executor:
+            staged = _map_bounded(executor, _stage_storage, storages, num_threads)
+            _write_records(zip_file, data_value, zip(keys, staged))
+    else:
+        _write_records(zip_file, data_value, zip(keys, map(_stage_storage, storages)))
+
+
+def _map_bounded(executor, fn, items, max_pending):
+    # Like executor.map(fn, items), but submits an item only when fewer than
+    # `max_pending` results are waiting to be consumed, so that at most
+    # `max_pending + 1` results (counting the one being consumed) are alive.
+    it = iter(items)
+    pending = deque(executor.submit(fn, item) for item in itertools.islice(it, max_pending))
+    while pending:
+        result = pending.popleft().result()
+        pending.extend(executor.submit(fn, item) for item in itertools.islice(it, 1))
+        yield result
+        del result
+
+
+def _pickle_storages(obj, pickle_module, pickle_protocol):
+    # Returns the pickle data for `obj`, and the storages it references by key
     serialized_storages = {}
 
     def persistent_id(obj):
@@ -469,31 +579,46 @@ def _save(obj, zip_file, pickle_module, pickle_protocol):
                     obj.size())
         return None
 
-    # Write the pickle data for `obj`
     data_buf = io.BytesIO()
     pickler = pickle_module.Pickler(data_buf, protocol=pickle_protocol)
     pickler.persistent_id = persistent_id
     pickler.dump(obj)
-    data_value = data_buf.getvalue()
+    return data_buf.getvalue(), serialized_storages
+
+
+def _stage_storage(storage):
+    # Returns what _write_records writes for `storage`: the storage itself if
+    # it's on the CPU, since we can directly copy it into the zip file, and
+    # its serialized bytes otherwise.
+    if storage.device.type == 'cpu':
+        return storage
+    buf = io.BytesIO()
+    storage._write_file(buf, _should_read_directly(buf), False)
+    return buf.getvalue()
+
+
+def _snapshot_storage(storage):
+    # Like _stage_storage, but never shares memory with `storage`
+    if storage.device.type == 'cpu':
+        return storage.clone()
+    return _stage_storage(storage)
+
+
+def _write_records(zip_file, data_value, staged_storages):
+    # Write the pickle data
     zip_file.write_record('data.pkl', data_value, len(data_value))
 
     # Write each tensor to a file named tensor/the_tensor_key in the zip archive
-    for key in sorted(serialized_storages.keys()):
+    for key, staged in staged_storages:
         name = f'data/{key}'
-        storage = serialized_storages[key]
-        if storage.device.type == 'cpu':
-            # If it's on the CPU we can directly copy it into the zip file
-            num_bytes = storage.size() * storage.element_size()
-            zip_file.write_record(name, storage.data_ptr(), num_bytes)
+        if isinstance(staged, bytes):
+            zip_file.write_record(name, staged, len(staged))
         else:
-            # Copy to a buffer, then serialize that
-            buf = io.BytesIO()
-            storage._write_file(buf, _should_read_directly(buf), False)
-            buf_value = buf.getvalue()
-            zip_file.write_record(name, buf_value, len(buf_value))
+            num_bytes = staged.size() * staged.element_size()
+            zip_file.write_record(name, staged.data_ptr(), num_bytes)
 
 
-def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
+def load(f, map_location=None, pickle_module=pickle, *, mmap=False, **pickle_load_args):
     """Loads an object saved with :func:`torch.save` from a file.
 
     :func:`torch.load` uses Python's unpickling facilities but treats storages,
@@ -532,6 +657,13 @@ def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
             locations
         pickle_module: module used for unpickling metadata and objects (has to
             match the :attr:`pickle_module` used to serialize file)
+        mmap: if ``True``, storages are memory-mapped from the file instead of
+            being read into freshly allocated memory, so that loading is almost
+            free and the pages of the file are only read (and shared with other
+            processes through the page cache) when accessed. The mapping is
+            private: writes to the loaded tensors never reach the file.
+            Requires :attr:`f` to be a file name, saved with the zipfile-based
+            format (the default).
         pickle_load_args: (Python 3 only) optional keyword arguments passed over to
             :func:`pickle_module.load` and :func:`pickle_module.Unpickler`, e.g.,
             :attr:`errors=...`.
@@ -572,9 +704,14 @@ def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
         >>> torch.load(buffer)
         # Load a module with 'ascii' encoding for unpickling
         >>> torch.load('module.pt', encoding='ascii')
+        # Memory-map the storages of a large checkpoint
+        >>> torch.load('checkpoint.pt', map_location='cpu', mmap=True)
     """
     _check_dill_version(pickle_module)
 
+    if mmap and not _is_path(f):
+        raise ValueError("mmap=True requires f to be a file name, but got {}".format(type(f).__name__))
+
     if 'encoding' not in pickle_load_args.keys():
         pickle_load_args['encoding'] = 'utf-8'
 
@@ -591,7 +728,12 @@ def load(f, map_location=None, pickle_module=pickle, **pickle_load_args):
                                   " silence this warning)", UserWarning)
                     opened_file.seek(orig_position)
                     return torch.jit.load(opened_file)
-                return _load(opened_zipfile, map_location, pickle_module, **pickle_load_args)
+                mapped_records = _MappedRecords(f) if mmap else None
+                return _load(opened_zipfile, map_location, pickle_module,
+                             mapped_records=mapped_records, **pickle_load_args)
+        if mmap:
+            raise RuntimeError("mmap=True is only supported for files saved with the zipfile-based "
+                               "format of torch.save (_use_new_zipfile_serialization=True)")
         return _legacy_load(opened_file, map_location, pickle_module, **pickle_load_args)
 
 
@@ -821,16 +963,68 @@ def _get_restore_location(map_location):
     return restore_location
 
 
-def _load(zip_file, map_location, pickle_module, pickle_file='data.pkl', **pickle_load_args):
+class _MappedRecords(object):
+    r"""Memory-maps the storage records of a zipfile-based checkpoint.
+
+    :class:`torch._C.PyTorchFileWriter` stores records uncompressed and aligned
+    to 64 bytes, so the bytes of a storage can be used in place. The file is
+    mapped privately (copy-on-write) once per storage type, and each storage is
+    a slice of the mapping of its type. Records that cannot be mapped (e.g.,
+    compressed by another zip tool) are read normally.
+    """
+
+    def __init__(self, filename):
+        self.filename = os.fspath(filename)
+        self.file_size = os.path.getsize(self.filename)
+        self.offsets = {}
+        with open(self.filename, 'rb') as f, zipfile.ZipFile(f) as zf:
+            for info in zf.infolist():
+                if info.compress_type != zipfile.ZIP_STORED:
+                    continue
+                # The offset of the data follows the local header, whose extra
+                # field may differ from the one of the central directory.
+                f.seek(info.header_offset)
+                header = f.read(zipfile.sizeFileHeader)
+                name_len, extra_len = struct.unpack('<HH', header[26:30])
+                # Records are named `<archive name>/<record name>`
+                record = info.filename.split('/', 1)[-1]
+                self.offsets[record] = info.header_offset + zipfile.sizeFileHeader + name_len + extra_len
+        self.mappings = {}
+
+    def get_storage(self, name, data_type, size):
+        r"""Returns the storage of record ``name`` mapped from the file, or
+        ``None`` if it cannot be mapped."""
+        offset = self.offsets.get(name)
+        element_size = data_type(0).element_size()
+        if offset is None or offset % element_size != 0:
+            return None
+        if data_type not in self.mappings:
+            self.mappings[data_type] = data_type.from_file(
+                self.filename, False, self.file_size // element_size)
+        start = offset // element_size
+        return self.mappings[data_type][start:start + size]
+
+
+def _load_storage(zip_file, mapped_records, data_type, size, key):
+    name = f'data/{key}'
+    dtype = data_type(0).dtype
+
+    storage = None
+    if mapped_records is not None:
+        storage = mapped_records.get_storage(name, data_type, size)
+    if storage is None:
+        storage = zip_file.get_storage_from_record(name, size, dtype).storage()
+    return storage
+
+
+def _load(zip_file, map_location, pickle_module, pickle_file='data.pkl', mapped_records=None,
+          **pickle_load_args):
     restore_location = _get_restore_location(map_location)
 
     loaded_storages = {}
 
     def load_tensor(data_type, size, key, location):
-        name = f'data/{key}'
-        dtype = data_type(0).dtype
-
-        storage = zip_file.get_storage_from_record(name, size, dtype).storage()
+        storage = _load_storage(zip_file, mapped_records, data_type, size, key)
         loaded_storages[key] = restore_location(storage, location)
 
     def persistent_load(saved_id):
@@ -857,5 +1051,210 @@ def _load(zip_file, map_location, pickle_module, pickle_file='data.pkl', **pickl
     return result
 
 
+class _LazyStorage(object):
+    r"""Placeholder for a storage of a lazily loaded checkpoint."""
+    __slots__ = ['data_type', 'key', 'location', 'size']
+
+    def __init__(self, data_type, key, location, size):
+        self.data_type = data_type
+        self.key = key
+        self.location = location
+        self.size = size
+
+
+class _LazyRebuild(object):
+    r"""Placeholder for a call to a ``torch._utils._rebuild_*`` function (e.g.,
+    the one rebuilding a tensor from its storage) of a lazily loaded
+    checkpoint."""
+    __slots__ = ['fn', 'args']
+
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+
+
+class LazyCheckpoint(container_abcs.Mapping):
+    r"""Read-only mapping over a checkpoint whose tensors are loaded on first
+    access. Returned by :func:`lazy_load`.
+
+    Indexing returns the value stored under a key, loading the storages of its
+    tensors if they were not loaded yet. Loaded storages are cached, so views
+    keep sharing their storage across keys, until :meth:`close` is called.
+    """
+
+    def __init__(self, zip_file, obj, restore_location, mapped_records=None, opened_file=None):
+        self._zip_file = zip_file
+        self._obj = obj
+        self._restore_location = restore_location
+        self._mapped_records = mapped_records
+        # Keeps the file-like object read by `zip_file` alive
+        self._opened_file = opened_file
+        self._loaded_storages = {}  # type: Dict[str, Any]
+
+    def __getitem__(self, key):
+        result = self._materialize(self._obj[key], {})
+        torch._utils._validate_loaded_sparse_tensors()
+        return result
+
+    def __iter__(self) -> Iterator:
+        return iter(self._obj)
+
+    def __len__(self) -> int:
+        return len(self._obj)
+
+    def load(self, keys: Optional[Iterable] = None):
+        r"""Loads the values of ``keys`` (all keys by default) and returns them
+        in a mapping of the same type as the checkpoint, e.g., an
+        :class:`~collections.OrderedDict` that can be passed to
+        :meth:`~torch.nn.Module.load_state_dict` (with ``strict=False`` if only
+        some keys are loaded).
+        """
+        if keys is None:
+            keys = list(self._obj.keys())
+        else:
+            keys = list(keys)
+            missing = [k for k in keys if k not in self._obj]
+            if missing:
+                raise KeyError("keys not found in checkpoint: {}".format(missing))
+        memo = {}  # type: Dict[int, Any]
+        if isinstance(self._obj, OrderedDict):
+            result = OrderedDict()  # type: Dict[Any, Any]
+        else:
+            result = {}
+        for k in keys:
+            result[k] = self._materialize(self._obj[k], memo)
+        torch._utils._validate_loaded_sparse_tensors()
+        # state_dicts carry the version of their modules
+        metadata = getattr(self._obj, '_metadata', None)
+        if metadata is not None:
+            result._metadata = metadata  # type: ignore
+        return result
+
+    def close(self) -> None:
+        r"""Closes the checkpoint and releases the storages loaded so far."""
+        self._zip_file = None
+        self._opened_file = None
+        self._mapped_records = None
+        self._loaded_storages = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _load_storage(self, lazy_storage):
+        key = lazy_storage.key
+        if key not in self._loaded_storages:
+            if self._zip_file is None:
+                raise RuntimeError("cannot load tensors from a closed LazyCheckpoint")
+            storage = _load_storage(self._zip_file, self._mapped_records, lazy_storage.data_type,
+                                    lazy_storage.size, key)
+            self._loaded_storages[key] = self._restore_location(storage, lazy_storage.location)
+        return self._loaded_storages[key]
+
+    def _materialize(self, obj, memo):
+        # `memo` preserves the identity of objects referenced more than once
+        if isinstance(obj, _LazyStorage):
+            return self._load_storage(obj)
+        if isinstance(obj, _LazyRebuild):
+            if id(obj) not in memo:
+                memo[id(obj)] = obj.fn(*self._materialize(obj.args, memo))
+            return memo[id(obj)]
+        if isinstance(obj, _string_classes) or torch.is_tensor(obj):
+            return obj
+        if isinstance(obj, dict):
+            if id(obj) not in memo:
+                # copies keep the type and attributes of `obj`, e.g., the
+                # `_metadata` of nested state_dicts
+                result = copy.copy(obj)
+                for k, v in obj.items():
+                    result[k] = self._materialize(v, memo)
+                memo[id(obj)] = result
+            return memo[id(obj)]
+        if isinstance(obj, tuple) and hasattr(obj, '_fields'):  # namedtuple
+            return type(obj)(*(self._materialize(v, memo) for v in obj))
+        if isinstance(obj, (list, tuple)):
+            return type(obj)(self._materialize(v, memo) for v in obj)
+        return obj
+
+
+def lazy_load(f, map_location=None, pickle_module=pickle, *, mmap=False,
+              **pickle_load_args) -> LazyCheckpoint:
+    r"""Opens a checkpoint saved with :func:`torch.save` without loading its
+    tensors.
+
+    Only the pickled structure of the checkpoint is read. The returned
+    :class:`LazyCheckpoint` loads the storages of a tensor the first time a
+    value containing it is accessed, and :meth:`LazyCheckpoint.load` loads a
+    chosen subset of keys, so that only the data of these keys is read from
+    :attr:`f`.
+
+    The checkpoint must have been saved with the zipfile-based format (the
+    default) and be a mapping, e.g., a ``state_dict``. Tensors are loaded
+    lazily when they are stored in (nested) dicts, lists and tuples; other
+    objects containing tensors are not supported.
+
+    Args:
+        f: a file-like object (has to implement :meth:`read`, :meth`readline`, :meth`tell`,
+            and :meth`seek`), or a string or os.PathLike object containing a file name.
+            File-like objects must stay open until the checkpoint is closed.
+        map_location: same as in :func:`torch.load`
+        pickle_module: same as in :func:`torch.load`
+        mmap: same as in :func:`torch.load`
+        pickle_load_args: same as in :func:`torch.load`
+
+    Example:
+        >>> with torch.serialization.lazy_load('checkpoint.pt', map_location='cpu') as checkpoint:
+        ...     encoder_keys = [k for k in checkpoint if k.startswith('encoder.')]
+        ...     model.encoder.load_state_dict(checkpoint.load(encoder_keys), strict=False)
+    """
+    _check_dill_version(pickle_module)
+
+    if 'encoding' not in pickle_load_args.keys():
+        pickle_load_args['encoding'] = 'utf-8'
+    if mmap and not _is_path(f):
+        raise ValueError("mmap=True requires f to be a file name, but got {}".format(type(f).__name__))
+
+    with _open_file_like(f, 'rb') as opened_file:
+        is_zipfile = _is_zipfile(opened_file)
+    if not is_zipfile:
+        raise RuntimeError("lazy_load is only supported for files saved with the zipfile-based "
+                           "format of torch.save (_use_new_zipfile_serialization=True)")
+    if _is_path(f):
+        zip_file = torch._C.PyTorchFileReader(os.fspath(f))
+        opened_file = None
+    else:
+        zip_file = torch._C.PyTorchFileReader(f)
+        opened_file = f
+
+    def persistent_load(saved_id):
+        assert isinstance(saved_id, tuple)
+        typename = _maybe_decode_ascii(saved_id[0])
+        data = saved_id[1:]
+
+        assert typename == 'storage', \
+            f"Unknown typename for persistent_load, expected 'storage' but got '{typename}'"
+        data_type, key, location, size = data
+        return _LazyStorage(data_type, key, _maybe_decode_ascii(location), size)
+
+    class LazyUnpickler(pickle_module.Unpickler):  # type: ignore
+        def find_class(self, mod_name, name):
+            fn = super().find_class(mod_name, name)
+            if mod_name == 'torch._utils' and name.startswith('_rebuild_'):
+                return lambda *args: _LazyRebuild(fn, args)
+            return fn
+
+    data_file = io.BytesIO(zip_file.get_record('data.pkl'))
+    unpickler = LazyUnpickler(data_file, **pickle_load_args)
+    unpickler.persistent_load = persistent_load
+    obj = unpickler.load()
+    if not isinstance(obj, container_abcs.Mapping):
+        raise TypeError("lazy_load expects a checkpoint saved from a mapping (e.g., a state_dict), "
+                        "but got {}; use torch.load instead".format(type(obj).__name__))
+    mapped_records = _MappedRecords(f) if mmap else None
+    return LazyCheckpoint(zip_file, obj, _get_restore_location(map_location), mapped_records, opened_file)
+
+
 def _is_torchscript_zip(zip_file):
     return 'constants.pkl' in zip_file.get_all_records()
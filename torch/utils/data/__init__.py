@@ -1,5 +1,6 @@
 from .sampler import Sampler, SequentialSampler, RandomSampler, SubsetRandomSampler, WeightedRandomSampler, BatchSampler
-from .dataset import Dataset, IterableDataset, TensorDataset, ConcatDataset, ChainDataset, Subset, random_split
+from .dataset import Dataset, IterableDataset, TensorDataset, ConcatDataset, ChainDataset, \
+    ShardedIterableDataset, Subset, random_split
 from .distributed import DistributedSampler
 from .dataloader import DataLoader, _DatasetKind, get_worker_info
 
@@ -7,5 +8,5 @@ from .dataloader import DataLoader, _DatasetKind, get_worker_info
 __all__ = ['Sampler', 'SequentialSampler', 'RandomSampler',
            'SubsetRandomSampler', 'WeightedRandomSampler', 'BatchSampler'
            'DistributedSampler' 'Dataset', 'IterableDataset', 'TensorDataset',
-           'ConcatDataset', 'ChainDataset', 'Subset', 'random_split'
+           'ConcatDataset', 'ChainDataset', 'ShardedIterableDataset', 'Subset', 'random_split'
            'DataLoader', '_DatasetKind', 'get_worker_info']
@@ -0,0 +1,116 @@
+r"""Contains the controller used by _MultiProcessingDataLoaderIter to adapt
+the number of in-flight tasks and of active workers when ``adaptive_prefetch``
+is enabled.
+
+The controller only looks at what the main process can observe cheaply:
+
+* how long the consumer waits for data (i.e., in `_get_data`), and
+* for each worker, how long it has had at least one task outstanding.
+
+Both are accumulated over a window of yielded batches. At the end of each
+window, if the consumer waited for more than `grow_threshold` of the window,
+the pipeline is grown: with another worker if all active workers were busy the
+whole time (and more workers are allowed), and with one more in-flight task per
+worker otherwise. If the consumer barely waited for `calm_windows` consecutive
+windows, the pipeline is shrunk by one in-flight task per worker, and, once at
+a single in-flight task per worker, by one worker. All changes stay within the
+bounds given to `DataLoader`.
+"""
+
+import time
+
+
+class _PrefetchController(object):
+    # Fraction of a window the consumer may spend waiting before the pipeline
+    # is grown, and under which it counts as calm.
+    grow_threshold = 0.05
+    shrink_threshold = 0.005
+    # Fraction of a window an active worker must have had work outstanding to
+    # count as saturated.
+    busy_threshold = 0.9
+    calm_windows = 2
+
+    def __init__(self, num_workers, min_num_workers, prefetch_factor, max_prefetch_factor, window):
+        self.num_workers = num_workers
+        self.min_num_workers = min_num_workers
+        self.max_prefetch_factor = max_prefetch_factor
+        self.prefetch_factor = prefetch_factor
+        self.num_active_workers = num_workers
+        self.window = window
+        self.new_epoch()
+
+    @property
+    def max_tasks_outstanding(self):
+        return self.prefetch_factor * self.num_active_workers
+
+    def new_epoch(self):
+        self._outstanding = [0] * self.num_workers
+        self._busy_since = [0.] * self.num_workers
+        self._calm = 0
+        self._start_window(time.perf_counter())
+
+    def _start_window(self, now):
+        self._window_start = now
+        self._num_yielded = 0
+        self._wait_time = 0.
+        self._busy_time = [0.] * self.num_workers
+        for worker_id in range(self.num_workers):
+            if self._outstanding[worker_id] > 0:
+                self._busy_since[worker_id] = now
+
+    def task_sent(self, worker_id):
+        if self._outstanding[worker_id] == 0:
+            self._busy_since[worker_id] = time.perf_counter()
+        self._outstanding[worker_id] += 1
+
+    def task_done(self, worker_id):
+        self._outstanding[worker_id] -= 1
+        if self._outstanding[worker_id] == 0:
+            self._busy_time[worker_id] += time.perf_counter() - self._busy_since[worker_id]
+
+    def waited(self, seconds):
+        self._wait_time += seconds
+
+    def batch_yielded(self):
+        r"""Records that a batch was handed to the consumer, and adapts the
+        pipeline at the end of each window. Returns ``True`` if
+        :attr:`max_tasks_outstanding` changed."""
+        self._num_yielded += 1
+        if self._num_yielded < self.window:
+            return False
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        old = (self.prefetch_factor, self.num_active_workers)
+        if elapsed > 0:
+            self._adapt(now, elapsed)
+        self._start_window(now)
+        return (self.prefetch_factor, self.num_active_workers) != old
+
+    def _adapt(self, now, elapsed):
+        wait_fraction = self._wait_time / elapsed
+        if wait_fraction > self.grow_threshold:
+            self._calm = 0
+            saturated = all(self._busy_fraction(worker_id, now, elapsed) >= self.busy_threshold
+                            for worker_id in range(self.num_active_workers))
+            if saturated and self.num_active_workers < self.num_workers:
+                self.num_active_workers += 1
+            elif self.prefetch_factor < self.max_prefetch_factor:
+                self.prefetch_factor += 1
+            elif self.num_active_workers < self.num_workers:
+                self.num_active_workers += 1
+        elif wait_fraction < self.shrink_threshold:
+            self._calm += 1
+            if self._calm >= self.calm_windows:
+                self._calm = 0
+                if self.prefetch_factor > 1:
+                    self.prefetch_factor -= 1
+                elif self.num_active_workers > self.min_num_workers:
+                    self.num_active_workers -= 1
+        else:
+            self._calm = 0
+
+    def _busy_fraction(self, worker_id, now, elapsed):
+        busy_time = self._busy_time[worker_id]
+        if self._outstanding[worker_id] > 0:
+            busy_time += now - self._busy_since[worker_id]
+        return busy_time / elapsed
@@ -46,11 +46,23 @@ def default_collate(batch):
     elem_type = type(elem)
     if isinstance(elem, torch.Tensor):
         out = None
-        if torch.utils.data.get_worker_info() is not None:
+        if getattr(torch.utils.data._utils.pin_memory._collate_into_pinned_memory, 'enabled', False) and \
+                not elem.is_cuda and elem.layout == torch.strided:
+            # Stack straight into pinned memory, see the `reuse_pinned_buffers`
+            # option of `DataLoader`
+            out = torch.empty((len(batch),) + tuple(elem.size()), dtype=elem.dtype,
+                              pin_memory=True)
+        elif torch.utils.data.get_worker_info() is not None and \
+                not torch.utils.data._utils.worker._in_thread_worker():
             # If we're in a background process, concatenate directly into a
             # shared memory tensor to avoid an extra copy
             numel = sum([x.numel() for x in batch])
-            storage = elem.storage()._new_shared(numel)
+            slab = torch.utils.data._utils.shared_batch._current_slab
+            if slab is not None:
+                # Reuse a preallocated slab, see `shared_batch_slabs`
+                storage = slab.storage_for(elem, numel)
+            else:
+                storage = elem.storage()._new_shared(numel)
             out = elem.new(storage)
         return torch.stack(batch, 0, out=out)
     elif elem_type.__module__ == 'numpy' and elem_type.__name__ != 'str_' \
@@ -3,6 +3,8 @@ data from an iterable-style or map-style dataset. This logic is shared in both
 single- and multi-processing data loading.
 """
 
+from .collate import default_collate
+
 
 class _BaseDatasetFetcher(object):
     def __init__(self, dataset, auto_collation, collate_fn, drop_last):
@@ -38,8 +40,14 @@ class _IterableDatasetFetcher(_BaseDatasetFetcher):
 class _MapDatasetFetcher(_BaseDatasetFetcher):
     def __init__(self, dataset, auto_collation, collate_fn, drop_last):
         super(_MapDatasetFetcher, self).__init__(dataset, auto_collation, collate_fn, drop_last)
+        # `__getitems__` returns batches in the form `default_collate` does, so
+        # it can only replace per-sample fetching followed by `default_collate`.
+        self.batched_fetch = (auto_collation and collate_fn is default_collate and
+                              hasattr(dataset, '__getitems__'))
 
     def fetch(self, possibly_batched_index):
+        if self.batched_fetch:
+            return self.dataset.__getitems__(possibly_batched_index)
         if self.auto_collation:
             data = [self.dataset[idx] for idx in possibly_batched_index]
         else:
@@ -5,13 +5,21 @@ These **needs** to be in global scope since Py2 doesn't support serializing
 static methods.
 """
 
+import threading
 import torch
 from torch._six import queue, container_abcs, string_classes
-from . import MP_STATUS_CHECK_INTERVAL
+from . import MP_STATUS_CHECK_INTERVAL, shared_batch
 from torch._utils import ExceptionWrapper
 
 
-def _pin_memory_loop(in_queue, out_queue, device_id, done_event):
+# `enabled` tells whether `default_collate` stacks batches straight into pinned
+# memory. Only set while a single-process loader with `reuse_pinned_buffers`
+# fetches a batch, and thread local so that the collate functions of other
+# loaders (e.g. running in thread workers) are not affected.
+_collate_into_pinned_memory = threading.local()
+
+
+def _pin_memory_loop(in_queue, out_queue, device_id, done_event, slab_cache=None):
     # This setting is thread local, and prevents the copy in pin_memory from
     # consuming all CPU cores.
     torch.set_num_threads(1)
@@ -28,7 +36,17 @@ def _pin_memory_loop(in_queue, out_queue, device_id, done_event):
         idx, data = r
         if not done_event.is_set() and not isinstance(data, ExceptionWrapper):
             try:
-                data = pin_memory(data)
+                if isinstance(data, shared_batch._SlabBatch):
+                    # Pinning copies the batch out of its slab, so the slab
+                    # can be handed back to the worker right away.
+                    batch = data
+                    try:
+                        data = pin_memory(slab_cache.unpack(batch))
+                    finally:
+                        slab_cache.release(batch.worker_id, batch.slab_id)
+                        del batch
+                else:
+                    data = pin_memory(data)
             except Exception:
                 data = ExceptionWrapper(
                     where="in pin memory thread for device {}".format(device_id))
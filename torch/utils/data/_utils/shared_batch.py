@@ -0,0 +1,159 @@
+r"""Contains definitions of the shared-memory batch slabs used by the
+_BaseDataLoaderIter workers when ``shared_batch_slabs > 0``.
+
+Each worker owns a fixed number of slabs. A slab is a list of shared-memory
+storages that :func:`~torch.utils.data._utils.collate.default_collate` stacks
+samples into. The storages of a slab are sent to the main process only the
+first time they are used (or when they have to grow); afterwards only a small
+:class:`_SlabBatch` descriptor crosses the data queue, and the main process
+rebuilds the batch tensors as views into its cached copy of the slab. Once the
+main process is done with a batch, it returns the slab to its worker with a
+:class:`_ReleaseSlab` message on the worker's index queue.
+"""
+
+import torch
+from collections import namedtuple, deque
+from torch._six import container_abcs, string_classes
+
+
+r"""Descriptor of a collated tensor living in a slab, sent in place of the tensor"""
+_SlabTensor = namedtuple('_SlabTensor', ['storage_idx', 'storage_offset', 'size', 'stride'])
+
+r"""Batch collated into a slab. `new_storages` maps storage indices to the
+storages that the main process has not seen yet"""
+_SlabBatch = namedtuple('_SlabBatch', ['worker_id', 'slab_id', 'data', 'new_storages'])
+
+r"""Message sent from the main process to a worker to hand a slab back"""
+_ReleaseSlab = namedtuple('_ReleaseSlab', ['slab_id'])
+
+
+# Slab that `default_collate` writes into. Only set in worker processes, and
+# only while a batch is being fetched.
+_current_slab = None
+
+
+class _BatchSlab(object):
+    def __init__(self, slab_id):
+        self.slab_id = slab_id
+        self.storages = []
+        self._cursor = 0
+        self._new_storages = {}
+
+    def reset(self):
+        # Storages not sent yet (e.g. if collation failed) stay new until a
+        # batch of this slab is sent
+        self._cursor = 0
+
+    def storage_for(self, elem, numel):
+        r"""Returns a shared storage of the same type as ``elem``'s holding at
+        least ``numel`` elements. Storages are handed out in collation order,
+        so the same field of consecutive batches lands in the same storage."""
+        idx = self._cursor
+        self._cursor += 1
+        storage_type = type(elem.storage())
+        if idx < len(self.storages):
+            storage = self.storages[idx]
+            if type(storage) is storage_type and storage.size() >= numel:
+                return storage
+        storage = elem.storage()._new_shared(numel)
+        if idx < len(self.storages):
+            self.storages[idx] = storage
+        else:
+            self.storages.append(storage)
+        self._new_storages[idx] = storage
+        return storage
+
+    def pack(self, worker_id, data):
+        r"""Replaces the tensors of ``data`` that live in this slab by
+        :class:`_SlabTensor` descriptors. Returns ``None`` if no tensor of
+        ``data`` lives in this slab (e.g., with a custom ``collate_fn``)."""
+        ptrs = {s.data_ptr(): idx for idx, s in enumerate(self.storages[:self._cursor]) if s.size() > 0}
+        packed = [False]
+
+        def _pack(data):
+            if isinstance(data, torch.Tensor):
+                if not data.is_cuda and type(data) is torch.Tensor and not data.requires_grad:
+                    idx = ptrs.get(data.storage().data_ptr())
+                    if idx is not None:
+                        packed[0] = True
+                        return _SlabTensor(idx, data.storage_offset(), tuple(data.size()), data.stride())
+                return data
+            elif isinstance(data, string_classes):
+                return data
+            elif isinstance(data, container_abcs.Mapping):
+                return {k: _pack(sample) for k, sample in data.items()}
+            elif isinstance(data, tuple) and hasattr(data, '_fields'):  # namedtuple
+                return type(data)(*(_pack(sample) for sample in data))
+            elif isinstance(data, list):
+                return [_pack(sample) for sample in data]
+            elif isinstance(data, tuple):
+                return tuple(_pack(sample) for sample in data)
+            else:
+                return data
+
+        data = _pack(data)
+        if not packed[0]:
+            return None
+        return _SlabBatch(worker_id, self.slab_id, data, dict(self._new_storages))
+
+    def sent(self):
+        r"""Marks the storages of the last packed batch as seen by the main
+        process, once that batch has been sent."""
+        self._new_storages = {}
+
+
+class _BatchSlabPool(object):
+    r"""Worker-side pool of the slabs owned by a single worker."""
+
+    def __init__(self, num_slabs):
+        self.slabs = [_BatchSlab(i) for i in range(num_slabs)]
+        self.free = deque(range(num_slabs))
+
+    def acquire(self):
+        r"""Returns a free slab, or ``None`` if all slabs are still held by the
+        main process, in which case the batch falls back to freshly allocated
+        shared memory."""
+        if len(self.free) == 0:
+            return None
+        slab = self.slabs[self.free.popleft()]
+        slab.reset()
+        return slab
+
+    def release(self, slab_id):
+        self.free.append(slab_id)
+
+
+class _SlabCache(object):
+    r"""Main-process side of the slabs: caches the storages received from each
+    worker, rebuilds batches from :class:`_SlabBatch` descriptors, and hands
+    slabs back to their workers."""
+
+    def __init__(self, index_queues):
+        self.index_queues = index_queues
+        self.storages = {}
+
+    def unpack(self, batch):
+        storages = self.storages.setdefault((batch.worker_id, batch.slab_id), {})
+        storages.update(batch.new_storages)
+
+        def _unpack(data):
+            if isinstance(data, _SlabTensor):
+                return torch._utils._rebuild_tensor(
+                    storages[data.storage_idx], data.storage_offset, data.size, data.stride)
+            elif isinstance(data, string_classes):
+                return data
+            elif isinstance(data, container_abcs.Mapping):
+                return {k: _unpack(sample) for k, sample in data.items()}
+            elif isinstance(data, tuple) and hasattr(data, '_fields'):  # namedtuple
+                return type(data)(*(_unpack(sample) for sample in data))
+            elif isinstance(data, list):
+                return [_unpack(sample) for sample in data]
+            elif isinstance(data, tuple):
+                return tuple(_unpack(sample) for sample in data)
+            else:
+                return data
+
+        return _unpack(batch.data)
+
+    def release(self, worker_id, slab_id):
+        self.index_queues[worker_id].put(_ReleaseSlab(slab_id))
@@ -7,11 +7,12 @@ static methods.
 import torch
 import random
 import os
+import threading
 from collections import namedtuple
 from torch._six import queue
 from torch._utils import ExceptionWrapper
 from typing import Union
-from . import signal_handling, MP_STATUS_CHECK_INTERVAL, IS_WINDOWS
+from . import signal_handling, shared_batch, MP_STATUS_CHECK_INTERVAL, IS_WINDOWS
 
 if IS_WINDOWS:
     import ctypes
@@ -56,8 +57,20 @@ else:
                 self.manager_dead = os.getppid() != self.manager_pid
             return not self.manager_dead
 
+
+class _ThreadWatchdog(object):
+    # Thread workers live in the manager process, so they only need to check
+    # that the main thread is still running.
+    def is_alive(self):
+        return threading.main_thread().is_alive()
+
+
 _worker_info = None
 
+# Thread workers (see the `worker_backend` option of `DataLoader`) share the
+# module globals with the main thread, so their `WorkerInfo` is thread-local.
+_thread_local = threading.local()
+
 
 class WorkerInfo(object):
     __initialized = False
@@ -98,6 +111,9 @@ def get_worker_info():
 
     When called in the main process, this returns ``None``.
 
+    With ``worker_backend='thread'``, this is also available from the worker
+    threads, and :attr:`dataset` is the same object as in the main process.
+
     .. note::
        When used in a :attr:`worker_init_fn` passed over to
        :class:`~torch.utils.data.DataLoader`, this method can be useful to
@@ -106,7 +122,11 @@ def get_worker_info():
        sharded dataset, or use ``seed`` to seed other libraries used in dataset
        code (e.g., NumPy).
     """
-    return _worker_info
+    return getattr(_thread_local, 'worker_info', _worker_info)
+
+
+def _in_thread_worker():
+    return getattr(_thread_local, 'worker_info', None) is not None
 
 
 r"""Dummy class used to signal the end of an IterableDataset"""
@@ -117,25 +137,33 @@ _ResumeIteration = namedtuple('_ResumeIteration', [])
 
 def _worker_loop(dataset_kind, dataset, index_queue, data_queue, done_event,
                  auto_collation, collate_fn, drop_last, seed, init_fn, worker_id,
-                 num_workers, persistent_workers):
+                 num_workers, persistent_workers, shared_batch_slabs=0,
+                 worker_backend='process'):
     # See NOTE [ Data Loader Multiprocessing Shutdown Logic ] for details on the
     # logic of this function.
 
     try:
-        # Initialize C side signal handlers for SIGBUS and SIGSEGV. Python signal
-        # module's handlers are executed after Python returns from C low-level
-        # handlers, likely when the same fatal signal had already happened
-        # again.
-        # https://docs.python.org/3/library/signal.html#execution-of-python-signal-handlers
-        signal_handling._set_worker_signal_handlers()
-
-        torch.set_num_threads(1)
-        random.seed(seed)
-        torch.manual_seed(seed)
-
-        global _worker_info
-        _worker_info = WorkerInfo(id=worker_id, num_workers=num_workers,
-                                  seed=seed, dataset=dataset)
+        worker_info = WorkerInfo(id=worker_id, num_workers=num_workers,
+                                 seed=seed, dataset=dataset)
+        if worker_backend == 'thread':
+            # Signal handlers, the number of intra-op threads and the global
+            # RNGs are process-wide state owned by the main thread, so thread
+            # workers leave them alone.
+            _thread_local.worker_info = worker_info
+        else:
+            # Initialize C side signal handlers for SIGBUS and SIGSEGV. Python signal
+            # module's handlers are executed after Python returns from C low-level
+            # handlers, likely when the same fatal signal had already happened
+            # again.
+            # https://docs.python.org/3/library/signal.html#execution-of-python-signal-handlers
+            signal_handling._set_worker_signal_handlers()
+
+            torch.set_num_threads(1)
+            random.seed(seed)
+            torch.manual_seed(seed)
+
+            global _worker_info
+            _worker_info = worker_info
 
         from torch.utils.data import _DatasetKind
 
@@ -164,7 +192,14 @@ def _worker_loop(dataset_kind, dataset, index_queue, data_queue, done_event,
         # `None`.
         iteration_end = False
 
-        watchdog = ManagerWatchdog()
+        slab_pool = None
+        if shared_batch_slabs > 0:
+            slab_pool = shared_batch._BatchSlabPool(shared_batch_slabs)
+
+        if worker_backend == 'thread':
+            watchdog = _ThreadWatchdog()
+        else:
+            watchdog = ManagerWatchdog()
 
         while watchdog.is_alive():
             try:
@@ -179,6 +214,10 @@ def _worker_loop(dataset_kind, dataset, index_queue, data_queue, done_event,
                 fetcher = _DatasetKind.create_fetcher(
                     dataset_kind, dataset, auto_collation, collate_fn, drop_last)
                 continue
+            elif isinstance(r, shared_batch._ReleaseSlab):
+                # The main process is done with the batch stored in this slab
+                slab_pool.release(r.slab_id)
+                continue
             elif r is None:
                 # Received the final signal
                 assert done_event.is_set() or iteration_end
@@ -190,12 +229,22 @@ def _worker_loop(dataset_kind, dataset, index_queue, data_queue, done_event,
                 continue
             idx, index = r
             data: Union[_IterableDatasetStopIteration, ExceptionWrapper]
+            packed_slab = None
             if init_exception is not None:
                 data = init_exception
                 init_exception = None
             else:
+                slab = None
+                if slab_pool is not None:
+                    slab = slab_pool.acquire()
+                    shared_batch._current_slab = slab
                 try:
                     data = fetcher.fetch(index)
+                    if slab is not None:
+                        packed = slab.pack(worker_id, data)
+                        if packed is not None:
+                            data = packed
+                            packed_slab, slab = slab, None
                 except Exception as e:
                     if isinstance(e, StopIteration) and dataset_kind == _DatasetKind.Iterable:
                         data = _IterableDatasetStopIteration(worker_id)
@@ -209,11 +258,19 @@ def _worker_loop(dataset_kind, dataset, index_queue, data_queue, done_event,
                         # See NOTE [ Python Traceback Reference Cycle Problem ]
                         data = ExceptionWrapper(
                             where="in DataLoader worker process {}".format(worker_id))
+                finally:
+                    shared_batch._current_slab = None
+                    if slab is not None:
+                        # Nothing was collated into the slab, so it can be
+                        # reused right away.
+                        slab_pool.release(slab.slab_id)
             data_queue.put((idx, data))
-            del data, idx, index, r  # save memory
+            if packed_slab is not None:
+                packed_slab.sent()
+            del data, idx, index, r, packed_slab  # save memory
     except KeyboardInterrupt:
         # Main process will raise KeyboardInterrupt anyways.
         pass
-    if done_event.is_set():
+    if done_event.is_set() and worker_backend != 'thread':
         data_queue.cancel_join_thread()
         data_queue.close()
@@ -7,8 +7,9 @@ in `./_utils/worker.py`.
 
 import threading
 import itertools
+import time
 import warnings
-from typing import Any, Callable, TypeVar, Generic, Sequence, List, Optional
+from typing import Any, Callable, TypeVar, Generic, Sequence, List, Optional, Dict
 
 import multiprocessing as python_multiprocessing
 import torch
@@ -115,6 +116,44 @@ class DataLoader(Generic[T_co]):
         persistent_workers (bool, optional): If ``True``, the data loader will not shutdown
             the worker processes after a dataset has been consumed once. This allows to 
             maintain the workers `Dataset` instances alive. (default: ``False``)
+        shared_batch_slabs (int, optional, keyword-only arg): If positive, each worker
+            preallocates this many shared-memory slabs that :func:`default_collate`
+            stacks batches into. Slabs are recycled, so after warm-up only a small
+            descriptor is sent to the main process for each batch instead of new
+            shared-memory segments. Batches returned in this mode are only valid
+            until the next batch is requested; clone them if they need to outlive
+            that. A value of at least :attr:`prefetch_factor` ``+ 1`` avoids
+            falling back to fresh allocations. (default: ``0``)
+        worker_backend (str, optional, keyword-only arg): ``'process'`` runs each
+            worker in a subprocess. ``'thread'`` runs the workers as threads of
+            the main process instead, which avoids the worker startup cost and the
+            pickling of batches, and suits datasets whose loading releases the GIL
+            (e.g., I/O or native decoding). Thread workers share the
+            :attr:`dataset` object with the main process and do not reseed the
+            global RNGs; use the ``seed`` of :func:`get_worker_info` to seed
+            per-worker generators instead. (default: ``'process'``)
+        adaptive_prefetch (bool, optional, keyword-only arg): If ``True``, the number
+            of samples loaded in advance by each worker starts at :attr:`prefetch_factor`
+            and is then adapted between ``1`` and :attr:`max_prefetch_factor`, based
+            on how long the main process waits for data and how busy the workers
+            are. (default: ``False``)
+        max_prefetch_factor (int, optional, keyword-only arg): Upper bound on the
+            per-worker prefetch when :attr:`adaptive_prefetch` is set.
+            (default: ``2 * prefetch_factor``)
+        min_num_workers (int, optional, keyword-only arg): If set together with
+            :attr:`adaptive_prefetch`, the number of workers receiving tasks is
+            also adapted, between this value and :attr:`num_workers`. All
+            :attr:`num_workers` workers are still started; workers that are scaled
+            down are kept idle. Not supported for iterable-style datasets, whose
+            workers each produce different data. (default: :attr:`num_workers`)
+        reuse_pinned_buffers (bool, optional, keyword-only arg): If ``True`` together
+            with :attr:`pin_memory`, :func:`default_collate` stacks samples straight
+            into pinned memory, saving the copy of each batch made by pinning it.
+            The pinned memory comes from the CUDA caching host allocator, which
+            reuses it once the storage of a batch (kept alive by every view of it)
+            has been freed. Only supported with ``num_workers=0``: workers collate
+            their batches in another process (or thread), and the pin memory thread
+            has to copy them into pinned memory anyway. (default: ``False``)
 
 
     .. warning:: If the ``spawn`` start method is used, :attr:`worker_init_fn`
@@ -148,6 +187,12 @@ class DataLoader(Generic[T_co]):
     timeout: float
     sampler: Sampler
     prefetch_factor: int
+    shared_batch_slabs: int
+    worker_backend: str
+    adaptive_prefetch: bool
+    max_prefetch_factor: Optional[int]
+    min_num_workers: Optional[int]
+    reuse_pinned_buffers: bool
     _iterator : Optional['_BaseDataLoaderIter']
     __initialized = False
 
@@ -159,7 +204,13 @@ class DataLoader(Generic[T_co]):
                  timeout: float = 0, worker_init_fn: _worker_init_fn_t = None,
                  multiprocessing_context=None, generator=None,
                  *, prefetch_factor: int = 2,
-                 persistent_workers: bool = False):
+                 persistent_workers: bool = False,
+                 shared_batch_slabs: int = 0,
+                 worker_backend: str = 'process',
+                 adaptive_prefetch: bool = False,
+                 max_prefetch_factor: Optional[int] = None,
+                 min_num_workers: Optional[int] = None,
+                 reuse_pinned_buffers: bool = False):
         torch._C._log_api_usage_once("python.data_loader")  # type: ignore
 
         if num_workers < 0:
@@ -177,9 +228,52 @@ class DataLoader(Generic[T_co]):
         if persistent_workers and num_workers == 0:
             raise ValueError('persistent_workers option needs num_workers > 0')
 
+        if shared_batch_slabs < 0:
+            raise ValueError('shared_batch_slabs option should be non-negative')
+
+        if shared_batch_slabs > 0 and num_workers == 0:
+            raise ValueError('shared_batch_slabs option needs num_workers > 0')
+
+        if worker_backend not in ('process', 'thread'):
+            raise ValueError(('worker_backend option should be either \'process\' or '
+                              '\'thread\', but got worker_backend={!r}').format(worker_backend))
+
+        if worker_backend == 'thread' and shared_batch_slabs > 0:
+            raise ValueError('shared_batch_slabs option needs worker_backend=\'process\'')
+
+        if worker_backend == 'thread' and multiprocessing_context is not None:
+            raise ValueError('multiprocessing_context option needs worker_backend=\'process\'')
+
+        if adaptive_prefetch:
+            if num_workers == 0:
+                raise ValueError('adaptive_prefetch option needs num_workers > 0')
+            if max_prefetch_factor is None:
+                max_prefetch_factor = 2 * prefetch_factor
+            elif max_prefetch_factor < prefetch_factor:
+                raise ValueError(('max_prefetch_factor option should be at least prefetch_factor={}, '
+                                  'but got max_prefetch_factor={}').format(prefetch_factor, max_prefetch_factor))
+            if min_num_workers is None:
+                min_num_workers = num_workers
+            elif not 1 <= min_num_workers <= num_workers:
+                raise ValueError(('min_num_workers option should be in [1, num_workers={}], '
+                                  'but got min_num_workers={}').format(num_workers, min_num_workers))
+        elif max_prefetch_factor is not None or min_num_workers is not None:
+            raise ValueError('max_prefetch_factor and min_num_workers options need adaptive_prefetch=True')
+
+        if reuse_pinned_buffers and not pin_memory:
+            raise ValueError('reuse_pinned_buffers option needs pin_memory=True')
+        if reuse_pinned_buffers and num_workers > 0:
+            raise ValueError('reuse_pinned_buffers option needs num_workers=0')
+
         self.dataset = dataset
         self.num_workers = num_workers
         self.prefetch_factor = prefetch_factor
+        self.shared_batch_slabs = shared_batch_slabs
+        self.worker_backend = worker_backend
+        self.adaptive_prefetch = adaptive_prefetch
+        self.max_prefetch_factor = max_prefetch_factor
+        self.min_num_workers = min_num_workers
+        self.reuse_pinned_buffers = reuse_pinned_buffers
         self.pin_memory = pin_memory
         self.timeout = timeout
         self.worker_init_fn = worker_init_fn
@@ -233,6 +327,10 @@ class DataLoader(Generic[T_co]):
         else:
             self._dataset_kind = _DatasetKind.Map
 
+        if adaptive_prefetch and min_num_workers != num_workers and self._dataset_kind == _DatasetKind.Iterable:
+            raise ValueError('DataLoader with IterableDataset: min_num_workers option is not supported, '
+                             'since each worker yields different data')
+
         if sampler is not None and shuffle:
             raise ValueError('sampler option is mutually exclusive with '
                              'shuffle')
@@ -407,11 +505,17 @@ class _BaseDataLoaderIter(object):
         self._index_sampler = loader._index_sampler
         self._num_workers = loader.num_workers
         self._prefetch_factor = loader.prefetch_factor
+        self._shared_batch_slabs = loader.shared_batch_slabs
+        self._worker_backend = loader.worker_backend
+        self._adaptive_prefetch = loader.adaptive_prefetch
+        self._max_prefetch_factor = loader.max_prefetch_factor
+        self._min_num_workers = loader.min_num_workers
         self._pin_memory = loader.pin_memory and torch.cuda.is_available()
         self._timeout = loader.timeout
         self._collate_fn = loader.collate_fn
-        self._sampler_iter = iter(self._index_sampler)
+        # drawn before the sampler iterator, which may draw from the same generator
         self._base_seed = torch.empty((), dtype=torch.int64).random_(generator=loader.generator).item()
+        self._sampler_iter = iter(self._index_sampler)
         self._persistent_workers = loader.persistent_workers
         self._num_yielded = 0
 
@@ -452,6 +556,47 @@ class _BaseDataLoaderIter(object):
     def __len__(self) -> int:
         return len(self._index_sampler)
 
+    def state_dict(self) -> Dict[str, Any]:
+        r"""Returns the state of this iteration as a :class:`dict`: the number
+        of batches returned so far, and the state of the sampler (or batch
+        sampler) producing the indices.
+
+        Batches that were prefetched but not returned yet are not part of the
+        state, so resuming from it with :meth:`load_state_dict` continues right
+        after the last returned batch. Only map-style datasets, with samplers
+        providing ``state_dict()`` and ``load_state_dict()``, are supported.
+        """
+        if self._dataset_kind == _DatasetKind.Iterable:
+            raise ValueError("state_dict() is not supported with IterableDataset")
+        if not hasattr(self._index_sampler, 'state_dict'):
+            raise TypeError("{} does not support state_dict()".format(type(self._index_sampler).__name__))
+        index_sampler_state = self._index_sampler.state_dict()
+        # The sampler may be ahead of the returned batches because of prefetching
+        index_sampler_state['num_yielded'] = self._num_yielded
+        return {'num_yielded': self._num_yielded, 'index_sampler': index_sampler_state}
+
+    def load_state_dict(self, state_dict: Dict[str, Any]) -> None:
+        r"""Resumes the iteration described by ``state_dict`` (see
+        :meth:`state_dict`): the next batch returned is the one that followed
+        the last batch returned when the state was taken. Skipped indices are
+        neither re-sampled one by one nor loaded.
+
+        .. note:: This restores the order of the data, not the random state
+                  of the workers.
+        """
+        if self._dataset_kind == _DatasetKind.Iterable:
+            raise ValueError("load_state_dict() is not supported with IterableDataset")
+        if not hasattr(self._index_sampler, 'load_state_dict'):
+            raise TypeError("{} does not support load_state_dict()".format(type(self._index_sampler).__name__))
+        self._index_sampler.load_state_dict(state_dict['index_sampler'])
+        self._restart_sampling()
+        self._num_yielded = state_dict['num_yielded']
+
+    def _restart_sampling(self):
+        # Drops the current sampler iterator for a new one, e.g., after the
+        # state of the sampler was loaded.
+        self._sampler_iter = iter(self._index_sampler)
+
     def __getstate__(self):
         # TODO: add limited pickling support for sharing an iterator
         # across multiple threads for HOGWILD.
@@ -469,11 +614,20 @@ class _SingleProcessDataLoaderIter(_BaseDataLoaderIter):
 
         self._dataset_fetcher = _DatasetKind.create_fetcher(
             self._dataset_kind, self._dataset, self._auto_collation, self._collate_fn, self._drop_last)
+        self._collate_into_pinned_memory = self._pin_memory and loader.reuse_pinned_buffers
 
     def _next_data(self):
         index = self._next_index()  # may raise StopIteration
-        data = self._dataset_fetcher.fetch(index)  # may raise StopIteration
+        if not self._collate_into_pinned_memory:
+            data = self._dataset_fetcher.fetch(index)  # may raise StopIteration
+        else:
+            _utils.pin_memory._collate_into_pinned_memory.enabled = True
+            try:
+                data = self._dataset_fetcher.fetch(index)  # may raise StopIteration
+            finally:
+                _utils.pin_memory._collate_into_pinned_memory.enabled = False
         if self._pin_memory:
+            # a no-op for the tensors already stacked into pinned memory
             data = _utils.pin_memory.pin_memory(data)
         return data
 
@@ -765,32 +919,44 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
         assert self._num_workers > 0
         assert self._prefetch_factor > 0
 
-        if loader.multiprocessing_context is None:
-            multiprocessing_context = multiprocessing
+        # Thread workers run the same `_worker_loop` and speak the same
+        # index_queue/data_queue protocol as process workers, only over
+        # in-process queues.
+        self._thread_workers = self._worker_backend == 'thread'
+        if self._thread_workers:
+            queue_cls = queue.Queue
+            event_cls = threading.Event
+            worker_cls = threading.Thread
         else:
-            multiprocessing_context = loader.multiprocessing_context
+            if loader.multiprocessing_context is None:
+                multiprocessing_context = multiprocessing
+            else:
+                multiprocessing_context = loader.multiprocessing_context
+            # No certainty which module multiprocessing_context is
+            queue_cls = multiprocessing_context.Queue  # type: ignore
+            event_cls = multiprocessing_context.Event  # type: ignore
+            worker_cls = multiprocessing_context.Process  # type: ignore
 
         self._worker_init_fn = loader.worker_init_fn
         self._worker_queue_idx_cycle = itertools.cycle(range(self._num_workers))
-        # No certainty which module multiprocessing_context is
-        self._worker_result_queue = multiprocessing_context.Queue()  # type: ignore
+        self._worker_result_queue = queue_cls()
         self._worker_pids_set = False
         self._shutdown = False
-        self._workers_done_event = multiprocessing_context.Event()
+        self._workers_done_event = event_cls()
 
         self._index_queues = []
         self._workers = []
         for i in range(self._num_workers):
-            # No certainty which module multiprocessing_context is
-            index_queue = multiprocessing_context.Queue()  # type: ignore
+            index_queue = queue_cls()
             # index_queue.cancel_join_thread()
-            w = multiprocessing_context.Process(
+            w = worker_cls(
                 target=_utils.worker._worker_loop,
                 args=(self._dataset_kind, self._dataset, index_queue,
                       self._worker_result_queue, self._workers_done_event,
                       self._auto_collation, self._collate_fn, self._drop_last,
                       self._base_seed + i, self._worker_init_fn, i, self._num_workers,
-                      self._persistent_workers))
+                      self._persistent_workers, self._shared_batch_slabs,
+                      self._worker_backend))
             w.daemon = True
             # NB: Process.start() actually take some time as it needs to
             #     start a process and pass the arguments over via a pipe.
@@ -802,6 +968,26 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
             self._index_queues.append(index_queue)
             self._workers.append(w)
 
+        # Main process side of the shared-memory batch slabs. A batch collated
+        # into a slab is handed back to its worker once the next batch is
+        # requested (or right after pinning, when `pin_memory` is set).
+        self._slab_cache = None
+        self._slab_to_release = None
+        if self._shared_batch_slabs > 0:
+            self._slab_cache = _utils.shared_batch._SlabCache(self._index_queues)
+
+        # With `adaptive_prefetch`, the number of outstanding tasks and of
+        # workers receiving them is decided by the controller, within the
+        # bounds given to `DataLoader`.
+        self._prefetch_controller = None
+        if self._adaptive_prefetch:
+            self._prefetch_controller = _utils.autoscale._PrefetchController(
+                self._num_workers, self._min_num_workers, self._prefetch_factor,
+                self._max_prefetch_factor, window=max(8, 2 * self._num_workers))
+            self._max_tasks_outstanding = self._max_prefetch_factor * self._num_workers
+        else:
+            self._max_tasks_outstanding = self._prefetch_factor * self._num_workers
+
         if self._pin_memory:
             self._pin_memory_thread_done_event = threading.Event()
 
@@ -811,7 +997,7 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 target=_utils.pin_memory._pin_memory_loop,
                 args=(self._worker_result_queue, self._data_queue,
                       torch.cuda.current_device(),
-                      self._pin_memory_thread_done_event))
+                      self._pin_memory_thread_done_event, self._slab_cache))
             pin_memory_thread.daemon = True
             pin_memory_thread.start()
             # Similar to workers (see comment above), we only register
@@ -820,14 +1006,32 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
         else:
             self._data_queue = self._worker_result_queue
 
-        # .pid can be None only before process is spawned (not the case, so ignore)
-        _utils.signal_handling._set_worker_pids(id(self), tuple(w.pid for w in self._workers))  # type: ignore
-        _utils.signal_handling._set_SIGCHLD_handler()
-        self._worker_pids_set = True
+        if not self._thread_workers:
+            # .pid can be None only before process is spawned (not the case, so ignore)
+            _utils.signal_handling._set_worker_pids(id(self), tuple(w.pid for w in self._workers))  # type: ignore
+            _utils.signal_handling._set_SIGCHLD_handler()
+            self._worker_pids_set = True
         self._reset(loader, first_iter=True)
 
     def _reset(self, loader, first_iter=False):
         super()._reset(loader, first_iter)
+        self._reset_tasks(first_iter)
+
+    def _restart_sampling(self):
+        if self._shutdown:
+            raise RuntimeError("cannot restart sampling of a DataLoader iterator whose workers "
+                               "were shut down")
+        super()._restart_sampling()
+        # Discard the tasks sent for the previous sampler iterator
+        self._reset_tasks(first_iter=False)
+
+    def _reset_tasks(self, first_iter=False):
+        if not first_iter:
+            # Hand back the slabs of the batches fetched out of order for the
+            # previous sampler iterator, which are discarded
+            for info in self._task_info.values():
+                if len(info) == 2 and isinstance(info[1], _utils.shared_batch._SlabBatch):
+                    self._slab_cache.release(info[1].worker_id, info[1].slab_id)
         self._send_idx = 0  # idx of the next task to be sent to workers
         self._rcvd_idx = 0  # idx of the next task to be returned in __next__
         # information about data not yet yielded, i.e., tasks w/ indices in range [rcvd_idx, send_idx).
@@ -845,6 +1049,7 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
         self._workers_status = [True for i in range(self._num_workers)]
         # We resume the prefetching in case it was enabled
         if not first_iter:
+            self._release_slab()
             for idx in range(self._num_workers):
                 self._index_queues[idx].put(_utils.worker._ResumeIteration())
             resume_iteration_cnt = self._num_workers
@@ -852,8 +1057,13 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 data = self._get_data()
                 if isinstance(data, _utils.worker._ResumeIteration):
                     resume_iteration_cnt -= 1
+                elif isinstance(data[1], _utils.shared_batch._SlabBatch):
+                    # Batch of the previous epoch that is dropped
+                    self._slab_cache.release(data[1].worker_id, data[1].slab_id)
         # prime the prefetch loop
-        for _ in range(self._prefetch_factor * self._num_workers):
+        if self._prefetch_controller is not None:
+            self._prefetch_controller.new_epoch()
+        for _ in range(self._tasks_outstanding_limit()):
             self._try_put_index()
 
     def _try_get_data(self, timeout=_utils.MP_STATUS_CHECK_INTERVAL):
@@ -881,6 +1091,9 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                     failed_workers.append(w)
                     self._mark_worker_as_unavailable(worker_id)
             if len(failed_workers) > 0:
+                if self._thread_workers:
+                    names_str = ', '.join(w.name for w in failed_workers)
+                    raise RuntimeError('DataLoader worker thread(s) {} exited unexpectedly'.format(names_str)) from e
                 pids_str = ', '.join(str(w.pid) for w in failed_workers)
                 raise RuntimeError('DataLoader worker (pid(s) {}) exited unexpectedly'.format(pids_str)) from e
             if isinstance(e, queue.Empty):
@@ -1036,6 +1249,7 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                     return data
 
     def _next_data(self):
+        self._release_slab()
         while True:
             # If the worker responsible for `self._rcvd_idx` has already ended
             # and was unable to fulfill this task (due to exhausting an `IterableDataset`),
@@ -1065,7 +1279,13 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 return self._process_data(data)
 
             assert not self._shutdown and self._tasks_outstanding > 0
-            idx, data = self._get_data()
+            if self._prefetch_controller is not None:
+                start = time.perf_counter()
+                idx, data = self._get_data()
+                self._prefetch_controller.waited(time.perf_counter() - start)
+                self._prefetch_controller.task_done(self._task_info[idx][0])
+            else:
+                idx, data = self._get_data()
             self._tasks_outstanding -= 1
             if self._dataset_kind == _DatasetKind.Iterable:
                 # Check for _IterableDatasetStopIteration
@@ -1084,16 +1304,25 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                 del self._task_info[idx]
                 return self._process_data(data)
 
+    def _tasks_outstanding_limit(self):
+        if self._prefetch_controller is None:
+            return self._prefetch_factor * self._num_workers
+        return self._prefetch_controller.max_tasks_outstanding
+
     def _try_put_index(self):
-        assert self._tasks_outstanding < self._prefetch_factor * self._num_workers
+        assert self._tasks_outstanding < self._max_tasks_outstanding
 
         try:
             index = self._next_index()
         except StopIteration:
             return
+        if self._prefetch_controller is None:
+            num_active_workers = self._num_workers
+        else:
+            num_active_workers = self._prefetch_controller.num_active_workers
         for _ in range(self._num_workers):  # find the next active worker, if any
             worker_queue_idx = next(self._worker_queue_idx_cycle)
-            if self._workers_status[worker_queue_idx]:
+            if self._workers_status[worker_queue_idx] and worker_queue_idx < num_active_workers:
                 break
         else:
             # not found (i.e., didn't break)
@@ -1103,14 +1332,38 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
         self._task_info[self._send_idx] = (worker_queue_idx,)
         self._tasks_outstanding += 1
         self._send_idx += 1
+        if self._prefetch_controller is not None:
+            self._prefetch_controller.task_sent(worker_queue_idx)
 
     def _process_data(self, data):
         self._rcvd_idx += 1
-        self._try_put_index()
+        if self._prefetch_controller is None:
+            self._try_put_index()
+        else:
+            # Top up to the (possibly changed) number of in-flight tasks. When
+            # the limit shrank, outstanding tasks drain before new ones are sent.
+            self._prefetch_controller.batch_yielded()
+            while self._tasks_outstanding < self._tasks_outstanding_limit():
+                send_idx = self._send_idx
+                self._try_put_index()
+                if self._send_idx == send_idx:
+                    break
         if isinstance(data, ExceptionWrapper):
             data.reraise()
+        if isinstance(data, _utils.shared_batch._SlabBatch):
+            self._slab_to_release = (data.worker_id, data.slab_id)
+            data = self._slab_cache.unpack(data)
         return data
 
+    def _release_slab(self):
+        # Hands the slab of the last returned batch back to its worker. See
+        # the `shared_batch_slabs` option of `DataLoader`.
+        if self._slab_to_release is not None:
+            worker_id, slab_id = self._slab_to_release
+            self._slab_to_release = None
+            if not self._shutdown:
+                self._slab_cache.release(worker_id, slab_id)
+
     def _mark_worker_as_unavailable(self, worker_id, shutdown=False):
         # Mark a worker as having finished its work e.g., due to
         # exhausting an `IterableDataset`. This should be used only when this
@@ -1160,8 +1413,9 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                     # so that it can wake up and check `pin_memory_thread_done_event`
                     self._worker_result_queue.put((None, None))
                     self._pin_memory_thread.join()
-                    self._worker_result_queue.cancel_join_thread()
-                    self._worker_result_queue.close()
+                    if not self._thread_workers:
+                        self._worker_result_queue.cancel_join_thread()
+                        self._worker_result_queue.close()
 
                 # Exit workers now.
                 self._workers_done_event.set()
@@ -1175,15 +1429,16 @@ class _MultiProcessingDataLoaderIter(_BaseDataLoaderIter):
                         self._mark_worker_as_unavailable(worker_id, shutdown=True)
                 for w in self._workers:
                     w.join(timeout=_utils.MP_STATUS_CHECK_INTERVAL)
-                    if w.is_alive():
+                    if w.is_alive() and not self._thread_workers:
                         # Existing mechanisms try to make the workers exit
                         # peacefully, but in case that we unfortunately reach
                         # here, which we shouldn't, (e.g., pytorch/pytorch#39570),
                         # we kill the worker.
                         w.terminate()
-                for q in self._index_queues:
-                    q.cancel_join_thread()
-                    q.close()
+                if not self._thread_workers:
+                    for q in self._index_queues:
+                        q.cancel_join_thread()
+                        q.close()
             finally:
                 # Even though all this function does is putting into queues that
                 # we have called `cancel_join_thread` on, weird things can
@@ -1,12 +1,18 @@
 import bisect
+import random
+import threading
 import warnings
 
-from torch._utils import _accumulate
+import torch
+from torch._six import container_abcs, string_classes, queue
+from torch._utils import _accumulate, ExceptionWrapper
 from torch import randperm
 # No 'default_generator' in torch/__init__.pyi
 from torch import default_generator  # type: ignore
-from typing import TypeVar, Generic, Iterable, Iterator, Sequence, List, Optional, Tuple
+from typing import TypeVar, Generic, Iterable, Iterator, Sequence, List, Optional, Tuple, Callable
 from ... import Tensor, Generator
+from ._utils.collate import default_collate
+from ._utils.worker import get_worker_info
 
 T_co = TypeVar('T_co', covariant=True)
 T = TypeVar('T')
@@ -22,6 +28,14 @@ class Dataset(Generic[T_co]):
     :class:`~torch.utils.data.Sampler` implementations and the default options
     of :class:`~torch.utils.data.DataLoader`.
 
+    Subclasses could also optionally implement :meth:`__getitems__`, which takes
+    a list of keys and returns the whole batch at once, in the same form as
+    :func:`~torch.utils.data.dataloader.default_collate` applied to the samples
+    at those keys would. When the default ``collate_fn`` is used with automatic
+    batching, :class:`~torch.utils.data.DataLoader` fetches batches with it
+    instead of calling :meth:`__getitem__` once per key, which allows fetching
+    a batch with a single vectorized operation.
+
     .. note::
       :class:`~torch.utils.data.DataLoader` by default constructs a index
       sampler that yields integral indices.  To make it work with a map-style
@@ -169,10 +183,41 @@ class TensorDataset(Dataset[Tuple[Tensor, ...]]):
     def __getitem__(self, index):
         return tuple(tensor[index] for tensor in self.tensors)
 
+    def __getitems__(self, indices):
+        index = torch.as_tensor(indices, dtype=torch.long)
+        return [tensor[index] for tensor in self.tensors]
+
     def __len__(self):
         return self.tensors[0].size(0)
 
 
+def _fetch_batch(dataset, indices):
+    # Batch of `dataset` at `indices`, as `default_collate` would return it.
+    if hasattr(dataset, '__getitems__'):
+        return dataset.__getitems__(indices)
+    return default_collate([dataset[idx] for idx in indices])
+
+
+def _merge_batches(batches, order):
+    # Concatenates collated `batches` and reorders the samples of the result
+    # with `order`, i.e., sample `i` of the result is the `order[i]`-th sample
+    # of the concatenation.
+    elem = batches[0]
+    if isinstance(elem, torch.Tensor):
+        return torch.cat(batches, 0).index_select(0, order)
+    elif isinstance(elem, container_abcs.Mapping):
+        return {key: _merge_batches([b[key] for b in batches], order) for key in elem}
+    elif isinstance(elem, tuple) and hasattr(elem, '_fields'):  # namedtuple
+        return type(elem)(*(_merge_batches(list(fields), order) for fields in zip(*batches)))
+    elif isinstance(elem, container_abcs.Sequence) and not isinstance(elem, string_classes):
+        if len(elem) > 0 and isinstance(elem[0], string_classes):
+            # `default_collate` keeps strings as a list of samples
+            samples = [sample for b in batches for sample in b]
+            return [samples[i] for i in order.tolist()]
+        return [_merge_batches(list(fields), order) for fields in zip(*batches)]
+    raise TypeError("cannot merge batches of type {}".format(type(elem)))
+
+
 class ConcatDataset(Dataset[T_co]):
     r"""Dataset as a concatenation of multiple datasets.
 
@@ -205,7 +250,7 @@ class ConcatDataset(Dataset[T_co]):
     def __len__(self):
         return self.cumulative_sizes[-1]
 
-    def __getitem__(self, idx):
+    def _locate(self, idx):
         if idx < 0:
             if -idx > len(self):
                 raise ValueError("absolute value of index should not exceed dataset length")
@@ -215,8 +260,34 @@ class ConcatDataset(Dataset[T_co]):
             sample_idx = idx
         else:
             sample_idx = idx - self.cumulative_sizes[dataset_idx - 1]
+        return dataset_idx, sample_idx
+
+    def __getitem__(self, idx):
+        dataset_idx, sample_idx = self._locate(idx)
         return self.datasets[dataset_idx][sample_idx]
 
+    def __getitems__(self, indices):
+        # Fetch the part of the batch in each dataset as a batch, then merge
+        # the parts back in the requested order.
+        parts = {}
+        for position, idx in enumerate(indices):
+            dataset_idx, sample_idx = self._locate(idx)
+            positions, sample_indices = parts.setdefault(dataset_idx, ([], []))
+            positions.append(position)
+            sample_indices.append(sample_idx)
+        if len(parts) == 1:
+            dataset_idx, (_, sample_indices) = parts.popitem()
+            return _fetch_batch(self.datasets[dataset_idx], sample_indices)
+        batches = []
+        concat_positions = []
+        for dataset_idx in sorted(parts):
+            positions, sample_indices = parts[dataset_idx]
+            batches.append(_fetch_batch(self.datasets[dataset_idx], sample_indices))
+            concat_positions.extend(positions)
+        order = torch.empty(len(concat_positions), dtype=torch.long)
+        order[torch.as_tensor(concat_positions, dtype=torch.long)] = torch.arange(len(concat_positions))
+        return _merge_batches(batches, order)
+
     @property
     def cummulative_sizes(self):
         warnings.warn("cummulative_sizes attribute is renamed to "
@@ -253,6 +324,237 @@ class ChainDataset(IterableDataset):
         return total
 
 
+class ShardedIterableDataset(IterableDataset[T_co]):
+    r"""Dataset streaming the samples of a list of shards (e.g., files),
+    split across distributed ranks and :class:`~torch.utils.data.DataLoader`
+    workers.
+
+    Each shard is read by exactly one worker of one rank: with
+    :attr:`num_replicas` ranks of ``W`` workers each, worker ``w`` of rank
+    ``r`` reads shards ``r * W + w``, ``r * W + w + num_replicas * W``, ...
+    of the shard list. The assignment only depends on the shard list,
+    :attr:`seed` and the epoch, so it is the same on every rank without any
+    communication. Ranks and workers get at most one shard more than each
+    other; to keep them balanced, use a number of shards that is a multiple
+    of ``num_replicas * W``.
+
+    Samples are produced by ``read_shard(shard)``, which must return an
+    iterable over the samples of ``shard``. With :attr:`read_ahead` > 0, a
+    background thread of each worker keeps reading up to that many samples
+    ahead of the consumer, so that I/O overlaps with the rest of the
+    pipeline. With :attr:`shuffle_buffer_size` > 1, samples are shuffled
+    within a buffer of that many samples, which bounds memory usage while
+    mixing samples across consecutive shards.
+
+    .. note::
+        Like :class:`~torch.utils.data.distributed.DistributedSampler`, call
+        :meth:`set_epoch` at the beginning of each epoch **before** creating
+        the :class:`~torch.utils.data.DataLoader` iterator to get a different
+        order in each epoch. With ``persistent_workers=True``, the workers
+        keep the epoch of their copy of the dataset.
+
+    Arguments:
+        shards (sequence): shards to read, e.g., a list of file names.
+        read_shard (callable): returns an iterable over the samples of the
+            shard it is given. Must be picklable when used with workers
+            that are not forked.
+        shuffle (bool, optional): if ``True``, shuffles the shard list at
+            every epoch before assigning shards (default: ``False``).
+        shuffle_buffer_size (int, optional): size of the buffer samples are
+            shuffled within. ``0`` or ``1`` disables sample shuffling
+            (default: ``0``).
+        read_ahead (int, optional): maximum number of samples read ahead by
+            a background thread. ``0`` reads samples on demand
+            (default: ``0``).
+        num_replicas (int, optional): number of processes participating in
+            distributed training. By default, the world size of the default
+            process group if :mod:`torch.distributed` is initialized, ``1``
+            otherwise.
+        rank (int, optional): rank of the current process within
+            :attr:`num_replicas`. By default, the rank in the default process
+            group if :mod:`torch.distributed` is initialized, ``0`` otherwise.
+        seed (int, optional): random seed used to shuffle shards and samples.
+            This number should be identical across all processes in the
+            distributed group (default: ``0``).
+
+    Example::
+
+        >>> def read_lines(path):
+        ...     with open(path) as f:
+        ...         for line in f:
+        ...             yield line
+        >>> dataset = ShardedIterableDataset(paths, read_lines, shuffle=True,
+        ...                                  shuffle_buffer_size=10000, read_ahead=1000)
+        >>> loader = DataLoader(dataset, batch_size=64, num_workers=4)
+        >>> for epoch in range(start_epoch, n_epochs):
+        ...     dataset.set_epoch(epoch)
+        ...     for batch in loader:
+        ...         train(batch)
+    """
+    shards: Sequence
+    read_shard: Callable[..., Iterable[T_co]]
+    shuffle: bool
+    shuffle_buffer_size: int
+    read_ahead: int
+    num_replicas: int
+    rank: int
+    seed: int
+    epoch: int
+
+    def __init__(self, shards: Sequence, read_shard: Callable[..., Iterable[T_co]],
+                 shuffle: bool = False, shuffle_buffer_size: int = 0, read_ahead: int = 0,
+                 num_replicas: Optional[int] = None, rank: Optional[int] = None,
+                 seed: int = 0) -> None:
+        super(ShardedIterableDataset, self).__init__()
+        if shuffle_buffer_size < 0:
+            raise ValueError("shuffle_buffer_size should be a non-negative integer, "
+                             "but got shuffle_buffer_size={}".format(shuffle_buffer_size))
+        if read_ahead < 0:
+            raise ValueError("read_ahead should be a non-negative integer, "
+                             "but got read_ahead={}".format(read_ahead))
+        if num_replicas is None or rank is None:
+            import torch.distributed as dist
+            initialized = dist.is_available() and dist.is_initialized()
+            if num_replicas is None:
+                num_replicas = dist.get_world_size() if initialized else 1
+            if rank is None:
+                rank = dist.get_rank() if initialized else 0
+        if rank < 0 or rank >= num_replicas:
+            raise ValueError("rank should be in the interval [0, {}), but got rank={}"
+                             .format(num_replicas, rank))
+        self.shards = shards
+        self.read_shard = read_shard
+        self.shuffle = shuffle
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.read_ahead = read_ahead
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        r"""Sets the epoch of this dataset, which seeds the shuffling of
+        shards and samples."""
+        self.epoch = epoch
+
+    def _partition(self) -> Tuple[int, int]:
+        # Returns the index of this (rank, worker) pair among all of them, and
+        # the number of such pairs.
+        worker_info = get_worker_info()
+        if worker_info is None:
+            return self.rank, self.num_replicas
+        return (self.rank * worker_info.num_workers + worker_info.id,
+                self.num_replicas * worker_info.num_workers)
+
+    def assigned_shards(self) -> List:
+        r"""Returns the shards read by the calling worker (or process, when
+        not called from a :class:`~torch.utils.data.DataLoader` worker) in
+        the current epoch."""
+        if self.shuffle:
+            # deterministically shuffle based on epoch and seed, identically on all ranks
+            g = torch.Generator()
+            g.manual_seed(self.seed + self.epoch)
+            order = torch.randperm(len(self.shards), generator=g).tolist()
+        else:
+            order = list(range(len(self.shards)))
+        index, num_partitions = self._partition()
+        return [self.shards[i] for i in order[index::num_partitions]]
+
+    def _read_shards(self, shards):
+        for shard in shards:
+            for sample in self.read_shard(shard):
+                yield sample
+
+    def __iter__(self) -> Iterator[T_co]:
+        samples = self._read_shards(self.assigned_shards())  # type: Iterator[T_co]
+        if self.read_ahead > 0:
+            samples = _ReadAheadIterator(samples, self.read_ahead)
+        if self.shuffle_buffer_size > 1:
+            index, _ = self._partition()
+            # string seeds are hashed deterministically, unlike tuples
+            rng = random.Random('{}-{}-{}'.format(self.seed, self.epoch, index))
+            samples = _shuffle_buffered(samples, self.shuffle_buffer_size, rng)
+        return samples
+
+
+def _shuffle_buffered(samples, buffer_size, rng):
+    buffer = []
+    for sample in samples:
+        if len(buffer) < buffer_size:
+            buffer.append(sample)
+            continue
+        i = rng.randrange(buffer_size)
+        yield buffer[i]
+        buffer[i] = sample
+    rng.shuffle(buffer)
+    for sample in buffer:
+        yield sample
+
+
+class _ReadAheadIterator(object):
+    r"""Iterator over ``iterable`` whose items are produced by a background
+    thread, at most ``size`` items ahead of the consumer. Exceptions raised
+    while producing items are re-raised by :meth:`__next__`."""
+
+    # Guards against the reader blocking forever on a full queue once the
+    # consumer is gone.
+    _put_timeout = 0.1
+
+    def __init__(self, iterable, size):
+        self._queue = queue.Queue(maxsize=size)
+        self._done = threading.Event()
+        # The thread must not hold a reference to `self`, so that `self` can
+        # be collected (and stop the thread) when the consumer drops it.
+        self._thread = threading.Thread(
+            target=_ReadAheadIterator._read,
+            args=(iter(iterable), self._queue, self._done, self._put_timeout))
+        self._thread.daemon = True
+        self._thread.start()
+        self._exhausted = False
+
+    @staticmethod
+    def _read(iterator, out_queue, done, timeout):
+        try:
+            for item in iterator:
+                item = (True, item)
+                while not done.is_set():
+                    try:
+                        out_queue.put(item, timeout=timeout)
+                        break
+                    except queue.Full:
+                        continue
+                if done.is_set():
+                    return
+        except Exception:
+            item = (False, ExceptionWrapper(where="in read-ahead thread"))
+        else:
+            item = (False, None)
+        while not done.is_set():
+            try:
+                out_queue.put(item, timeout=timeout)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._exhausted:
+            raise StopIteration
+        ok, item = self._queue.get()
+        if ok:
+            return item
+        self._exhausted = True
+        self._done.set()
+        if isinstance(item, ExceptionWrapper):
+            item.reraise()
+        raise StopIteration
+
+    def __del__(self):
+        self._done.set()
+
+
 class Subset(Dataset[T_co]):
     r"""
     Subset of a dataset at specified indices.
@@ -271,6 +573,9 @@ class Subset(Dataset[T_co]):
     def __getitem__(self, idx):
         return self.dataset[self.indices[idx]]
 
+    def __getitems__(self, indices):
+        return _fetch_batch(self.dataset, [self.indices[idx] for idx in indices])
+
     def __len__(self):
         return len(self.indices)
 
@@ -1,5 +1,5 @@
 import math
-from typing import TypeVar, Optional, Iterator
+from typing import TypeVar, Optional, Iterator, Dict, Any
 
 import torch
 from . import Sampler, Dataset
@@ -88,6 +88,8 @@ class DistributedSampler(Sampler[T_co]):
         self.total_size = self.num_samples * self.num_replicas
         self.shuffle = shuffle
         self.seed = seed
+        self._num_yielded = 0
+        self._start = 0
 
     def __iter__(self) -> Iterator[T_co]:
         if self.shuffle:
@@ -110,7 +112,14 @@ class DistributedSampler(Sampler[T_co]):
         indices = indices[self.rank:self.total_size:self.num_replicas]
         assert len(indices) == self.num_samples
 
-        return iter(indices)
+        start, self._start = self._start, 0
+        self._num_yielded = start
+        return self._iter_indices(indices[start:])
+
+    def _iter_indices(self, indices):
+        for idx in indices:
+            self._num_yielded += 1
+            yield idx
 
     def __len__(self) -> int:
         return self.num_samples
@@ -125,3 +134,15 @@ class DistributedSampler(Sampler[T_co]):
             epoch (int): Epoch number.
         """
         self.epoch = epoch
+
+    def state_dict(self) -> Dict[str, Any]:
+        r"""Returns the epoch and the number of indices yielded so far by
+        the latest iteration. The order of each epoch only depends on
+        :attr:`seed` and the epoch, so this is all it takes to resume it."""
+        return {'epoch': self.epoch, 'num_yielded': self._num_yielded}
+
+    def load_state_dict(self, state_dict: Dict[str, Any]) -> None:
+        r"""Sets the epoch, and makes the next iteration start after its
+        first ``state_dict['num_yielded']`` indices."""
+        self.epoch = state_dict['epoch']
+        self._start = state_dict['num_yielded']
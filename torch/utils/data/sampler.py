@@ -2,7 +2,7 @@ import torch
 from torch._six import int_classes as _int_classes
 from torch import Tensor
 
-from typing import Iterator, Optional, Sequence, List, TypeVar, Generic, Sized
+from typing import Iterator, Optional, Sequence, List, TypeVar, Generic, Sized, Dict, Any
 
 T_co = TypeVar('T_co', covariant=True)
 
@@ -16,6 +16,15 @@ class Sampler(Generic[T_co]):
     .. note:: The :meth:`__len__` method isn't strictly required by
               :class:`~torch.utils.data.DataLoader`, but is expected in any
               calculation involving the length of a :class:`~torch.utils.data.DataLoader`.
+
+    .. note:: Samplers can optionally provide ``state_dict()`` and
+              ``load_state_dict(state_dict)`` methods, which makes the
+              iterations of a :class:`~torch.utils.data.DataLoader` using them
+              resumable. ``state_dict()`` describes the latest iteration, with
+              the number of indices yielded so far under the ``'num_yielded'``
+              key. After ``load_state_dict(state_dict)``, the next iteration
+              replays that iteration, starting after the first
+              ``state_dict['num_yielded']`` indices.
     """
 
     def __init__(self, data_source: Optional[Sized]) -> None:
@@ -62,13 +71,28 @@ class SequentialSampler(Sampler[int]):
 
     def __init__(self, data_source):
         self.data_source = data_source
+        self._num_yielded = 0
+        self._start = 0
 
     def __iter__(self):
-        return iter(range(len(self.data_source)))
+        start, self._start = self._start, 0
+        self._num_yielded = start
+        return self._iter_indices(range(start, len(self.data_source)))
+
+    def _iter_indices(self, indices):
+        for idx in indices:
+            self._num_yielded += 1
+            yield idx
 
     def __len__(self) -> int:
         return len(self.data_source)
 
+    def state_dict(self) -> Dict[str, Any]:
+        return {'num_yielded': self._num_yielded}
+
+    def load_state_dict(self, state_dict: Dict[str, Any]) -> None:
+        self._start = state_dict['num_yielded']
+
 
 class RandomSampler(Sampler[int]):
     r"""Samples elements randomly. If without replacement, then sample from a shuffled dataset.
@@ -103,6 +127,12 @@ class RandomSampler(Sampler[int]):
             raise ValueError("num_samples should be a positive integer "
                              "value, but got num_samples={}".format(self.num_samples))
 
+        # State of the latest iteration (see `state_dict`), and of the one to
+        # resume at the next `__iter__` (see `load_state_dict`)
+        self._rng_state = None
+        self._num_yielded = 0
+        self._resume_state = None
+
     @property
     def num_samples(self) -> int:
         # dataset size might change at runtime
@@ -111,22 +141,63 @@ class RandomSampler(Sampler[int]):
         return self._num_samples
 
     def __iter__(self):
-        n = len(self.data_source)
+        start, rng_state = 0, None
+        if self._resume_state is not None:
+            start, rng_state = self._resume_state
+            self._resume_state = None
         if self.generator is None:
+            # When resuming, a fresh generator takes the recorded state, which
+            # leaves the global generator alone.
             generator = torch.Generator()
-            generator.manual_seed(int(torch.empty((), dtype=torch.int64).random_().item()))
+            if rng_state is None:
+                generator.manual_seed(int(torch.empty((), dtype=torch.int64).random_().item()))
+                if not self.replacement:
+                    # permutations are drawn from the global generator
+                    generator = torch.default_generator
         else:
             generator = self.generator
+        if rng_state is not None:
+            generator.set_state(rng_state)
+        self._rng_state = generator.get_state()
+        self._num_yielded = start
+        return self._iter_indices(generator, start)
+
+    def _iter_indices(self, generator, start):
+        n = len(self.data_source)
         if self.replacement:
+            # Indices are drawn in chunks of 32, so resuming draws the same
+            # chunks and skips the first `start` indices.
             for _ in range(self.num_samples // 32):
-                yield from torch.randint(high=n, size=(32,), dtype=torch.int64, generator=generator).tolist()
-            yield from torch.randint(high=n, size=(self.num_samples % 32,), dtype=torch.int64, generator=generator).tolist()
+                indices = torch.randint(high=n, size=(32,), dtype=torch.int64, generator=generator).tolist()
+                if start >= 32:
+                    start -= 32
+                    continue
+                for idx in indices[start:]:
+                    self._num_yielded += 1
+                    yield idx
+                start = 0
+            indices = torch.randint(high=n, size=(self.num_samples % 32,), dtype=torch.int64,
+                                    generator=generator).tolist()
         else:
-            yield from torch.randperm(n, generator=self.generator).tolist()
+            indices = torch.randperm(n, generator=generator).tolist()
+        for idx in indices[start:]:
+            self._num_yielded += 1
+            yield idx
 
     def __len__(self):
         return self.num_samples
 
+    def state_dict(self) -> Dict[str, Any]:
+        r"""Returns the state of the generator at the start of the latest
+        iteration, and the number of indices it yielded so far."""
+        return {'rng_state': self._rng_state, 'num_yielded': self._num_yielded}
+
+    def load_state_dict(self, state_dict: Dict[str, Any]) -> None:
+        r"""Makes the next iteration replay the one described by
+        ``state_dict``, starting after its first ``state_dict['num_yielded']``
+        indices."""
+        self._resume_state = (state_dict['num_yielded'], state_dict['rng_state'])
+
 
 class SubsetRandomSampler(Sampler[int]):
     r"""Samples elements randomly from a given list of indices, without replacement.
@@ -221,17 +292,46 @@ class BatchSampler(Sampler[List[int]]):
         self.sampler = sampler
         self.batch_size = batch_size
         self.drop_last = drop_last
+        self._num_yielded = 0
+        self._start = 0
 
     def __iter__(self):
+        # Create the sampler iterator right away, so that `state_dict` always
+        # describes the latest iteration.
+        self._num_yielded, self._start = self._start, 0
+        return self._iter_batches(iter(self.sampler))
+
+    def _iter_batches(self, sampler_iter):
         batch = []
-        for idx in self.sampler:
+        for idx in sampler_iter:
             batch.append(idx)
             if len(batch) == self.batch_size:
+                self._num_yielded += 1
                 yield batch
                 batch = []
         if len(batch) > 0 and not self.drop_last:
+            self._num_yielded += 1
             yield batch
 
+    def state_dict(self) -> Dict[str, Any]:
+        r"""Returns the number of batches yielded by the latest iteration so
+        far, and the state of the wrapped sampler."""
+        if not hasattr(self.sampler, 'state_dict'):
+            raise TypeError("{} does not support state_dict()".format(type(self.sampler).__name__))
+        # Cannot verify that self.sampler has state_dict
+        return {'num_yielded': self._num_yielded, 'sampler': self.sampler.state_dict()}  # type: ignore
+
+    def load_state_dict(self, state_dict: Dict[str, Any]) -> None:
+        r"""Makes the next iteration replay the one described by
+        ``state_dict``, starting after its first ``state_dict['num_yielded']``
+        batches."""
+        sampler_state = dict(state_dict['sampler'])
+        # The wrapped sampler may be ahead by a partial batch
+        sampler_state['num_yielded'] = state_dict['num_yielded'] * self.batch_size
+        # Cannot verify that self.sampler has load_state_dict
+        self.sampler.load_state_dict(sampler_state)  # type: ignore
+        self._start = state_dict['num_yielded']
+
     def __len__(self):
         # Can only be called if self.sampler has __len__ implemented
         # We cannot enforce this condition, so we turn off typechecking for the